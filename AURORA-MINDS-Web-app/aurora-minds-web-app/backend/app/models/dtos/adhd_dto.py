@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from ...models.dtos.child_dto import ChildDto
 
 
-@dataclass
+@dataclass(slots=True)
 class AdhdDto:
     adhd_id: int
     perception_1: float
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from ...models.dtos.user_dto import UserDto
 
 
-@dataclass
+@dataclass(slots=True)
 class ChildDto:
     child_id: int
     first_name: str
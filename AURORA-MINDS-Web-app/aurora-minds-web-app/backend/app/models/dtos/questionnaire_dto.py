@@ -5,7 +5,7 @@ from typing import Optional
 from ...models.dtos.child_dto import ChildDto
 
 
-@dataclass
+@dataclass(slots=True)
 class QuestionnaireDto:
     gender: str
     weight: float
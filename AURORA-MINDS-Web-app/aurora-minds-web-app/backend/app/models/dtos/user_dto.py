@@ -18,7 +18,7 @@ class UserLoginDto:
     password: str
 
 
-@dataclass
+@dataclass(slots=True)
 class UserDto:
     email: str
     first_name: str
@@ -1,6 +1,7 @@
 from ..models.dtos.adhd_dto import AdhdDto
 from ..models.entities.adhd import Adhd
 from ..repositories.adhd_repository_interface import AdhdRepositoryInterface
+from ..utils.dto_converter import dto_fields
 
 
 class AdhdRepository(AdhdRepositoryInterface):
@@ -8,6 +9,8 @@ class AdhdRepository(AdhdRepositoryInterface):
     def find_adhd_records_by_child_ids(child_ids: list) -> list[Adhd]:
         """
         Retrieve ADHD records for a list of child IDs.
+        The child, parent and clinician of every record are fetched in the same query (JOINs),
+        so the conversion to nested DTOs does not run extra queries per record.
 
         Args:
             child_ids (list): List of child IDs.
@@ -15,11 +18,30 @@ class AdhdRepository(AdhdRepositoryInterface):
         Returns:
             list: List of ADHD records.
         """
-        return Adhd.objects.filter(child_id__in=child_ids)
+        return Adhd.objects.filter(child_id__in=child_ids).select_related('child_id__parent_id',
+                                                                          'child_id__clinician_id')
+
+    @staticmethod
+    def find_adhd_records_by_parent_id(parent_id: int) -> list[Adhd]:
+        """
+        Retrieve the ADHD records of the children of a parent in a single query,
+        joining the child (filtered by its parent), parent and clinician of every record.
+        """
+        return Adhd.objects.filter(child_id__parent_id=parent_id).select_related('child_id__parent_id',
+                                                                                 'child_id__clinician_id')
+
+    @staticmethod
+    def find_adhd_records_by_clinician_id(clinician_id: int) -> list[Adhd]:
+        """
+        Retrieve the ADHD records of the children of a clinician in a single query,
+        joining the child (filtered by its clinician), parent and clinician of every record.
+        """
+        return Adhd.objects.filter(child_id__clinician_id=clinician_id).select_related('child_id__parent_id',
+                                                                                       'child_id__clinician_id')
 
     @staticmethod
     def create_adhd_record_rep(adhd_dto: AdhdDto) -> Adhd:
-        adhd = Adhd.objects.create(**adhd_dto.__dict__)
+        adhd = Adhd.objects.create(**dto_fields(adhd_dto))
         return adhd
 
     @staticmethod
@@ -28,7 +50,7 @@ class AdhdRepository(AdhdRepositoryInterface):
         Update an existing ADHD record in the database.
         """
         adhd = Adhd.objects.get(pk=adhd_dto.adhd_id)
-        for key, value in adhd_dto.__dict__.items():
+        for key, value in dto_fields(adhd_dto).items():
             if value is not None:
                 setattr(adhd, key, value)
         adhd.save()
@@ -10,6 +10,14 @@ class AdhdRepositoryInterface(ABC):
     def find_adhd_records_by_child_ids(self, child_ids: List[int]) -> List[Adhd]:
         pass
 
+    @abstractmethod
+    def find_adhd_records_by_parent_id(self, parent_id: int) -> List[Adhd]:
+        pass
+
+    @abstractmethod
+    def find_adhd_records_by_clinician_id(self, clinician_id: int) -> List[Adhd]:
+        pass
+
     @abstractmethod
     def create_adhd_record_rep(self, adhd_dto: AdhdDto) -> Adhd:
         pass
@@ -4,6 +4,7 @@ from ..models.dtos.child_dto import ChildDto
 from ..models.entities.child import Child
 from ..models.entities.user import User
 from ..repositories.child_repository_interface import ChildRepositoryInterface
+from ..utils.dto_converter import dto_fields
 
 
 class ChildRepository(ChildRepositoryInterface):
@@ -11,16 +12,16 @@ class ChildRepository(ChildRepositoryInterface):
     @staticmethod
     def find_children_by_parent_id(parent_id: int) -> List[Child]:
         """
-        Retrieve children records for a specific parent.
+        Retrieve children records for a specific parent, with their parent and clinician in the same query.
         """
-        return Child.objects.filter(parent_id=parent_id).all()
+        return Child.objects.filter(parent_id=parent_id).select_related('parent_id', 'clinician_id')
 
     @staticmethod
     def find_children_by_clinician_id(clinician_id: int) -> List[Child]:
         """
-        Retrieve children records for a specific clinician.
+        Retrieve children records for a specific clinician, with their parent and clinician in the same query.
         """
-        return Child.objects.filter(clinician_id=clinician_id).all()
+        return Child.objects.filter(clinician_id=clinician_id).select_related('parent_id', 'clinician_id')
 
     @staticmethod
     def create_child_rep(child_dto: ChildDto) -> Child:
@@ -32,7 +33,7 @@ class ChildRepository(ChildRepositoryInterface):
         parent = User.objects.get(pk=child_dto.parent_id.id) if child_dto.parent_id else None
         clinician = User.objects.get(pk=child_dto.clinician_id.id) if child_dto.clinician_id else None
 
-        child_fields = {key: value for key, value in child_dto.__dict__.items() if value is not None}
+        child_fields = {key: value for key, value in dto_fields(child_dto).items() if value is not None}
         child_fields['parent_id'] = parent
         child_fields['clinician_id'] = clinician
 
@@ -45,7 +46,7 @@ class ChildRepository(ChildRepositoryInterface):
         Update an existing child record in the database.
         """
         child = Child.objects.get(pk=child_dto.child_id)
-        for key, value in child_dto.__dict__.items():
+        for key, value in dto_fields(child_dto).items():
             if value is not None:
                 setattr(child, key, value)
         child.save()
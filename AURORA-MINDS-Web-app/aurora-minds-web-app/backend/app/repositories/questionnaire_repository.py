@@ -1,30 +1,54 @@
 from ..models.dtos.questionnaire_dto import QuestionnaireDto
 from ..models.entities.questionnaire import Questionnaire
 from ..repositories.questionnaire_repository_interface import QuestionnaireRepositoryInterface
+from ..utils.dto_converter import dto_fields
 
 
 class QuestionnaireRepository(QuestionnaireRepositoryInterface):
 
     @staticmethod
     def find_questionnaires_by_child_ids(child_ids: list) -> list[Questionnaire]:
-        return Questionnaire.objects.filter(child_id__in=child_ids).all()
+        """
+        Retrieve the questionnaires of a list of child IDs, with their child, parent and clinician in the same query.
+        """
+        return Questionnaire.objects.filter(child_id__in=child_ids).select_related('child_id__parent_id',
+                                                                                   'child_id__clinician_id')
+
+    @staticmethod
+    def find_questionnaires_by_parent_id(parent_id: int) -> list[Questionnaire]:
+        """
+        Retrieve the questionnaires of the children of a parent in a single query,
+        joining the child (filtered by its parent), parent and clinician of every questionnaire.
+        """
+        return Questionnaire.objects.filter(child_id__parent_id=parent_id).select_related('child_id__parent_id',
+                                                                                          'child_id__clinician_id')
+
+    @staticmethod
+    def find_questionnaires_by_clinician_id(clinician_id: int) -> list[Questionnaire]:
+        """
+        Retrieve the questionnaires of the children of a clinician in a single query,
+        joining the child (filtered by its clinician), parent and clinician of every questionnaire.
+        """
+        return Questionnaire.objects.filter(child_id__clinician_id=clinician_id).select_related(
+            'child_id__parent_id', 'child_id__clinician_id')
 
     @staticmethod
     def find_questionnaire_by_child_id(child_id: int) -> Questionnaire:
         try:
-            return Questionnaire.objects.get(child_id=child_id)
+            return Questionnaire.objects.select_related('child_id__parent_id', 'child_id__clinician_id').get(
+                child_id=child_id)
         except Questionnaire.DoesNotExist:
             return None
 
     @staticmethod
     def create_questionnaire_rep(questionnaire_dto: QuestionnaireDto) -> Questionnaire:
-        questionnaire = Questionnaire.objects.create(**questionnaire_dto.__dict__)
+        questionnaire = Questionnaire.objects.create(**dto_fields(questionnaire_dto))
         return questionnaire
 
     @staticmethod
     def update_questionnaire_rep(questionnaire_dto: QuestionnaireDto) -> Questionnaire:
         questionnaire = Questionnaire.objects.get(pk=questionnaire_dto.questionnaire_id)
-        for key, value in questionnaire_dto.__dict__.items():
+        for key, value in dto_fields(questionnaire_dto).items():
             if value is not None:
                 setattr(questionnaire, key, value)
         questionnaire.save()
@@ -10,6 +10,14 @@ class QuestionnaireRepositoryInterface(ABC):
     def find_questionnaires_by_child_ids(self, child_ids: List[int]) -> List[Questionnaire]:
         pass
 
+    @abstractmethod
+    def find_questionnaires_by_parent_id(self, parent_id: int) -> List[Questionnaire]:
+        pass
+
+    @abstractmethod
+    def find_questionnaires_by_clinician_id(self, clinician_id: int) -> List[Questionnaire]:
+        pass
+
     @abstractmethod
     def find_questionnaire_by_child_id(self, child_id: int) -> Questionnaire:
         pass
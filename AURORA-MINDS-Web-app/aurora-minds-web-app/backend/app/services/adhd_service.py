@@ -2,14 +2,16 @@ import logging
 from typing import List
 
 import inject
-from auto_dataclass.dj_model_to_dataclass import FromOrmToDataclass
 
 from ..models.dtos.adhd_dto import AdhdDto
 from ..repositories.adhd_repository_interface import AdhdRepositoryInterface
 from ..services.adhd_service_interface import AdhdServiceInterface
 from ..utils.constant_messages import FAILED_TO_RETRIEVE_ADHD_RECORDS, FAILED_TO_UPDATE_ADHD_RECORD, \
-    FAILED_TO_CREATE_ADHD_RECORD
+    FAILED_TO_CREATE_ADHD_RECORD, USER_PERMISSION_DENIED
+from ..utils.enums import Role
+from ..utils.pagination import PageRequest, Page, paginate
 from ..utils.exceptions import CustomException
+from ..utils.dto_converter import DtoConverter
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +20,7 @@ class AdhdService(AdhdServiceInterface):
     @inject.autoparams()
     def __init__(self, adhd_repository: AdhdRepositoryInterface):
         self.adhd_repository = adhd_repository
-        self.converter = FromOrmToDataclass()
+        self.converter = DtoConverter()
 
     def get_adhd_records_by_child_ids(self, child_ids: List[int]) -> List[AdhdDto]:
         """
@@ -32,13 +34,42 @@ class AdhdService(AdhdServiceInterface):
         """
         try:
             adhd_records = self.adhd_repository.find_adhd_records_by_child_ids(child_ids)
-            return [self.converter.to_dto(adhd, AdhdDto) for adhd in adhd_records]
+            return self.converter.to_dtos(adhd_records, AdhdDto)
         except Exception as e:
             logger.error(
                 f"[adhd_service:get_adhd_records_by_child_ids()] Error --> Failed to retrieve ADHD records "
                 f"for child IDs {child_ids}: {e}")
             raise CustomException(FAILED_TO_RETRIEVE_ADHD_RECORDS)
 
+    def get_adhd_records_by_user(self, user_id: int, role: str, page: PageRequest = None) -> List[AdhdDto] | Page:
+        """
+        Service to retrieve the ADHD records of the children of a parent or clinician, in a single query.
+
+        Args:
+            user_id (int): The user ID.
+            role (str): The user role, PARENT or CLINICIAN.
+            page (PageRequest): Optional page (keyset pagination) and fields (projection) to return.
+
+        Returns:
+            list: List of ADHD DTOs, or the requested Page of them.
+        """
+        try:
+            if role == Role.PARENT.value:
+                adhd_records = self.adhd_repository.find_adhd_records_by_parent_id(user_id)
+            elif role == Role.CLINICIAN.value:
+                adhd_records = self.adhd_repository.find_adhd_records_by_clinician_id(user_id)
+            else:
+                raise CustomException(USER_PERMISSION_DENIED)
+
+            if page is not None:
+                return paginate(adhd_records, page, lambda rows: self.converter.to_dtos(rows, AdhdDto))
+            return self.converter.to_dtos(adhd_records, AdhdDto)
+        except Exception as e:
+            logger.error(
+                f"[adhd_service:get_adhd_records_by_user()] Error --> Failed to retrieve ADHD records "
+                f"for user ID {user_id} with role {role}: {e}")
+            raise CustomException(FAILED_TO_RETRIEVE_ADHD_RECORDS)
+
     def create_adhd_record_serv(self, adhd_dto: AdhdDto) -> AdhdDto:
         """
         Service to create a new ADHD record.
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import List
 
 from ..models.dtos.adhd_dto import AdhdDto
+from ..utils.pagination import PageRequest, Page
 
 
 class AdhdServiceInterface(ABC):
@@ -9,6 +10,10 @@ class AdhdServiceInterface(ABC):
     def get_adhd_records_by_child_ids(self, child_ids: List[int]) -> List[AdhdDto]:
         pass
 
+    @abstractmethod
+    def get_adhd_records_by_user(self, user_id: int, role: str, page: PageRequest = None) -> List[AdhdDto] | Page:
+        pass
+
     @abstractmethod
     def create_adhd_record_serv(self, adhd_dto: AdhdDto) -> AdhdDto:
         pass
@@ -2,7 +2,6 @@ import logging
 from typing import List
 
 import inject
-from auto_dataclass.dj_model_to_dataclass import FromOrmToDataclass
 
 from ..models.dtos.child_dto import ChildDto
 from ..repositories.child_repository_interface import ChildRepositoryInterface
@@ -10,7 +9,9 @@ from ..services.child_service_interface import ChildServiceInterface
 from ..utils.constant_messages import FAILED_TO_RETRIEVE_CHILDREN, FAILED_TO_CREATE_CHILD, FAILED_TO_UPDATE_CHILD, \
     FAILED_TO_DELETE_CHILD, USER_PERMISSION_DENIED
 from ..utils.enums import Role
+from ..utils.pagination import PageRequest, Page, paginate
 from ..utils.exceptions import CustomException
+from ..utils.dto_converter import DtoConverter
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +20,12 @@ class ChildService(ChildServiceInterface):
     @inject.autoparams()
     def __init__(self, child_repository: ChildRepositoryInterface):
         self.child_repository = child_repository
-        self.converter = FromOrmToDataclass()
+        self.converter = DtoConverter()
 
-    def get_children_by_user(self, user_id: int, role: str) -> List[ChildDto]:
+    def get_children_by_user(self, user_id: int, role: str, page: PageRequest = None) -> List[ChildDto] | Page:
         """
         Service to retrieve children records based on user role.
+        With a PageRequest, only the requested page (keyset pagination) and fields (projection) are returned.
         """
         try:
             if role == Role.PARENT.value:
@@ -33,7 +35,9 @@ class ChildService(ChildServiceInterface):
             else:
                 raise CustomException(USER_PERMISSION_DENIED)
 
-            return [self.converter.to_dto(child, ChildDto) for child in children]
+            if page is not None:
+                return paginate(children, page, lambda rows: self.converter.to_dtos(rows, ChildDto))
+            return self.converter.to_dtos(children, ChildDto)
         except Exception as e:
             logger.error(
                 f"[child_service:get_children_by_user()] Error -->"
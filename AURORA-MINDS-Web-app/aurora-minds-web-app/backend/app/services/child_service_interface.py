@@ -2,12 +2,13 @@ from abc import ABC, abstractmethod
 from typing import List
 
 from ..models.dtos.child_dto import ChildDto
+from ..utils.pagination import PageRequest, Page
 
 
 class ChildServiceInterface(ABC):
 
     @abstractmethod
-    def get_children_by_user(self, user_id: int, role: str) -> List[ChildDto]:
+    def get_children_by_user(self, user_id: int, role: str, page: PageRequest = None) -> List[ChildDto] | Page:
         pass
 
     @abstractmethod
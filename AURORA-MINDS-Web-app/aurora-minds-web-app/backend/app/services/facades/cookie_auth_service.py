@@ -1,13 +1,13 @@
 import logging
 
 import inject
-from auto_dataclass.dj_model_to_dataclass import FromOrmToDataclass
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from ...models.dtos.user_dto import UserDto
 from ...repositories.user_repository_interface import UserRepositoryInterface
 from ...utils.constant_messages import INVALID_CREDENTIALS
 from ...utils.exceptions import CustomException
+from ...utils.dto_converter import DtoConverter, dto_fields
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +20,7 @@ class CookieAuthService:
     @inject.autoparams()
     def __init__(self, user_repository: UserRepositoryInterface):
         self.user_repository = user_repository
-        self.converter = FromOrmToDataclass()
+        self.converter = DtoConverter()
 
     def authenticate_with_cookie(self, cookie_data):
         """
@@ -49,7 +49,7 @@ class CookieAuthService:
         refresh = RefreshToken.for_user(user)
         # Convert to dto for the serialization
         user_dto = self.converter.to_dto(user, UserDto)
-        user_dto_dict = user_dto.__dict__  # Convert the DTO to a dictionary
+        user_dto_dict = dto_fields(user_dto)  # Convert the DTO to a dictionary
         return {
             'user': user_dto_dict,
             'access': str(refresh.access_token),
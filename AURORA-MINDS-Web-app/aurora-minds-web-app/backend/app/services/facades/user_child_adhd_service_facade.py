@@ -7,8 +7,9 @@ from ...models.dtos.adhd_dto import AdhdDto
 from ...services.adhd_service_interface import AdhdServiceInterface
 from ...services.child_service_interface import ChildServiceInterface
 from ...services.user_service_interface import UserServiceInterface
-from ...utils.constant_messages import FAILED_TO_RETRIEVE_USER, FAILED_TO_RETRIEVE_ADHD_RECORDS
+from ...utils.constant_messages import FAILED_TO_RETRIEVE_ADHD_RECORDS
 from ...utils.exceptions import CustomException
+from ...utils.pagination import PageRequest, Page
 
 logger = logging.getLogger(__name__)
 
@@ -21,31 +22,22 @@ class UserChildAdhdServiceFacade(UserChildAdhdServiceFacadeInterface):
         self.child_service = child_service
         self.adhd_service = adhd_service
 
-    def get_adhd_records_for_user(self, user_id: int) -> list[AdhdDto]:
+    def get_adhd_records_for_user(self, user_id: int, role: str, page: PageRequest = None) -> list[AdhdDto] | Page:
         """
         Service to retrieve ADHD records for a user based on their role.
+        The user is the authenticated one (already loaded with the request), so the records of their children
+        are fetched straight away with a single query, filtered through the child's parent or clinician.
 
         Args:
             user_id (int): The user ID.
+            role (str): The user role.
+            page (PageRequest): Optional page (keyset pagination) and fields (projection) to return.
 
         Returns:
-            list: List of ADHD DTOs.
+            list: List of ADHD DTOs, or the requested Page of them.
         """
         try:
-            # Get user info
-            user = self.user_service.get_user_by_id(user_id)
-            if not user:
-                raise CustomException(FAILED_TO_RETRIEVE_USER)
-            # Get children based on the user role
-            children = self.child_service.get_children_by_user(user_id, user.role)
-            # If the user is not associated with any child, return empty list
-            if not children:
-                return []
-            # Get all ids of the children that were found
-            child_ids = [child.child_id for child in children]
-            # Get each child's ADHD record storing to a list
-            adhd_records = self.adhd_service.get_adhd_records_by_child_ids(child_ids)
-            return adhd_records
+            return self.adhd_service.get_adhd_records_by_user(user_id, role, page)
         except CustomException as e:
             logger.error(f"[user_adhd_service_facade:get_adhd_records_for_user()] Error --> {e}")
             raise e
@@ -2,9 +2,10 @@ from abc import ABC, abstractmethod
 from typing import List
 
 from ...models.dtos.adhd_dto import AdhdDto
+from ...utils.pagination import PageRequest, Page
 
 
 class UserChildAdhdServiceFacadeInterface(ABC):
     @abstractmethod
-    def get_adhd_records_for_user(self, user_id: int) -> List[AdhdDto]:
+    def get_adhd_records_for_user(self, user_id: int, role: str, page: PageRequest = None) -> List[AdhdDto] | Page:
         pass
@@ -8,11 +8,12 @@ from ...models.dtos.questionnaire_dto import QuestionnaireDto
 from ...services.child_service_interface import ChildServiceInterface
 from ...services.questionnaire_service_interface import QuestionnaireServiceInterface
 from ...services.user_service_interface import UserServiceInterface
-from ...utils.constant_messages import USER_PERMISSION_DENIED, FAILED_TO_RETRIEVE_USER, \
+from ...utils.constant_messages import USER_PERMISSION_DENIED, \
     FAILED_TO_RETRIEVE_QUESTIONNAIRES, FAILED_TO_CREATE_QUESTIONNAIRE, FAILED_TO_UPDATE_QUESTIONNAIRE, \
     CHILD_PERMISSION_DENIED, FAILED_TO_RETRIEVE_QUESTIONNAIRE
 from ...utils.enums import Role
 from ...utils.exceptions import CustomException
+from ...utils.pagination import PageRequest, Page
 
 logger = logging.getLogger(__name__)
 
@@ -25,34 +26,23 @@ class UserChildQuestionnaireServiceFacade(UserChildQuestionnaireServiceFacadeInt
         self.child_service = child_service
         self.questionnaire_service = questionnaire_service
 
-    def get_questionnaires_by_user(self, user_id: int) -> list[QuestionnaireDto]:
+    def get_questionnaires_by_user(self, user_id: int, role: str,
+                                   page: PageRequest = None) -> list[QuestionnaireDto] | Page:
         """
         Retrieve questionnaires for a user based on their role.
+        The user is the authenticated one (already loaded with the request), so the questionnaires of their
+        children are fetched straight away with a single query, filtered through the child's parent or clinician.
 
         Args:
             user_id (int): The user ID.
+            role (str): The user role.
+            page (PageRequest): Optional page (keyset pagination) and fields (projection) to return.
 
         Returns:
-            list: List of Questionnaire DTOs.
+            list: List of Questionnaire DTOs, or the requested Page of them.
         """
         try:
-            # Get user info
-            user = self.user_service.get_user_by_id(user_id)
-            if not user:
-                raise CustomException(FAILED_TO_RETRIEVE_USER)
-
-            # Get children based on the user role
-            children = self.child_service.get_children_by_user(user_id, user.role)
-
-            # If the user is not associated with any child, return empty list
-            if not children:
-                return []
-
-            # Get all ids of the children that were found
-            child_ids = [child.child_id for child in children]
-            # Get each child's questionnaire records
-            questionnaires = self.questionnaire_service.get_questionnaires_by_child_ids(child_ids)
-            return questionnaires
+            return self.questionnaire_service.get_questionnaires_by_user(user_id, role, page)
         except CustomException as e:
             logger.error(f"[user_questionnaire_service_facade:get_questionnaires_for_user()] Error --> {e}")
             raise e
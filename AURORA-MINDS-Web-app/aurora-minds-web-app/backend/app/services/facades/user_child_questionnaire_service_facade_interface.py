@@ -3,11 +3,13 @@ from typing import List
 
 from ...models.dtos.child_dto import ChildDto
 from ...models.dtos.questionnaire_dto import QuestionnaireDto
+from ...utils.pagination import PageRequest, Page
 
 
 class UserChildQuestionnaireServiceFacadeInterface(ABC):
     @abstractmethod
-    def get_questionnaires_by_user(self, user_id: int) -> List[QuestionnaireDto]:
+    def get_questionnaires_by_user(self, user_id: int, role: str,
+                                   page: PageRequest = None) -> List[QuestionnaireDto] | Page:
         pass
 
     def get_questionnaire_by_child(self, user_id: int, child_dto: ChildDto) -> QuestionnaireDto:
@@ -11,6 +11,7 @@ from ...utils.constant_messages import USER_PERMISSION_DENIED, FAILED_TO_CREATE_
     FAILED_TO_UPDATE_CHILD, FAILED_TO_DELETE_CHILD, CHILD_PERMISSION_DENIED, FAILED_TO_RETRIEVE_CHILDREN
 from ...utils.enums import Role
 from ...utils.exceptions import CustomException
+from ...utils.pagination import PageRequest, Page
 
 logger = logging.getLogger(__name__)
 
@@ -21,16 +22,17 @@ class UserChildServiceFacade(UserChildServiceFacadeInterface):
         self.user_service = user_service
         self.child_service = child_service
 
-    def get_children_by_user_facade(self, user_id: int, role: str) -> List[ChildDto]:
+    def get_children_by_user_facade(self, user_id: int, role: str, page: PageRequest = None) -> List[ChildDto] | Page:
         """
         Facade method to retrieve children based on the user's role, integrating user details into the child DTOs.
+        With a PageRequest, only the requested page and fields are returned.
         """
         try:
             user_dto = self.user_service.get_user_by_id(user_id)
             if not user_dto:
                 raise CustomException(USER_PERMISSION_DENIED)
 
-            children_dtos = self.child_service.get_children_by_user(user_id, role)
+            children_dtos = self.child_service.get_children_by_user(user_id, role, page)
             return children_dtos
         except Exception as e:
             logger.error(
@@ -2,11 +2,12 @@ from abc import ABC, abstractmethod
 from typing import List
 
 from ...models.dtos.child_dto import ChildDto
+from ...utils.pagination import PageRequest, Page
 
 
 class UserChildServiceFacadeInterface(ABC):
     @abstractmethod
-    def get_children_by_user_facade(self, user_id: int, role: str) -> List[ChildDto]:
+    def get_children_by_user_facade(self, user_id: int, role: str, page: PageRequest = None) -> List[ChildDto] | Page:
         pass
 
     @abstractmethod
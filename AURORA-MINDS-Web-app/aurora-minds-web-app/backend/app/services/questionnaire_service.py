@@ -2,15 +2,17 @@ import logging
 from typing import List
 
 import inject
-from auto_dataclass.dj_model_to_dataclass import FromOrmToDataclass
 
 from ..models.dtos.child_dto import ChildDto
 from ..models.dtos.questionnaire_dto import QuestionnaireDto
 from ..repositories.questionnaire_repository_interface import QuestionnaireRepositoryInterface
 from ..services.questionnaire_service_interface import QuestionnaireServiceInterface
 from ..utils.constant_messages import FAILED_TO_RETRIEVE_QUESTIONNAIRES, FAILED_TO_CREATE_QUESTIONNAIRE, \
-    FAILED_TO_UPDATE_QUESTIONNAIRE, FAILED_TO_RETRIEVE_QUESTIONNAIRE
+    FAILED_TO_UPDATE_QUESTIONNAIRE, FAILED_TO_RETRIEVE_QUESTIONNAIRE, USER_PERMISSION_DENIED
+from ..utils.enums import Role
+from ..utils.pagination import PageRequest, Page, paginate
 from ..utils.exceptions import CustomException
+from ..utils.dto_converter import DtoConverter
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +21,7 @@ class QuestionnaireService(QuestionnaireServiceInterface):
     @inject.autoparams()
     def __init__(self, questionnaire_repository: QuestionnaireRepositoryInterface):
         self.questionnaire_repository = questionnaire_repository
-        self.converter = FromOrmToDataclass()
+        self.converter = DtoConverter()
 
     def get_questionnaires_by_child_ids(self, child_ids: List[int]) -> List[QuestionnaireDto]:
         """
@@ -36,12 +38,45 @@ class QuestionnaireService(QuestionnaireServiceInterface):
         """
         try:
             questionnaires = self.questionnaire_repository.find_questionnaires_by_child_ids(child_ids)
-            return [self.converter.to_dto(questionnaire, QuestionnaireDto) for questionnaire in questionnaires]
+            return self.converter.to_dtos(questionnaires, QuestionnaireDto)
         except Exception as e:
             logger.error(
                 f"[questionnaire_service:get_questionnaires_by_child_ids()] Error --> Failed to retrieve questionnaires for child IDs {child_ids}: {e}")
             raise CustomException(FAILED_TO_RETRIEVE_QUESTIONNAIRES)
 
+    def get_questionnaires_by_user(self, user_id: int, role: str,
+                                   page: PageRequest = None) -> List[QuestionnaireDto] | Page:
+        """
+        Service to retrieve the questionnaires of the children of a parent or clinician, in a single query.
+
+        Args:
+            user_id (int): The user ID.
+            role (str): The user role, PARENT or CLINICIAN.
+            page (PageRequest): Optional page (keyset pagination) and fields (projection) to return.
+
+        Returns:
+            List[QuestionnaireDto]: List of Questionnaire DTOs, or the requested Page of them.
+
+        Raises:
+            CustomException: If the role has no children or the questionnaires cannot be retrieved.
+        """
+        try:
+            if role == Role.PARENT.value:
+                questionnaires = self.questionnaire_repository.find_questionnaires_by_parent_id(user_id)
+            elif role == Role.CLINICIAN.value:
+                questionnaires = self.questionnaire_repository.find_questionnaires_by_clinician_id(user_id)
+            else:
+                raise CustomException(USER_PERMISSION_DENIED)
+
+            if page is not None:
+                return paginate(questionnaires, page, lambda rows: self.converter.to_dtos(rows, QuestionnaireDto))
+            return self.converter.to_dtos(questionnaires, QuestionnaireDto)
+        except Exception as e:
+            logger.error(
+                f"[questionnaire_service:get_questionnaires_by_user()] Error --> Failed to retrieve questionnaires "
+                f"for user ID {user_id} with role {role}: {e}")
+            raise CustomException(FAILED_TO_RETRIEVE_QUESTIONNAIRES)
+
     def get_questionnaire_by_child(self, child_dto: ChildDto) -> QuestionnaireDto:
         try:
             questionnaire = self.questionnaire_repository.find_questionnaire_by_child_id(child_dto.child_id)
@@ -3,6 +3,7 @@ from typing import List
 
 from ..models.dtos.child_dto import ChildDto
 from ..models.dtos.questionnaire_dto import QuestionnaireDto
+from ..utils.pagination import PageRequest, Page
 
 
 class QuestionnaireServiceInterface(ABC):
@@ -10,6 +11,11 @@ class QuestionnaireServiceInterface(ABC):
     def get_questionnaires_by_child_ids(self, child_ids: List[int]) -> List[QuestionnaireDto]:
         pass
 
+    @abstractmethod
+    def get_questionnaires_by_user(self, user_id: int, role: str,
+                                   page: PageRequest = None) -> List[QuestionnaireDto] | Page:
+        pass
+
     def get_questionnaire_by_child(self, child_dto: ChildDto) -> QuestionnaireDto:
         pass
 
@@ -2,7 +2,6 @@ import logging
 from typing import List
 
 import inject
-from auto_dataclass.dj_model_to_dataclass import FromOrmToDataclass
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -14,6 +13,8 @@ from ..services.user_service_interface import UserServiceInterface
 from ..utils.constant_messages import INVALID_CREDENTIALS, FAILED_TO_RETRIEVE_USER, INVALID_ROLE, ALL_FIELDS_REQUIRED
 from ..utils.enums import Role
 from ..utils.exceptions import CustomException
+from ..utils.pagination import PageRequest, Page, paginate
+from ..utils.dto_converter import DtoConverter
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +33,7 @@ class UserService(UserServiceInterface):
             user_repository (UserRepositoryInterface): The user repository instance.
         """
         self.user_repository = user_repository
-        self.converter = FromOrmToDataclass()
+        self.converter = DtoConverter()
 
     def register_user(self, registered_user_dto: UserRegistrationDto):
         """
@@ -79,22 +80,25 @@ class UserService(UserServiceInterface):
             'refresh': str(refresh),
         }
 
-    def get_users_by_role(self, role: str) -> List[UserDto]:
+    def get_users_by_role(self, role: str, page: PageRequest = None) -> List[UserDto] | Page:
         """
         Retrieve a list of users based on their role.
 
         Args:
             role (str): The role to filter users by.
+            page (PageRequest): Optional page (keyset pagination) and fields (projection) to return.
 
         Returns:
-            List[UserDto]: A list of user data transfer objects with the specified role.
+            List[UserDto]: A list of user data transfer objects with the specified role, or the requested Page of them.
 
         Raises:
             CustomException: If there is an issue retrieving the users.
         """
         try:
             users = self.user_repository.find_by_role(role)
-            return [self.converter.to_dto(user, UserDto) for user in users]
+            if page is not None:
+                return paginate(users, page, lambda rows: self.converter.to_dtos(rows, UserDto))
+            return self.converter.to_dtos(users, UserDto)
         except Exception as e:
             logger.error(f"[user_service:get_users_by_role()] Error --> retrieving users with role {role}: {e}")
             raise CustomException(FAILED_TO_RETRIEVE_USER)
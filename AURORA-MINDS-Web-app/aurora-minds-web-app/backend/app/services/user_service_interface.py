@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import List
 
 from ..models.dtos.user_dto import UserDto
+from ..utils.pagination import PageRequest, Page
 
 
 class UserServiceInterface(ABC):
@@ -18,7 +19,7 @@ class UserServiceInterface(ABC):
         pass
 
     @abstractmethod
-    def get_users_by_role(self, role: str) -> List[UserDto]:
+    def get_users_by_role(self, role: str, page: PageRequest = None) -> List[UserDto] | Page:
         pass
 
     @abstractmethod
@@ -1,9 +1,13 @@
 import factory
+from auto_dataclass.dj_model_to_dataclass import FromOrmToDataclass
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
 
 from .models.dtos.adhd_dto import AdhdDto
 from .models.dtos.child_dto import ChildDto
 from .models.dtos.questionnaire_dto import QuestionnaireDto
+from .models.dtos.user_dto import UserDto
 from .models.entities.adhd import Adhd
 from .models.entities.child import Child
 from .models.entities.questionnaire import Questionnaire
@@ -16,8 +20,12 @@ from .services.adhd_service import AdhdService
 from .services.child_service import ChildService
 from .services.questionnaire_service import QuestionnaireService
 from .services.user_service import UserService
+from .utils.dto_converter import DtoConverter, dto_fields
+from .utils.dto_json import dto_json_serializer, render_json
 from .utils.enums import Role
 from .utils.exceptions import CustomException
+from .utils.serializers import AdhdSerializerJsonOutput, ChildSerializerWithUserDto, \
+    QuestionnaireSerializerJsonOutput, UserDtoSerializer
 
 
 # Define a factory for User model
@@ -482,3 +490,220 @@ class QuestionnaireServiceTest(TestCase):
         non_existing_child_dto = ChildDtoFactory(child_id=9999)
         with self.assertRaises(CustomException):
             self.questionnaire_service.get_questionnaire_by_child(non_existing_child_dto)
+
+
+class ListingQueryCountTest(TestCase):
+    """
+    Pin the number of SQL queries of the listing endpoints, whatever the number of records.
+    The related child, parent and clinician of every record must be fetched with JOINs, not one query per record.
+    """
+
+    def setUp(self):
+        self.parent = UserFactory(role=Role.PARENT.value)
+        self.clinician = UserFactory(role=Role.CLINICIAN.value)
+        children = ChildFactory.create_batch(5, parent_id=self.parent, clinician_id=self.clinician)
+        for child in children:
+            AdhdFactory.create_batch(2, child_id=child)
+            QuestionnaireFactory(child_id=child)
+        self.client = APIClient()
+
+    def get_as(self, user, url):
+        self.client.force_authenticate(user=user)
+        return self.client.get(url)
+
+    def test_children_records_query_count(self):
+        """Test listing the children of a clinician runs a constant number of queries"""
+        # user + children with their parent and clinician
+        with self.assertNumQueries(2):
+            response = self.get_as(self.clinician, '/users/children-records')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
+        self.assertEqual(response.json()[0]['parent_id']['email'], self.parent.email)
+
+    def test_adhd_records_query_count(self):
+        """Test listing the ADHD records of a parent runs a constant number of queries"""
+        # ADHD records filtered through their child's parent, with their child, parent and clinician
+        with self.assertNumQueries(1):
+            response = self.get_as(self.parent, '/users/adhd-records')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 10)
+        self.assertEqual(response.json()[0]['child_id']['clinician_id']['email'], self.clinician.email)
+
+    def test_questionnaires_query_count(self):
+        """Test listing the questionnaires of a clinician runs a constant number of queries"""
+        # questionnaires filtered through their child's clinician, with their child, parent and clinician
+        with self.assertNumQueries(1):
+            response = self.get_as(self.clinician, '/users/questionnaires')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
+        self.assertEqual(response.json()[0]['child_id']['parent_id']['email'], self.parent.email)
+
+    def test_list_users_by_role_query_count(self):
+        """Test listing the users of a role runs a single query"""
+        with self.assertNumQueries(1):
+            response = self.client.post('/users/list-users-by-role', {'role': Role.CLINICIAN.value}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user['email'] for user in response.json()], [self.clinician.email])
+
+    def test_records_are_scoped_to_the_user(self):
+        """Test a user only lists the ADHD records and questionnaires of their own children"""
+        other_parent = UserFactory(role=Role.PARENT.value)
+        other_child = ChildFactory(parent_id=other_parent)
+        AdhdFactory(child_id=other_child)
+        QuestionnaireFactory(child_id=other_child)
+        response = self.get_as(other_parent, '/users/adhd-records')
+        self.assertEqual([record['child_id']['child_id'] for record in response.json()], [other_child.child_id])
+        response = self.get_as(self.parent, '/users/questionnaires')
+        self.assertEqual(len(response.json()), 5)
+        self.assertNotIn(other_child.child_id, [record['child_id']['child_id'] for record in response.json()])
+        admin = UserFactory(role=Role.ADMIN.value)
+        self.assertEqual(self.get_as(admin, '/users/adhd-records').status_code, 400)
+
+
+class ListingPaginationTest(TestCase):
+    """
+    Keyset pagination ('limit', 'cursor') and projection ('fields') of the listing endpoints.
+    """
+
+    def setUp(self):
+        self.parent = UserFactory(role=Role.PARENT.value)
+        self.clinician = UserFactory(role=Role.CLINICIAN.value)
+        self.children = ChildFactory.create_batch(3, parent_id=self.parent, clinician_id=self.clinician)
+        self.children.append(ChildFactory(parent_id=self.parent, clinician_id=None))
+        for child in self.children:
+            AdhdFactory.create_batch(2, child_id=child)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.parent)
+
+    def test_pages_follow_the_primary_key(self):
+        """Test following the cursors returns every record once, in primary key order, one query per page"""
+        full = self.client.get('/users/adhd-records').json()
+        records, cursor = [], None
+        while True:
+            params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+            with self.assertNumQueries(1):
+                response = self.client.get('/users/adhd-records', params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.json()['results']), 3)
+            records += response.json()['results']
+            cursor = response.json()['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(len(records), 8)
+        self.assertEqual(records, sorted(full, key=lambda record: record['adhd_id']))
+
+    def test_cursor_without_limit_uses_the_default_page_size(self):
+        """Test a cursor alone returns the next page of the default size"""
+        first = self.client.get('/users/children-records', {'limit': 1}).json()
+        response = self.client.get('/users/children-records', {'cursor': first['next_cursor']})
+        self.assertEqual([child['child_id'] for child in response.json()['results']],
+                         sorted(child.child_id for child in self.children)[1:])
+        self.assertIsNone(response.json()['next_cursor'])
+
+    def test_fields_projection(self):
+        """Test only the requested fields are returned, rendered like in the full response"""
+        full = {record['adhd_id']: record for record in self.client.get('/users/adhd-records').json()}
+        response = self.client.get('/users/adhd-records', {'fields': 'adhd_id,target,child_id.parent_id.email'})
+        self.assertEqual(len(response.json()['results']), 8)
+        for record in response.json()['results']:
+            expected = full[record['adhd_id']]
+            self.assertEqual(record, {'adhd_id': expected['adhd_id'], 'target': expected['target'],
+                                      'child_id': {'parent_id': {'email': self.parent.email}}})
+
+    def test_fields_projection_of_missing_nested_object(self):
+        """Test a missing (null) nested object stays null, and a whole nested object can be requested"""
+        response = self.client.get('/users/children-records', {'fields': 'child_id,clinician_id'})
+        clinicians = {child['child_id']: child['clinician_id'] for child in response.json()['results']}
+        self.assertIsNone(clinicians[self.children[-1].child_id])
+        self.assertEqual(clinicians[self.children[0].child_id]['email'], self.clinician.email)
+        self.assertEqual(set(clinicians[self.children[0].child_id]),
+                         {'email', 'first_name', 'last_name', 'contact_number', 'role', 'id'})
+
+    def test_list_users_by_role_pages(self):
+        """Test the users of a role are paginated and projected too"""
+        response = self.client.post('/users/list-users-by-role?limit=1&fields=email', {'role': Role.PARENT.value},
+                                    format='json')
+        self.assertEqual(response.json()['results'], [{'email': self.parent.email}])
+        self.assertIsNone(response.json()['next_cursor'])
+
+    def test_invalid_parameters(self):
+        """Test invalid limits, cursors and fields are rejected"""
+        for params in ({'limit': 0}, {'limit': 'ten'}, {'cursor': 'not-a-cursor'}, {'fields': 'child_id.unknown'},
+                       {'fields': 'target.value'}):
+            self.assertEqual(self.client.get('/users/adhd-records', params).status_code, 400, params)
+
+
+class DtoConverterTest(TestCase):
+    """
+    The cached DtoConverter must build the same DTOs as auto_dataclass' FromOrmToDataclass.
+    """
+
+    def setUp(self):
+        parent = UserFactory(role=Role.PARENT.value)
+        children = ChildFactory.create_batch(2, parent_id=parent)
+        children.append(ChildFactory(parent_id=parent, clinician_id=None))
+        for child in children:
+            AdhdFactory(child_id=child)
+            QuestionnaireFactory(child_id=child)
+        self.converter = DtoConverter()
+
+    def test_to_dtos_matches_the_orm_converter(self):
+        """Test the DTOs built from '.values_list()' rows equal the ones converted from model instances"""
+        orm_converter = FromOrmToDataclass()
+        for model, dc in ((User, UserDto), (Child, ChildDto), (Adhd, AdhdDto), (Questionnaire, QuestionnaireDto)):
+            queryset = model.objects.order_by('pk')
+            expected = [orm_converter.to_dto(instance, dc) for instance in queryset]
+            self.assertEqual(self.converter.to_dtos(queryset, dc), expected)
+            self.assertEqual([self.converter.to_dto(instance, dc) for instance in queryset], expected)
+
+    def test_to_dtos_runs_a_single_query(self):
+        """Test the nested child, parent and clinician are read in the same query"""
+        with self.assertNumQueries(1):
+            adhd_records = self.converter.to_dtos(Adhd.objects.all(), AdhdDto)
+        self.assertEqual(len(adhd_records), 3)
+        self.assertEqual(sum(adhd.child_id.clinician_id is None for adhd in adhd_records), 1)
+
+    def test_dto_fields(self):
+        """Test the slotted DTOs are turned into a shallow dictionary of their fields"""
+        child = self.converter.to_dto(Child.objects.filter(clinician_id=None).get(), ChildDto)
+        self.assertFalse(hasattr(child, '__dict__'))
+        self.assertEqual(dto_fields(child), {'child_id': child.child_id, 'first_name': child.first_name,
+                                             'last_name': child.last_name, 'score': child.score,
+                                             'parent_id': child.parent_id, 'clinician_id': None})
+
+
+class DtoJsonTest(TestCase):
+    """
+    The read-side JSON of the listings must be byte-for-byte the one of the DRF output serializers.
+    """
+
+    def setUp(self):
+        self.parent = UserFactory(role=Role.PARENT.value, first_name='Ελένη \u2028')
+        children = ChildFactory.create_batch(2, parent_id=self.parent, score=7.125)
+        children.append(ChildFactory(parent_id=self.parent, clinician_id=None))
+        for child in children:
+            AdhdFactory(child_id=child, visual_motor_integration=0.1)
+            QuestionnaireFactory(child_id=child, comments=None)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.parent)
+
+    def test_same_bytes_as_the_drf_serializers(self):
+        """Test every output serializer renders the DTOs to the same bytes as DRF"""
+        converter = DtoConverter()
+        for model, dc, serializer_class in ((User, UserDto, UserDtoSerializer),
+                                            (Child, ChildDto, ChildSerializerWithUserDto),
+                                            (Adhd, AdhdDto, AdhdSerializerJsonOutput),
+                                            (Questionnaire, QuestionnaireDto, QuestionnaireSerializerJsonOutput)):
+            dtos = converter.to_dtos(model.objects.order_by('pk'), dc)
+            represent = dto_json_serializer(serializer_class).to_representation
+            self.assertEqual(render_json([represent(dto) for dto in dtos]),
+                             JSONRenderer().render(serializer_class(dtos, many=True).data))
+
+    def test_other_renderings_go_through_drf(self):
+        """Test a listing asked with an indentation is rendered by DRF, with the same content"""
+        compact = self.client.get('/users/questionnaires')
+        indented = self.client.get('/users/questionnaires', HTTP_ACCEPT='application/json; indent=2')
+        self.assertEqual(compact['Content-Type'], 'application/json')
+        self.assertIn(b'\\u2028', compact.content)
+        self.assertEqual(indented.json(), compact.json())
+        self.assertEqual(indented.data, compact.json())
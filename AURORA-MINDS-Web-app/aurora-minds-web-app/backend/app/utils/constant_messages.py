@@ -21,3 +21,7 @@ FAILED_TO_CREATE_QUESTIONNAIRE = "Failed to create questionnaire"
 FAILED_TO_UPDATE_QUESTIONNAIRE = "Failed to update questionnaire"
 FAILED_TO_RETRIEVE_QUESTIONNAIRES = "Failed to retrieve questionnaires"
 FAILED_TO_RETRIEVE_QUESTIONNAIRE = "Failed to retrieve questionnaire"
+# Pagination and projection
+INVALID_PAGE_CURSOR = "Invalid page cursor"
+INVALID_PAGE_LIMIT = "Page limit must be an integer between 1 and {}"
+INVALID_PROJECTION_FIELD = "Invalid field(s) requested: {}"
@@ -0,0 +1,107 @@
+import dataclasses
+from operator import itemgetter
+from types import UnionType
+from typing import Union, get_args, get_origin, get_type_hints
+
+from django.db.models import Model, QuerySet
+
+"""
+DTO conversion --> The field plan of every DTO type is resolved once, then reused for every row.
+Lists are read with a single '.values_list()' query and every row tuple is turned into its DTO
+by a builder prepared once for that DTO type, without loading model instances.
+"""
+
+# dataclass type --> ((field name, nested dataclass or None, default), ...)
+_field_plans = {}
+# dataclass type --> (the '.values_list()' paths, the 'row tuple --> DTO' builder)
+_row_plans = {}
+
+
+def _nested_dataclass(field_type):
+    # Optional[ChildDto] / ChildDto | None --> ChildDto
+    if get_origin(field_type) in (Union, UnionType):
+        field_type = next(arg for arg in get_args(field_type) if arg is not type(None))
+    return field_type if dataclasses.is_dataclass(field_type) else None
+
+
+def field_plan(dc: type) -> tuple:
+    plan = _field_plans.get(dc)
+    if plan is None:
+        hints = get_type_hints(dc)
+        plan = _field_plans[dc] = tuple((field.name, _nested_dataclass(hints[field.name]), field.default)
+                                        for field in dataclasses.fields(dc) if field.init)
+    return plan
+
+
+def _values_getter(indices: list):
+    # itemgetter() returns a single value, not a tuple, for a single index
+    if len(indices) == 1:
+        index = indices[0]
+        return lambda row: (row[index],)
+    return itemgetter(*indices) if indices else lambda row: ()
+
+
+def _row_builder(dc: type, prefix: str, paths: list):
+    indices, nested_builders = [], []
+    for position, (name, nested, _) in enumerate(field_plan(dc)):
+        # A nested object's own foreign key tells apart a null relation from a related row
+        indices.append(len(paths))
+        paths.append(prefix + name)
+        if nested is not None:
+            nested_builders.append((position, _row_builder(nested, f"{prefix}{name}__", paths)))
+    get_values = _values_getter(indices)
+    if not nested_builders:
+        return lambda row: dc(*get_values(row))
+
+    def build(row):
+        values = list(get_values(row))
+        for position, build_nested in nested_builders:
+            if values[position] is not None:
+                values[position] = build_nested(row)
+        return dc(*values)
+    return build
+
+
+def row_plan(dc: type) -> tuple:
+    plan = _row_plans.get(dc)
+    if plan is None:
+        paths = []
+        build = _row_builder(dc, '', paths)
+        plan = _row_plans[dc] = (tuple(paths), build)
+    return plan
+
+
+def dto_fields(dto) -> dict:
+    """
+    The fields of a DTO as a (shallow) dictionary, the DTOs have '__slots__' and no '__dict__'.
+    """
+    return {field.name: getattr(dto, field.name) for field in dataclasses.fields(dto)}
+
+
+class DtoConverter:
+    """
+    Drop-in replacement of auto_dataclass' FromOrmToDataclass, whose 'to_dto()' inspects the dataclass again
+    for every row (and of every nested object). The plans are cached per DTO type and shared by every instance.
+    """
+
+    @staticmethod
+    def to_dto(instance: Model, dc: type):
+        """
+        Convert a model instance (and its related instances, following the nested DTOs) to a DTO.
+        """
+        values = {}
+        for name, nested, default in field_plan(dc):
+            if default is dataclasses.MISSING:
+                value = getattr(instance, name)
+            else:
+                value = getattr(instance, name, default)
+            values[name] = value if nested is None or value is None else DtoConverter.to_dto(value, nested)
+        return dc(**values)
+
+    @staticmethod
+    def to_dtos(queryset: QuerySet, dc: type) -> list:
+        """
+        Convert every row of a queryset to a DTO, reading only the columns of the DTO (JOINs included).
+        """
+        paths, build = row_plan(dc)
+        return [build(row) for row in queryset.values_list(*paths)]
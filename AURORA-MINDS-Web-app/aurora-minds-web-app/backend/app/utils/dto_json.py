@@ -0,0 +1,156 @@
+import datetime
+import decimal
+from operator import attrgetter
+
+from django.http import HttpResponse
+from rest_framework import fields, serializers
+from rest_framework.fields import SkipField
+from rest_framework.compat import SHORT_SEPARATORS, LONG_SEPARATORS
+from rest_framework.relations import PKOnlyObject, RelatedField
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+from ..utils.pagination import Page, serialize_page
+
+"""
+Read-side JSON --> Render listings of DTOs straight to the bytes DRF would send, without its serializers.
+The fields of an output serializer are read once: its order, sources and per-type conversions are kept as a
+plan, then every DTO is turned into plain dicts by that plan and encoded by one preconfigured JSON encoder.
+"""
+
+# Same configuration as DRF's JSONRenderer without indentation
+_encoder = encoders.JSONEncoder(ensure_ascii=JSONRenderer.ensure_ascii, allow_nan=not JSONRenderer.strict,
+                                separators=SHORT_SEPARATORS if JSONRenderer.compact else LONG_SEPARATORS)
+
+
+def _decimal_converter(field: fields.DecimalField):
+    if (not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING) or field.localize
+            or field.normalize_output or field.decimal_places is None):
+        return field.to_representation
+    # DecimalField.quantize() builds the same exponent and context for every value
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return convert
+
+
+def _date_converter(field: fields.DateField):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != fields.ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        if type(value) is datetime.date:
+            return value.isoformat()
+        return field.to_representation(value)
+    return convert
+
+
+def _boolean_converter(field: fields.BooleanField):
+    def convert(value):
+        return value if value is True or value is False else field.to_representation(value)
+    return convert
+
+
+# Returned instead of the value of a field DRF would leave out of the representation
+_SKIPPED = object()
+
+
+def _drf_reader(field: fields.Field):
+    def read(instance):
+        try:
+            return field.get_attribute(instance)
+        except SkipField:
+            return _SKIPPED
+    return read
+
+
+# The field types whose 'to_representation()' is replaced by a plain conversion, unless a subclass overrides it
+_CONVERTERS = {
+    fields.CharField.to_representation: lambda field: str,
+    fields.IntegerField.to_representation: lambda field: int,
+    fields.FloatField.to_representation: lambda field: float,
+    fields.BooleanField.to_representation: _boolean_converter,
+    fields.DecimalField.to_representation: _decimal_converter,
+    fields.DateField.to_representation: _date_converter,
+}
+
+
+class DtoJsonSerializer:
+    """
+    The plan of an output serializer: for each readable field, in order, its name, how to read it from a DTO and
+    how to convert a non-null value. Nested serializers get their own plan, and any field it cannot
+    take over (related fields, custom sources or representations) is left to the field itself.
+    """
+
+    def __init__(self, serializer: serializers.Serializer):
+        self.plan = tuple(self.__field_plan(field) for field in serializer.fields.values() if not field.write_only)
+
+    def to_representation(self, dto) -> dict:
+        representation = {}
+        for name, read, convert in self.plan:
+            value = read(dto)
+            if value is None:
+                representation[name] = None
+            elif value is not _SKIPPED:
+                representation[name] = convert(value)
+        return representation
+
+    @staticmethod
+    def __field_plan(field: fields.Field) -> tuple:
+        if isinstance(field, RelatedField) or len(field.source_attrs) != 1:
+            # DRF's own path, e.g. a related field reads the primary key only
+            return field.field_name, _drf_reader(field), lambda attribute: (
+                None if isinstance(attribute, PKOnlyObject) and attribute.pk is None
+                else field.to_representation(attribute))
+        read = attrgetter(field.source_attrs[0])
+        if isinstance(field, serializers.Serializer) and \
+                type(field).to_representation is serializers.Serializer.to_representation:
+            return field.field_name, read, DtoJsonSerializer(field).to_representation
+        converter = _CONVERTERS.get(type(field).to_representation)
+        return field.field_name, read, converter(field) if converter else field.to_representation
+
+
+# serializer class --> its DtoJsonSerializer, built on first use (the fields of a ModelSerializer need the apps)
+_plans = {}
+
+
+def dto_json_serializer(serializer_class: type[serializers.Serializer]) -> DtoJsonSerializer:
+    plan = _plans.get(serializer_class)
+    if plan is None:
+        plan = _plans[serializer_class] = DtoJsonSerializer(serializer_class())
+    return plan
+
+
+def render_json(data) -> bytes:
+    """
+    Encode like DRF's JSONRenderer, \\u2028 and \\u2029 escaped included.
+    """
+    return _encoder.encode(data).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def json_response(request, result, serializer_class: type[serializers.Serializer], status: int = 200):
+    """
+    The response of a listing: a list of DTOs, or a Page of them. The same body as
+    'Response(serialize_page(result, serializer_class))', rendered without the serializer.
+    Any other negotiated rendering (browsable API, indented JSON) goes through DRF as before.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    if type(renderer) is not JSONRenderer or renderer.get_indent(request.accepted_media_type, {}) is not None:
+        return Response(serialize_page(result, serializer_class), status=status)
+    represent = dto_json_serializer(serializer_class).to_representation
+    if isinstance(result, Page):
+        items = result.items if result.rendered else [represent(dto) for dto in result.items]
+        data = {'results': items, 'next_cursor': result.next_cursor}
+    else:
+        data = [represent(dto) for dto in result]
+    return HttpResponse(render_json(data), status=status, content_type=renderer.media_type)
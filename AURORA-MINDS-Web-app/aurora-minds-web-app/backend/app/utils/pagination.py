@@ -0,0 +1,105 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+from ..utils.constant_messages import INVALID_PAGE_CURSOR, INVALID_PAGE_LIMIT
+from ..utils.exceptions import CustomException
+from ..utils.projection import Projection
+
+"""
+Keyset pagination --> '?limit=100' returns the first page and a 'next_cursor' token, '?cursor=<token>' the next one.
+Pages follow the primary key (WHERE pk > last pk ORDER BY pk), so a page costs the same wherever it is,
+and rows added or removed meanwhile never shift the following pages.
+"""
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+@dataclass
+class PageRequest:
+    after: Optional[int] = None  # the primary key the page starts after
+    limit: Optional[int] = None  # None --> every remaining row
+    projection: Optional[Projection] = None
+
+
+@dataclass
+class Page:
+    items: list
+    next_cursor: Optional[str] = None
+    rendered: bool = False  # the items are projected rows, already rendered, not DTOs
+
+
+def encode_cursor(last_pk: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({'after': last_pk}).encode()).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))['after']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise CustomException(INVALID_PAGE_CURSOR)
+    if not isinstance(after, int):
+        raise CustomException(INVALID_PAGE_CURSOR)
+    return after
+
+
+def page_request(query_params, serializer: serializers.Serializer) -> Optional[PageRequest]:
+    """
+    Read the 'limit', 'cursor' and 'fields' query parameters of a listing endpoint.
+    Returns None if none is given: the endpoint then answers with the whole list, as before.
+    """
+    limit, cursor, fields = (query_params.get(name) for name in ('limit', 'cursor', 'fields'))
+    if limit is None and cursor is None and fields is None:
+        return None
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise CustomException(INVALID_PAGE_LIMIT.format(MAX_PAGE_SIZE))
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            raise CustomException(INVALID_PAGE_LIMIT.format(MAX_PAGE_SIZE))
+    elif cursor is not None:
+        limit = DEFAULT_PAGE_SIZE
+    return PageRequest(after=decode_cursor(cursor) if cursor else None, limit=limit,
+                       projection=Projection(serializer, fields) if fields is not None else None)
+
+
+def paginate(queryset: QuerySet, page: PageRequest, to_dtos: Callable) -> Page:
+    """
+    Fetch one page of the queryset, ordered by primary key.
+    Without a projection the page is converted with 'to_dtos(queryset)', with one it is rendered from '.values()' rows.
+    One extra row is fetched to know whether there is a next page, without a COUNT query.
+    """
+    pk_name = queryset.model._meta.pk.name
+    queryset = queryset.order_by(pk_name)
+    if page.after is not None:
+        queryset = queryset.filter(**{f'{pk_name}__gt': page.after})
+    if page.projection is not None:
+        queryset = queryset.values(pk_name, *page.projection.value_paths())
+    queryset = queryset[:page.limit + 1] if page.limit is not None else queryset
+    rows = list(queryset) if page.projection is not None else to_dtos(queryset)
+    next_cursor = None
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        # The DTOs name their primary key like their model does
+        next_cursor = encode_cursor(last[pk_name] if page.projection is not None else getattr(last, pk_name))
+    if page.projection is not None:
+        return Page([page.projection.render(row) for row in rows], next_cursor, rendered=True)
+    return Page(rows, next_cursor)
+
+
+def serialize_page(result, serializer_class: type[serializers.Serializer]):
+    """
+    The response body of a listing: the serialized list, or '{"results": [...], "next_cursor": ...}' for a Page.
+    """
+    if not isinstance(result, Page):
+        return serializer_class(result, many=True).data
+    items = result.items if result.rendered else serializer_class(result.items, many=True).data
+    return {'results': items, 'next_cursor': result.next_cursor}
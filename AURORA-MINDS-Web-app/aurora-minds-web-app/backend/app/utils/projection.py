@@ -0,0 +1,85 @@
+from rest_framework import serializers
+
+from ..utils.constant_messages import INVALID_PROJECTION_FIELD
+from ..utils.exceptions import CustomException
+
+"""
+Projection --> Return only the requested fields of a read endpoint, e.g. '?fields=adhd_id,target,child_id.first_name'
+"""
+
+
+class Projection:
+    """
+    The requested subset of the fields of an output serializer.
+    Nested objects are selected with dotted paths ('child_id.parent_id.email'), or whole by their name ('child_id').
+    The fields are queried with '.values()' (JOINs included) instead of loading and converting whole rows,
+    and every value is rendered by the serializer's own field, so it looks exactly like in the full response.
+    """
+
+    def __init__(self, serializer: serializers.Serializer, fields: str):
+        self.serializer = serializer
+        self.tree = {}
+        for path in fields.split(','):
+            if path.strip():
+                self.__add_path(path.strip())
+        if not self.tree:
+            raise CustomException(INVALID_PROJECTION_FIELD.format(fields))
+
+    def value_paths(self) -> list[str]:
+        """
+        The ORM paths to pass to '.values()'. Every nested object also adds its own foreign key,
+        to tell apart a missing (null) object from an object whose requested fields are null.
+        """
+        return list(self.__value_paths(self.tree, ''))
+
+    def render(self, row: dict) -> dict:
+        """
+        Turn a '.values()' row into the nested representation of the requested fields.
+        """
+        return self.__render(row, self.tree, self.serializer, '')
+
+    def __add_path(self, path: str):
+        node, serializer = self.tree, self.serializer
+        names = path.split('.')
+        for i, name in enumerate(names):
+            field = serializer.fields.get(name)
+            if field is None or field.write_only:
+                raise CustomException(INVALID_PROJECTION_FIELD.format(path))
+            is_last = i == len(names) - 1
+            if not isinstance(field, serializers.BaseSerializer):
+                if not is_last:
+                    raise CustomException(INVALID_PROJECTION_FIELD.format(path))
+                node[name] = None
+                return
+            if is_last:
+                # The whole nested object
+                node[name] = self.__all_fields(field)
+                return
+            if node.get(name) is None:
+                node[name] = {}
+            node, serializer = node[name], field
+
+    def __all_fields(self, serializer: serializers.Serializer) -> dict:
+        return {name: self.__all_fields(field) if isinstance(field, serializers.BaseSerializer) else None
+                for name, field in serializer.fields.items() if not field.write_only}
+
+    def __value_paths(self, tree: dict, prefix: str):
+        for name, subtree in tree.items():
+            yield prefix + name
+            if subtree is not None:
+                yield from self.__value_paths(subtree, f"{prefix}{name}__")
+
+    def __render(self, row: dict, tree: dict, serializer: serializers.Serializer, prefix: str) -> dict:
+        representation = {}
+        # Keep the order of the serializer's fields, like the full response
+        for name, field in serializer.fields.items():
+            if name not in tree:
+                continue
+            value = row[prefix + name]
+            if value is None:
+                representation[name] = None
+            elif tree[name] is None:
+                representation[name] = field.to_representation(value)
+            else:
+                representation[name] = self.__render(row, tree[name], field, f"{prefix}{name}__")
+        return representation
@@ -4,7 +4,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from ..services.facades.user_child_adhd_service_facade_interface import UserChildAdhdServiceFacadeInterface
+from ..utils.dto_json import json_response
 from ..utils.exceptions import CustomException
+from ..utils.pagination import page_request
 from ..utils.serializers import AdhdSerializerJsonOutput
 
 
@@ -18,11 +20,13 @@ class UserChildAdhdViewSet(viewsets.ViewSet):
     def get_adhd_records(self, request):
         """
         Retrieve ADHD records for the authenticated user.
+        Optional query parameters: 'limit' and 'cursor' (keyset pagination), 'fields' (projection).
         """
         user_id = request.user.id
+        role = request.user.role
         try:
-            adhd_records = self.user_adhd_service_facade.get_adhd_records_for_user(user_id)
-            serializer = AdhdSerializerJsonOutput(adhd_records, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            page = page_request(request.query_params, AdhdSerializerJsonOutput())
+            adhd_records = self.user_adhd_service_facade.get_adhd_records_for_user(user_id, role, page)
+            return json_response(request, adhd_records, AdhdSerializerJsonOutput)
         except CustomException as e:
             return Response({"Message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -7,7 +7,9 @@ from ..models.dtos.child_dto import ChildDto
 from ..models.dtos.questionnaire_dto import QuestionnaireDto
 from ..services.facades.user_child_questionnaire_service_facade_interface import \
     UserChildQuestionnaireServiceFacadeInterface
+from ..utils.dto_json import json_response
 from ..utils.exceptions import CustomException
+from ..utils.pagination import page_request
 from ..utils.serializers import QuestionnaireSerializerJsonInput, QuestionnaireSerializerJsonOutput, \
     ChildSerializer
 
@@ -22,12 +24,14 @@ class UserChildQuestionnaireViewSet(viewsets.ViewSet):
     def get_questionnaires(self, request):
         """
         Retrieve all questionnaires for the authenticated user based on their role.
+        Optional query parameters: 'limit' and 'cursor' (keyset pagination), 'fields' (projection).
         """
         user_id = request.user.id
+        role = request.user.role
         try:
-            questionnaires = self.user_questionnaire_facade.get_questionnaires_by_user(user_id)
-            serializer = QuestionnaireSerializerJsonOutput(questionnaires, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            page = page_request(request.query_params, QuestionnaireSerializerJsonOutput())
+            questionnaires = self.user_questionnaire_facade.get_questionnaires_by_user(user_id, role, page)
+            return json_response(request, questionnaires, QuestionnaireSerializerJsonOutput)
         except CustomException as e:
             return Response({"Message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -6,7 +6,9 @@ from rest_framework.response import Response
 from ..models.dtos.child_dto import ChildDto
 from ..services.facades.user_child_service_facade_interface import UserChildServiceFacadeInterface
 from ..utils.constant_messages import CHILD_DELETED_SUCCESSFULLY
+from ..utils.dto_json import json_response
 from ..utils.exceptions import CustomException
+from ..utils.pagination import page_request
 from ..utils.serializers import ChildSerializer, ChildSerializerWithUserDto
 
 
@@ -20,13 +22,14 @@ class UserChildViewSet(viewsets.ViewSet):
     def list_children_by_user(self, request):
         """
         Retrieve children based on the logged-in user's role.
+        Optional query parameters: 'limit' and 'cursor' (keyset pagination), 'fields' (projection).
         """
         user_id = request.user.id
         role = request.user.role
         try:
-            children_dtos = self.user_child_service_facade.get_children_by_user_facade(user_id, role)
-            serializer = ChildSerializerWithUserDto(children_dtos, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            page = page_request(request.query_params, ChildSerializerWithUserDto())
+            children_dtos = self.user_child_service_facade.get_children_by_user_facade(user_id, role, page)
+            return json_response(request, children_dtos, ChildSerializerWithUserDto)
         except CustomException as e:
             return Response({"Message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -8,7 +8,9 @@ from ..models.dtos.user_dto import UserLoginDto
 from ..models.dtos.user_dto import UserRegistrationDto
 from ..services.user_service_interface import UserServiceInterface
 from ..utils.constant_messages import USER_CREATED_SUCCESSFULLY
+from ..utils.dto_json import json_response
 from ..utils.exceptions import CustomException
+from ..utils.pagination import page_request
 from ..utils.serializers import UserSerializer, LoginSerializer, UserDtoSerializer
 
 
@@ -81,12 +83,13 @@ class UserViewSet(viewsets.ViewSet):
     def list_users_by_role(self, request):
         """
         Retrieve users based on the role.
+        Optional query parameters: 'limit' and 'cursor' (keyset pagination), 'fields' (projection).
         """
         role = request.data.get('role')
         try:
-            users = self.user_service.get_users_by_role(role)
-            serializer = UserDtoSerializer(users, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            page = page_request(request.query_params, UserDtoSerializer())
+            users = self.user_service.get_users_by_role(role, page)
+            return json_response(request, users, UserDtoSerializer)
         except CustomException as e:
             return Response({"Message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -0,0 +1,104 @@
+"""
+Compare the compiled DtoConverter against auto_dataclass' FromOrmToDataclass, over the ADHD records listing.
+
+The rows are written to a throwaway test database (created and destroyed like 'manage.py test' does).
+Usage (from the backend folder):
+    python benchmarks/benchmark_dto_conversion.py --rows 10000
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from auto_dataclass.dj_model_to_dataclass import FromOrmToDataclass  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+from app.models.dtos.adhd_dto import AdhdDto  # noqa: E402
+from app.models.entities.adhd import Adhd  # noqa: E402
+from app.models.entities.child import Child  # noqa: E402
+from app.models.entities.user import User  # noqa: E402
+from app.utils.dto_converter import DtoConverter  # noqa: E402
+from app.utils.enums import Role  # noqa: E402
+
+CHILDREN = 100
+
+
+def populate(rows):
+    parent = User.objects.create(email='parent@example.com', first_name='Parent', last_name='Bench',
+                                 contact_number='0000000000', role=Role.PARENT.value)
+    clinician = User.objects.create(email='clinician@example.com', first_name='Clinician', last_name='Bench',
+                                    contact_number='0000000000', role=Role.CLINICIAN.value)
+    children = Child.objects.bulk_create(
+        Child(child_id=i + 1, first_name=f'Child{i}', last_name='Bench', score=Decimal('12.34'), parent_id=parent,
+              clinician_id=clinician if i % 2 else None) for i in range(CHILDREN))
+    scores = dict.fromkeys(('perception_1', 'fine_motor', 'pre_writing', 'spatial_orientation', 'perception_2',
+                            'cognitive_flexibility', 'attention_deficit', 'sustained_attention', 'target'),
+                           Decimal('5.5'))
+    Adhd.objects.bulk_create((Adhd(adhd_id=i + 1, visual_motor_integration=Decimal('1.23456789'),
+                                   child_id=children[i % CHILDREN], **scores) for i in range(rows)), batch_size=1000)
+    return parent
+
+
+def orm_listing(parent_id):
+    # The listing before the cached converter: model instances (JOINed), each converted by FromOrmToDataclass
+    converter = FromOrmToDataclass()
+    records = Adhd.objects.filter(child_id__parent_id=parent_id).select_related('child_id__parent_id',
+                                                                                 'child_id__clinician_id')
+    return [converter.to_dto(adhd, AdhdDto) for adhd in records.order_by('pk')]
+
+
+def cached_listing(parent_id):
+    records = Adhd.objects.filter(child_id__parent_id=parent_id)
+    return DtoConverter().to_dtos(records.order_by('pk'), AdhdDto)
+
+
+def best_of(func, argument, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(argument)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"{'rows':>8} {'orm (s)':>10} {'orm conv (s)':>13} {'cached (s)':>13} {'speedup':>8}")
+        for rows in args.rows:
+            Adhd.objects.all().delete()
+            Child.objects.all().delete()
+            User.objects.all().delete()
+            parent = populate(rows)
+            orm_time, expected = best_of(orm_listing, parent.id, args.repeat)
+            # The conversion alone, on instances already loaded
+            instances = list(Adhd.objects.select_related('child_id__parent_id', 'child_id__clinician_id')
+                             .order_by('pk'))
+            conversion_time, _ = best_of(lambda items: [FromOrmToDataclass().to_dto(adhd, AdhdDto) for adhd in items],
+                                         instances, args.repeat)
+            cached_time, actual = best_of(cached_listing, parent.id, args.repeat)
+            assert actual == expected
+            print(f"{rows:>8} {orm_time:>10.4f} {conversion_time:>13.4f} {cached_time:>13.4f} "
+                  f"{orm_time / cached_time:>7.1f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
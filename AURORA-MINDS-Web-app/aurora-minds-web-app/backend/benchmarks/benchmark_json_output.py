@@ -0,0 +1,91 @@
+"""
+Compare the read-side JSON rendering of the listings against the DRF output serializers and JSONRenderer.
+
+The DTOs are built in memory, no database is needed.
+Usage (from the backend folder):
+    python benchmarks/benchmark_json_output.py --records 1000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from app.models.dtos.adhd_dto import AdhdDto  # noqa: E402
+from app.models.dtos.child_dto import ChildDto  # noqa: E402
+from app.models.dtos.questionnaire_dto import QuestionnaireDto  # noqa: E402
+from app.models.dtos.user_dto import UserDto  # noqa: E402
+from app.utils.dto_json import dto_json_serializer, render_json  # noqa: E402
+from app.utils.enums import Role  # noqa: E402
+from app.utils.serializers import (  # noqa: E402
+    AdhdSerializerJsonOutput, ChildSerializerWithUserDto, QuestionnaireSerializerJsonOutput)
+
+CHILDREN = 100
+
+
+def make_children():
+    parent = UserDto('parent@example.com', 'Parent', 'Bench', '0000000000', Role.PARENT.value, 1)
+    clinician = UserDto('clinician@example.com', 'Clinician', 'Bench', '0000000000', Role.CLINICIAN.value, 2)
+    return [ChildDto(i + 1, f'Child{i}', 'Bench', Decimal('12.34'), parent, clinician if i % 2 else None)
+            for i in range(CHILDREN)]
+
+
+def make_dtos(kind, records):
+    children = make_children()
+    if kind == 'children':
+        return [children[i % CHILDREN] for i in range(records)]
+    if kind == 'adhd':
+        return [AdhdDto(i + 1, *[Decimal('5.5')] * 3, Decimal('1.23456789'), *[Decimal('5.5')] * 6,
+                        children[i % CHILDREN]) for i in range(records)]
+    return [QuestionnaireDto('Female', Decimal('30.50'), Decimal('1.30'), date(2016, 5, 17), True, 'Αθήνα',
+                             'Attica', 'School', 'Grade 3', 'A', True, None, *[False] * 8, children[i % CHILDREN],
+                             i + 1)
+            for i in range(records)]
+
+
+SERIALIZERS = {
+    'children': ChildSerializerWithUserDto,
+    'adhd': AdhdSerializerJsonOutput,
+    'questionnaires': QuestionnaireSerializerJsonOutput,
+}
+
+
+def best_of(func, dtos, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(dtos)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, nargs="+", default=[1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'listing':>15} {'records':>8} {'drf (s)':>10} {'dto json (s)':>13} {'speedup':>8}")
+    for kind, serializer_class in SERIALIZERS.items():
+        represent = dto_json_serializer(serializer_class).to_representation
+        for records in args.records:
+            dtos = make_dtos(kind, records)
+            drf_time, expected = best_of(
+                lambda items: JSONRenderer().render(serializer_class(items, many=True).data), dtos, args.repeat)
+            fast_time, actual = best_of(lambda items: render_json([represent(dto) for dto in items]), dtos, args.repeat)
+            assert actual == expected
+            print(f"{kind:>15} {records:>8} {drf_time:>10.4f} {fast_time:>13.4f} {drf_time / fast_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,97 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory, redirect, url_for
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, redirect, url_for
 import os
 import json
-import time
 import threading
+import time
 from flask_cors import CORS
-import requests
 from flask_socketio import SocketIO
 
+from async_aggregation import ASYNC_MODES, DEFAULT_MAX_STALENESS, AsyncAggregator
+from aggregation import AGGREGATORS, MEAN, ShardedAggregator, check_weight, robust_aggregate_state_dicts
+from broadcast import broadcast_model
+from chunked_upload import DEFAULT_SESSION_TTL, ChunkedUploads, ChunkOffsetError
+from client_registry import DEFAULT_BACKOFF, DEFAULT_MAX_FAILURES, ClientRegistry
+from delta import COMPRESSIONS, apply_delta, decode_delta, encode_delta, is_delta
+from model_format import (JSON_MEDIA_TYPE, MEDIA_TYPE, as_stored, decode_state_dict, encode_state_dict,
+                          is_binary_media_type)
+from metrics import Metrics
+from model_cache import GlobalModelCache
+from model_store import ModelStore, map_file
+from privacy import DEFAULT_DELTA, GaussianMechanism, PrivacyAccountant
+from round_state import RoundState, StaleRoundError
+
 app = Flask(__name__)
 CORS(app)
 socketio = SocketIO(app)
 
 local_models_folder = "local_models"
 global_models_folder = "global_models"
-client_files = {}
-num_clients = 0
-
-# Ensure the folders exist
-os.makedirs(local_models_folder, exist_ok=True)
-os.makedirs(global_models_folder, exist_ok=True)
+model_file_extensions = {JSON_MEDIA_TYPE: ".json", MEDIA_TYPE: ".bin"}
+# Creates the folders if they do not exist
+model_store = ModelStore(local_models_folder, global_models_folder)
+# Partial files of the chunked uploads in progress
+chunked_uploads = ChunkedUploads(
+    "partial_uploads", ttl=float(os.environ.get('FEDAURORA_UPLOAD_TTL', DEFAULT_SESSION_TTL)))
+# Addresses, last deliveries and failures of the clients, kept across restarts. Owns the keep-alive
+# session of the broadcasts, backs off clients whose delivery failed and evicts the dead ones
+client_registry = ClientRegistry(
+    "clients.json", max_failures=int(os.environ.get('FEDAURORA_CLIENT_MAX_FAILURES', DEFAULT_MAX_FAILURES)),
+    backoff=float(os.environ.get('FEDAURORA_CLIENT_BACKOFF', DEFAULT_BACKOFF)))
+# Shared state of the current round, safe to use from every request thread.
+# Round IDs continue from the history of global models, the N-th round produces averaged_model_round_N
+round_state = RoundState(round_id=(model_store.latest_global_round() or 0) + 1, registry=client_registry)
+# Serialized payloads of the latest global model, served by GET /global_model without reading the disk
+global_model_cache = GlobalModelCache(load_latest=lambda: latest_global_payloads())
+# Timing spans, payload sizes and delivery latencies of the recent rounds, for /metrics and /round_report
+metrics = Metrics()
+# With more than one worker, uploads are only stored and every round is summed on a pool of processes,
+# otherwise models are folded into the round's running sum as they arrive
+aggregation_workers = int(os.environ.get('FEDAURORA_AGGREGATION_WORKERS', 0))
+sharded_aggregator = ShardedAggregator(aggregation_workers) if aggregation_workers > 1 else None
+# mean (FedAvg), or a robust aggregator bounding the influence of corrupted or poisoned clients:
+# median, trimmed_mean or krum. These need every model of the round, so uploads are only stored
+aggregator_name = os.environ.get('FEDAURORA_AGGREGATOR', MEAN)
+if aggregator_name not in AGGREGATORS:
+    raise ValueError(f"Unknown FEDAURORA_AGGREGATOR {aggregator_name}, expected one of {', '.join(AGGREGATORS)}.")
+robust_options = {'trim_fraction': float(os.environ.get('FEDAURORA_TRIM_FRACTION', 0.1))}
+if os.environ.get('FEDAURORA_BYZANTINE_CLIENTS'):
+    robust_options['num_byzantine'] = int(os.environ['FEDAURORA_BYZANTINE_CLIENTS'])
+# Uploads are folded into the round's running sum only when nothing else reads the stored models
+fold_on_upload = sharded_aggregator is None and aggregator_name == MEAN
+# Differential privacy: client updates are clipped on upload and the aggregate gets Gaussian noise
+privacy_stage = None
+if os.environ.get('FEDAURORA_DP_NOISE_MULTIPLIER'):
+    if aggregator_name != MEAN:
+        raise ValueError("Differential privacy noise is calibrated for the mean aggregator only.")
+    privacy_stage = GaussianMechanism(
+        clip_norm=float(os.environ.get('FEDAURORA_DP_CLIP_NORM', 1.0)),
+        noise_multiplier=float(os.environ['FEDAURORA_DP_NOISE_MULTIPLIER']),
+        seed=int(os.environ['FEDAURORA_DP_SEED']) if os.environ.get('FEDAURORA_DP_SEED') else None,
+        accountant=PrivacyAccountant(delta=float(os.environ.get('FEDAURORA_DP_DELTA', DEFAULT_DELTA))))
+# Asynchronous aggregation (fedasync or fedbuff): every upload moves the global model right away and the
+# global version, the number of the latest global model, advances continuously. Rounds are not used
+async_aggregator = None
+if os.environ.get('FEDAURORA_ASYNC'):
+    if aggregator_name != MEAN or privacy_stage is not None or sharded_aggregator is not None:
+        raise ValueError("Asynchronous aggregation cannot be combined with robust aggregators, differential "
+                         "privacy or aggregation workers.")
+    if os.environ['FEDAURORA_ASYNC'] not in ASYNC_MODES:
+        raise ValueError(f"Unknown FEDAURORA_ASYNC {os.environ['FEDAURORA_ASYNC']}, "
+                         f"expected one of {', '.join(ASYNC_MODES)}.")
+    latest_version = model_store.latest_global_round()
+    async_aggregator = AsyncAggregator(
+        mode=os.environ['FEDAURORA_ASYNC'],
+        alpha=float(os.environ.get('FEDAURORA_ASYNC_ALPHA', 0.5)),
+        staleness_exponent=float(os.environ.get('FEDAURORA_STALENESS_EXPONENT', 0.5)),
+        buffer_size=int(os.environ.get('FEDAURORA_BUFFER_SIZE', 10)),
+        max_staleness=int(os.environ.get('FEDAURORA_MAX_STALENESS', DEFAULT_MAX_STALENESS)),
+        model=model_store.load_global()[0] if latest_version else None,
+        version=latest_version or 0,
+        load_version=lambda version: load_global_version(version)[0])
+# Serializes the asynchronous updates, so versions are published in order
+async_lock = threading.Lock()
+# Held while a series of rounds is running, a second /start_aggregation does not start another one
+rounds_lock = threading.Lock()
 
 @app.route('/')
 def index():
@@ -30,125 +103,465 @@ def logo():
 
 @app.route('/start_aggregation', methods=['POST'])
 def start_aggregation():
-    global num_clients
-    num_clients = int(request.form['num_clients'])
-    threading.Thread(target=wait_for_clients).start()
-    return render_template('waiting.html', num_clients=num_clients)
-
-def wait_for_clients():
-    global num_clients
-    received_files = 0
-    while received_files < num_clients:
-        files = os.listdir(local_models_folder)
-        received_files = len(files)
-        update_clients_status(received_files)
-        time.sleep(1)
-    aggregate_models()
-
-def update_clients_status(received_files):
+    rounds = round_options(request.form)
+    if rounds_lock.acquire(blocking=False):
+        threading.Thread(target=run_rounds, args=rounds).start()
+    return render_template('waiting.html', num_clients=rounds[0])
+
+def round_options(form):
+    """``(num_clients, num_rounds, quorum, round_timeout)`` from the start page form."""
+    num_clients = int(form['num_clients'])
+    # Optional, the defaults run a single round that waits for every client (the one-shot mode)
+    num_rounds = int(form.get('num_rounds') or 1)
+    quorum = float(form.get('quorum') or 100) / 100
+    round_timeout = float(form['round_timeout']) if form.get('round_timeout') else None
+    return num_clients, num_rounds, quorum, round_timeout
+
+def run_rounds(num_clients, num_rounds, quorum=1.0, round_timeout=None):
+    try:
+        for _ in range(num_rounds):
+            status = round_state.start(num_clients, quorum=quorum, timeout=round_timeout)
+            metrics.start_round(status['round_id'])
+            update_clients_status(status)
+            # Woken up by the /upload handler the moment the last expected client arrives, or at the deadline
+            if not round_state.wait_for_round():
+                status = round_state.snapshot()
+                print(f"Round {status['round_id']} failed: {status['received']}/{status['total']} models "
+                      f"received, at least {status['required']} needed")
+                reset_local_models_folder()
+                # The round ID is not used up, the next run retries it
+                round_state.finish(next_round_id=status['round_id'])
+                metrics.finish_round(status['round_id'], status='failed')
+                event_emitter('round_failed', status)
+                return
+            aggregate_models()
+        event_emitter('aggregation_complete')
+    finally:
+        rounds_lock.release()
+
+def emit_event(event, *args):
     with app.app_context():
-        socketio.emit('update_status', {'received': received_files, 'total': num_clients})
+        socketio.emit(event, *args)
+
+# Round events and model broadcasts go through these, the ASGI server (FedAuroraAsync.py) plugs in its own
+event_emitter = emit_event
+model_broadcaster = broadcast_model
+
+def update_clients_status(status):
+    event_emitter('update_status', status)
 
 def aggregate_models():
-    files = os.listdir(local_models_folder)
-    state_dicts = [load_state_dict_from_json(os.path.join(local_models_folder, file)) for file in files]
-    average_model = average_state_dicts(state_dicts)
-    averaged_model_name = os.path.join(global_models_folder, "averaged_model.json")
-    with open(averaged_model_name, "w") as f:
-        json.dump(average_model, f)
-    send_global_model_to_clients()
-    reset_local_models_folder()
-    with app.app_context():
-        socketio.emit('aggregation_complete')
-    return
-
-def load_state_dict_from_json(json_file_path):
-    with open(json_file_path, "r") as f:
-        state_dict_serializable = json.load(f)
-    return state_dict_serializable
-
-def average_state_dicts(state_dicts):
-    avg_state_dict = {}
-    for k, v in state_dicts[0].items():
-        if isinstance(v, list):
-            if isinstance(v[0], list):
-                avg_state_dict[k] = [[0.0] * len(v[0]) for _ in v]
+    # Waits for the uploads in flight, the sealed round is not written to anymore
+    sealed_round = round_state.seal()
+    round_id = sealed_round.round_id
+    round_number = None
+    try:
+        with metrics.span(round_id, 'aggregate'):
+            if aggregator_name != MEAN:
+                state_dicts = [model_store.load_local(client_id)[0] for client_id in sorted(sealed_round.received)]
+                average_model = robust_aggregate_state_dicts(state_dicts, aggregator_name, **robust_options)
+            elif sharded_aggregator is not None:
+                paths = [model_store.stored_local_path(client_id) for client_id in sorted(sealed_round.received)]
+                average_model = sharded_aggregator.average(paths)
             else:
-                avg_state_dict[k] = [0.0] * len(v)
+                # Client models were already folded into the running sum on upload, only the division is left
+                average_model = sealed_round.aggregator.average()
+            metadata = {'num_clients': len(sealed_round.received), 'round_id': round_id}
+            if privacy_stage is not None:
+                weights = [model_store.load_local(client_id)[1].get('weight', 1.0)
+                           for client_id in sealed_round.received]
+                average_model = privacy_stage.add_noise(average_model, weights)
+                metadata['privacy'] = privacy_report()
+        with metrics.span(round_id, 'persist'):
+            round_number, payloads = publish_global_model(average_model, metadata)
+        with metrics.span(round_id, 'broadcast'):
+            deliveries = send_global_model_to_clients(payloads, round_number, average_model)
+        metrics.record_deliveries(round_id, deliveries)
+        # Uploads are still rejected until the round is finished, so only this round's models are deleted
+        model_store.clear_local()
+    except Exception:
+        fail_aggregation(round_id, round_number)
+        raise
+    round_state.finish(next_round_id=round_number + 1)
+    metrics.finish_round(round_id)
+    event_emitter('round_complete', {'round': round_number, 'deliveries': [d.to_dict() for d in deliveries],
+                                     'privacy': privacy_report()})
+    return round_number
+
+def fail_aggregation(round_id, round_number=None):
+    """
+    Release a round whose aggregation raised, otherwise it would stay sealed: every upload rejected and
+    /reset waiting for good. The round ID is retried, unless its global model was already published.
+    """
+    try:
+        # Only the models of the failed round are there, uploads are still rejected
+        model_store.clear_local()
+    except OSError as e:
+        print(f"Failed to delete the local models of round {round_id}: {e}")
+    status = round_state.finish(next_round_id=round_number + 1 if round_number is not None else round_id)
+    metrics.finish_round(round_id, status='failed')
+    print(f"Round {round_id} failed during aggregation")
+    event_emitter('round_failed', status)
+
+def publish_global_model(model, metadata):
+    """Store a new global model, returns its round number and its serialized payloads per Content-Type."""
+    # Serialized once per format, the same bytes are written to disk and pushed to every client
+    payloads = {JSON_MEDIA_TYPE: json.dumps(model).encode("utf-8"), MEDIA_TYPE: encode_state_dict(model)}
+    round_number = model_store.save_global(
+        model, {model_file_extensions[media_type]: payload for media_type, payload in payloads.items()},
+        metadata=metadata)
+    global_model_cache.update(round_number, payloads)
+    return round_number, payloads
+
+def load_global_version(version):
+    """``(state_dict, metadata)`` of a stored global model, StaleRoundError if it is not stored."""
+    try:
+        if version < 1:
+            raise FileNotFoundError
+        return model_store.load_global(version)
+    except FileNotFoundError:
+        raise StaleRoundError(f"Global model version {version} is not stored.")
+
+def privacy_report():
+    if privacy_stage is None:
+        return None
+    return dict(privacy_stage.accountant.snapshot(), clip_norm=privacy_stage.clip_norm,
+                noise_multiplier=privacy_stage.noise_multiplier)
+
+def clip_to_global_model(data):
+    """Clip the update of a client against the latest global model, the one it trained from."""
+    try:
+        base, _ = model_store.load_global()
+    except FileNotFoundError:
+        # Without a base there is no update to bound, a whole model cannot be clipped
+        raise ValueError("Differential privacy needs an initial global model to clip the updates against, "
+                         "set FEDAURORA_DP_INITIAL_MODEL.") from None
+    return privacy_stage.clip(data, base)
+
+def send_global_model_to_clients(payloads, round_number, average_model=None):
+    clients, skipped = client_registry.targets()
+    if skipped:
+        print(f"Skipping clients backing off after failed deliveries: {', '.join(skipped)}")
+    addresses = {client_id: client['address'] for client_id, client in clients.items()}
+    media_types = {client_id: client['media_type'] for client_id, client in clients.items()}
+    client_payloads = delta_payloads(clients, round_number, average_model) if average_model is not None else {}
+    # Clients tag their next upload with the following round ID
+    deliveries = model_broadcaster(addresses, payloads, content_types=media_types, session=client_registry.session,
+                                   client_payloads=client_payloads,
+                                   headers={'X-FedAurora-Round': str(round_number)})
+    for delivery in deliveries:
+        if delivery.success:
+            print(f"Sent model to client {delivery.client_id} in {delivery.elapsed:.3f}s")
         else:
-            avg_state_dict[k] = 0.0
-    for state_dict in state_dicts:
-        for k, v in state_dict.items():
-            if isinstance(v, list):
-                if isinstance(v[0], list):
-                    for i in range(len(v)):
-                        for j in range(len(v[i])):
-                            avg_state_dict[k][i][j] += v[i][j]
-                else:
-                    for i in range(len(v)):
-                        avg_state_dict[k][i] += v[i]
-            else:
-                avg_state_dict[k] += v
-    for k, v in avg_state_dict.items():
-        if isinstance(v, list):
-            if isinstance(v[0], list):
-                for i in range(len(v)):
-                    for j in range(len(v[i])):
-                        avg_state_dict[k][i][j] /= len(state_dicts)
-            else:
-                avg_state_dict[k] = [x / len(state_dicts) for x in v]
+            print(f"Failed to send model to client {delivery.client_id} after {delivery.attempts} attempts "
+                  f"({delivery.elapsed:.3f}s): {delivery.error}")
+    for client_id in client_registry.record_deliveries(deliveries, round_number):
+        print(f"Evicted client {client_id} after {client_registry.max_failures} failed deliveries in a row")
+    return deliveries
+
+def delta_payloads(clients, round_number, average_model):
+    """
+    Deltas against the previous global round for the clients that asked for them and are known to hold
+    that round, encoded once per compression. The other clients get the full model.
+    """
+    base_round = round_number - 1
+    compressions = {client_id: client['accept_delta'] for client_id, client in clients.items()
+                    if client['accept_delta'] and client['delivered_round'] == base_round}
+    if not compressions:
+        return {}
+    base, _ = model_store.load_global(base_round)
+    encoded = {compression: encode_delta(average_model, base, compression, base_round=base_round)
+               for compression in set(compressions.values())}
+    return {client_id: (MEDIA_TYPE, encoded[compression], {'X-FedAurora-Base-Round': str(base_round)})
+            for client_id, compression in compressions.items()}
+
+def decode_upload(body):
+    """Decode a binary upload, rebuilding the full model if the client sent a delta against a global round."""
+    # The tensors are read as views on the request body, without parsing
+    data, metadata = decode_state_dict(body, with_metadata=True)
+    if not is_delta(metadata):
+        return data
+    base_round = metadata.get('base_round')
+    if not isinstance(base_round, int) or base_round < 1:
+        raise ValueError("Delta upload without the global round it is based on.")
+    try:
+        base, _ = model_store.load_global(base_round)
+    except FileNotFoundError:
+        raise StaleRoundError(f"Delta against global round {base_round}, which is not stored.")
+    return apply_delta(base, decode_delta(data, metadata))
+
+def parse_upload(body, media_type):
+    if media_type == MEDIA_TYPE:
+        return decode_upload(body)
+    return json.loads(body)
+
+def upload_params(args, media_type):
+    """The /upload query parameters, validated, shared by single-request and chunked uploads."""
+    # Optional compression (float16, int8 or topk) of the deltas the client wants instead of full models
+    accept_delta = args.get('accept_delta')
+    if accept_delta is not None and accept_delta not in COMPRESSIONS:
+        raise ValueError(f"Unknown delta compression {accept_delta}, expected one of {', '.join(COMPRESSIONS)}.")
+    # Optional ID of the round the model was trained for, uploads for another round are rejected
+    round_id = args.get('round_id')
+    # Asynchronous mode: the global version the client trained from, the latest one by default
+    base_version = args.get('base_version')
+    return {'client_id': args.get('client_id'),
+            'client_address': args.get('client_address'),
+            'media_type': media_type,
+            'round_id': int(round_id) if round_id else None,
+            'base_version': int(base_version) if base_version else None,
+            'accept_delta': accept_delta,
+            # Optional FedAvg weight, usually the number of training samples the client holds
+            'weight': check_weight(args.get('num_samples', args.get('weight', 1.0)))}
+
+def accept_model(data, client_id, client_address, media_type, round_id, accept_delta, weight, base_version=None,
+                 stats=None):
+    """
+    Add an uploaded model to the current round and store it. ``stats`` are the ``nbytes`` of the upload and
+    the seconds spent to ``receive`` and ``parse`` it, recorded for the round it is accepted into.
+    """
+    if async_aggregator is not None:
+        return accept_async_update(data, client_id, base_version, weight)
+    if privacy_stage is not None:
+        data = clip_to_global_model(data)
+    with round_state.upload(client_id, round_id, client_address, media_type, accept_delta) as current_round:
+        if not fold_on_upload:
+            current_round.check_signature(data)
+            save_processed_data(client_id, data, weight)
         else:
-            avg_state_dict[k] /= len(state_dicts)
-    return avg_state_dict
-
-def send_global_model_to_clients():
-    global client_files
-    averaged_model_path = os.path.join(global_models_folder, "averaged_model.json")
-    with open(averaged_model_path, "r") as f:
-        averaged_model = json.load(f)
-    for client_id, client_address in client_files.items():
-        response = requests.post(f"{client_address}/receive_model", json=averaged_model)
-        if response.status_code != 200:
-            print(f"Failed to send model to client {client_id}: {response.text}")
+            fold_and_save(current_round.aggregator, client_id, data, weight)
+    if stats is not None:
+        metrics.record_upload(current_round.round_id, client_id, **stats)
+    update_clients_status(round_state.snapshot())
+
+def fold_and_save(aggregator, client_id, data, weight):
+    """
+    Fold a model into the running sum of the round and store it. The sum gets the model as it is stored, so a
+    re-upload takes out exactly what the stored previous model added, and a model that could not be stored
+    is taken out of the sum again.
+    """
+    previous = previous_weight = None
+    if aggregator.has_client(client_id):
+        # A re-upload replaces the previous model of this client in the running sum
+        previous, _ = model_store.load_local(client_id)
+        previous_weight = aggregator.weight(client_id)
+    stored = as_stored(data)
+    aggregator.add(client_id, stored, weight=weight, replaces=previous)
+    try:
+        save_processed_data(client_id, data, weight)
+    except BaseException:
+        # The previous model file is left as it was, and counts again
+        aggregator.remove(client_id, stored)
+        if previous is not None:
+            aggregator.add(client_id, previous, weight=previous_weight)
+        raise
+
+def accept_async_update(data, client_id, base_version, weight):
+    """Merge an update into the global model, and publish the new version if it advanced."""
+    with async_lock:
+        version, staleness = async_aggregator.submit(data, base_version, weight)
+        if version is not None:
+            publish_global_model(async_aggregator.model(), {'mode': async_aggregator.mode, 'version': version})
+            # Every update adds a version to the history, only the ones an update can still be based on are kept
+            model_store.prune_global(async_aggregator.oldest_version())
+    print(f"Update of client {client_id} merged with staleness {staleness}, global version {async_aggregator.version}")
+    event_emitter('model_updated', {'version': async_aggregator.version, 'buffered': async_aggregator.buffered,
+                                    'client_id': client_id, 'staleness': staleness})
+
+def latest_global_payloads():
+    """``(version, payloads)`` of the latest stored global model, serialized once per Content-Type."""
+    model, metadata = model_store.load_global()
+    return metadata['round'], {JSON_MEDIA_TYPE: json.dumps({k: v.tolist() for k, v in model.items()}).encode("utf-8"),
+                               MEDIA_TYPE: encode_state_dict(model)}
+
+@app.route('/global_model', methods=['GET'])
+def global_model():
+    """
+    The latest global model, binary if the Accept header asks for it and gzipped if Accept-Encoding allows it,
+    with its version in X-FedAurora-Round and an ETag: 304 without a body if If-None-Match lists it.
+    """
+    try:
+        status, payload, headers = global_model_cache.respond(
+            request.headers.get('Accept'), request.headers.get('Accept-Encoding'),
+            request.headers.get('If-None-Match'))
+    except FileNotFoundError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 404
+    return Response(payload, status=status, headers=headers)
 
 @app.route('/upload', methods=['POST'])
 def upload():
-    global client_files
-    client_id = request.args.get('client_id')
-    client_address = request.args.get('client_address')
-    filename = f"{client_id}_model.json"
-    client_files[client_id] = client_address
-    data = request.json
-    save_processed_data(data, filename)
+    media_type = MEDIA_TYPE if is_binary_media_type(request.mimetype) else JSON_MEDIA_TYPE
+    try:
+        params = upload_params(request.args, media_type)
+        start = time.perf_counter()
+        body = request.get_data()
+        received = time.perf_counter()
+        data = parse_upload(body, media_type)
+        stats = {'nbytes': len(body), 'receive': received - start, 'parse': time.perf_counter() - received}
+        accept_model(data, stats=stats, **params)
+    except StaleRoundError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 400
     return jsonify({"message": "Data uploaded successfully."}), 200
 
-def save_processed_data(data, filename):
-    full_path = os.path.join(local_models_folder, filename)
-    with open(full_path, "w") as f:
-        json.dump(data, f)
+@app.route('/uploads', methods=['POST'])
+def create_chunked_upload():
+    """
+    Open a chunked upload. Takes the /upload query parameters plus ``size`` and ``checksum`` (SHA-256 hex)
+    of the whole body, and the Content-Type the body will be in (``content_type``, binary by default).
+    """
+    try:
+        session = open_chunked_upload(request.args)
+    except StaleRoundError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 400
+    return jsonify(session.to_dict()), 201
+
+def open_chunked_upload(args):
+    media_type = JSON_MEDIA_TYPE if args.get('content_type') == JSON_MEDIA_TYPE else MEDIA_TYPE
+    params = upload_params(args, media_type)
+    # Rejected before any chunk is sent
+    round_state.check_upload(params['round_id'])
+    return chunked_uploads.create(int(args.get('size') or 0), args.get('checksum'), params)
+
+def complete_chunked_upload(session):
+    """Verify a complete chunked upload and accept the model read from it."""
+    try:
+        path = chunked_uploads.verify(session.upload_id)
+        start = time.perf_counter()
+        if session.params['media_type'] == MEDIA_TYPE:
+            # The tensors are views on the mapped partial file, the body is never read into memory whole
+            data = decode_upload(map_file(path))
+        else:
+            with open(path, "rb") as f:
+                data = json.load(f)
+        stats = {'nbytes': session.total_size, 'parse': time.perf_counter() - start}
+        accept_model(data, stats=stats, **session.params)
+    finally:
+        # Complete uploads are not resumed, whether the model was accepted or not
+        chunked_uploads.discard(session.upload_id)
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    try:
+        return jsonify(chunked_uploads.get(upload_id).to_dict()), 200
+    except KeyError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 404
+
+@app.route('/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Receive the chunk starting at ``offset``, with its SHA-256 hex in the X-FedAurora-Chunk-Checksum header."""
+    try:
+        session = chunked_uploads.write_chunk(upload_id, request.args.get('offset', type=int), request.stream,
+                                              request.content_length,
+                                              request.headers.get('X-FedAurora-Chunk-Checksum'))
+    except KeyError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 404
+    except ChunkOffsetError as e:
+        return jsonify({'status': 'error', 'error': str(e), 'offset': e.offset}), 409
+    except ValueError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 400
+    if not session.complete:
+        return jsonify(session.to_dict()), 200
+    try:
+        complete_chunked_upload(session)
+    except StaleRoundError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 400
+    return jsonify(dict(session.to_dict(), message="Data uploaded successfully.")), 200
+
+def save_processed_data(client_id, data, weight):
+    full_path = model_store.save_local(client_id, data, metadata={'weight': weight})
     print(f"Data saved successfully to {full_path}")
 
 @app.route('/reset', methods=['POST'])
 def reset():
     reset_local_models_folder()
-    with app.app_context():
-        socketio.emit('server_reset')
+    event_emitter('server_reset')
     return jsonify({"message": "Local models folder reset successfully."}), 200
 
 def reset_local_models_folder():
-    for filename in os.listdir(local_models_folder):
-        file_path = os.path.join(local_models_folder, filename)
-        if os.path.isfile(file_path):
-            os.unlink(file_path)
+    round_state.reset(clear=model_store.clear_local)
+
+def load_existing_local_models():
+    # Models left in the folder by a previous run still count towards the round
+    for client_id in model_store.local_client_ids():
+        state_dict, metadata = model_store.load_local(client_id)
+        with round_state.upload(client_id) as current_round:
+            if not fold_on_upload:
+                current_round.check_signature(state_dict)
+            else:
+                current_round.aggregator.add(client_id, state_dict, weight=metadata.get('weight', 1.0))
+
+def publish_initial_model():
+    # With differential privacy the first round needs a global model to clip the client updates against
+    path = os.environ.get('FEDAURORA_DP_INITIAL_MODEL')
+    if privacy_stage is None or not path or model_store.latest_global_round():
+        return
+    with open(path, 'rb') as f:
+        body = f.read()
+    model = parse_upload(body, JSON_MEDIA_TYPE if path.endswith('.json') else MEDIA_TYPE)
+    round_number, _ = publish_global_model(model, {'initial': True})
+    # The first round of the clients produces the next global model
+    round_state.finish(next_round_id=round_number + 1)
+    print(f"Initial global model {path} published as round {round_number}")
+
+def load_privacy_budget():
+    # The budget spent by the noisy rounds of previous runs still counts
+    if privacy_stage is None:
+        return
+    for round_number in model_store.global_rounds():
+        _, metadata = model_store.load_global(round_number)
+        if metadata.get('privacy'):
+            privacy_stage.accountant.spend(metadata['privacy']['noise_multiplier'])
+
+@app.route('/privacy', methods=['GET'])
+def privacy():
+    return jsonify(privacy_report() or {'enabled': False}), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.prometheus(round_state.snapshot()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/round_report', methods=['GET'])
+def round_report():
+    """Timing spans, upload sizes and deliveries of round ``round_id``, by default of the last one measured."""
+    try:
+        return jsonify(metrics.round_report(request.args.get('round_id', type=int))), 200
+    except KeyError as e:
+        return jsonify({'status': 'error', 'error': e.args[0]}), 404
+
+@app.route('/round', methods=['GET'])
+def current_round():
+    return jsonify(round_state.snapshot()), 200
+
+@app.route('/clients', methods=['GET'])
+def clients():
+    """The registered clients with their last-seen and last delivery times and their delivery failures."""
+    return jsonify(client_registry.clients()), 200
+
+def list_folder(folder):
+    if folder == 'local':
+        # Listed from the round state, so half-written or already aggregated files never show up
+        return [os.path.basename(model_store.local_path(client_id)) for client_id in round_state.received_clients()]
+    return [name for name in os.listdir(f"{folder}_models") if not name.endswith(".tmp")]
 
 @app.route('/contents/<folder>', methods=['GET'])
 def contents(folder):
     try:
-        folder_path = f"{folder}_models"
-        files = os.listdir(folder_path)
-        return jsonify({'files': files}), 200
+        return jsonify({'files': list_folder(folder)}), 200
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
 if __name__ == "__main__":
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    publish_initial_model()
+    load_existing_local_models()
+    load_privacy_budget()
+    try:
+        socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    finally:
+        # Last-seen times are only written with the next delivery, keep them on shutdown
+        client_registry.save()
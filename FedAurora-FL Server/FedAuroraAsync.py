@@ -0,0 +1,254 @@
+"""
+ASGI serving mode of the FedAurora server, on Starlette and python-socketio.
+
+Request bodies, responses and the broadcasts of the global model use non-blocking I/O on the event loop,
+so the number of tablets uploading at once is no longer bounded by a thread count. Work that blocks (disk
+writes of the model store, waits on the round state, aggregation) runs in a thread pool or executor. The
+round logic is the one of FedAurora.py, only the serving layer differs. Status events are pushed over
+native websockets by the socket.io ASGI app.
+
+Run with:
+    python FedAuroraAsync.py
+or any ASGI server, e.g. ``uvicorn FedAuroraAsync:asgi_app --port 5000``.
+"""
+import asyncio
+import contextlib
+import os
+import time
+from urllib.parse import parse_qsl
+
+import httpx
+import socketio
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+import FedAurora as server
+from broadcast import DEFAULT_MAX_WORKERS, broadcast_model_async
+from chunked_upload import ChunkOffsetError
+from model_format import JSON_MEDIA_TYPE, MEDIA_TYPE, is_binary_media_type
+from round_state import StaleRoundError
+
+# Templates and static files are found next to this module, like Flask does
+base_folder = os.path.dirname(os.path.abspath(__file__))
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+# Set on startup: the event loop serving requests, and the HTTP client the models are pushed with. It
+# replaces the session of the client registry, its pool keeps the connections alive between rounds
+loop = None
+http_client = None
+
+
+def emit_event(event, *args):
+    # Called from executor threads, the event itself is sent by the event loop
+    asyncio.run_coroutine_threadsafe(sio.emit(event, *args), loop)
+
+
+def broadcast_on_loop(clients, payloads, session=None, **options):
+    # Called by the aggregation running in the executor, which waits while the loop does the I/O
+    return asyncio.run_coroutine_threadsafe(
+        broadcast_model_async(clients, payloads, http_client, **options), loop).result()
+
+
+class BodyStreamReader:
+    """
+    Blocking ``read()`` over the body of a request, for code running in the thread pool: every read waits for
+    the event loop to receive the next piece of the body, so only one piece is held in memory at a time.
+    """
+
+    def __init__(self, request, event_loop):
+        self._pieces = request.stream().__aiter__()
+        self._loop = event_loop
+        self._buffer = b""
+
+    def read(self, size):
+        if not self._buffer:
+            try:
+                self._buffer = asyncio.run_coroutine_threadsafe(self._pieces.__anext__(), self._loop).result()
+            except StopAsyncIteration:
+                return b""
+        block, self._buffer = self._buffer[:size], self._buffer[size:]
+        return block
+
+
+def error_response(e):
+    if isinstance(e, ChunkOffsetError):
+        return JSONResponse({'status': 'error', 'error': str(e), 'offset': e.offset}, status_code=409)
+    if isinstance(e, StaleRoundError):
+        return JSONResponse({'status': 'error', 'error': str(e)}, status_code=409)
+    if isinstance(e, KeyError):
+        return JSONResponse({'status': 'error', 'error': str(e.args[0])}, status_code=404)
+    return JSONResponse({'status': 'error', 'error': str(e)}, status_code=400)
+
+
+def media_type_of(request):
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    return MEDIA_TYPE if is_binary_media_type(content_type) else JSON_MEDIA_TYPE
+
+
+async def index(request):
+    return FileResponse(os.path.join(base_folder, 'templates', 'index.html'))
+
+
+async def logo(request):
+    return FileResponse(os.path.join(base_folder, 'static', 'logo.png'))
+
+
+async def start_aggregation(request):
+    form = dict(parse_qsl((await request.body()).decode('utf-8')))
+    rounds = server.round_options(form)
+    if server.rounds_lock.acquire(blocking=False):
+        # Waits for the uploads and aggregates off the event loop, run_rounds releases the lock
+        loop.run_in_executor(None, server.run_rounds, *rounds)
+    return FileResponse(os.path.join(base_folder, 'templates', 'waiting.html'))
+
+
+def accept_upload(body, params, stats):
+    start = time.perf_counter()
+    data = server.parse_upload(body, params['media_type'])
+    stats['parse'] = time.perf_counter() - start
+    server.accept_model(data, stats=stats, **params)
+
+
+async def upload(request):
+    try:
+        params = server.upload_params(request.query_params, media_type_of(request))
+        start = time.perf_counter()
+        body = await request.body()
+        stats = {'nbytes': len(body), 'receive': time.perf_counter() - start}
+        await run_in_threadpool(accept_upload, body, params, stats)
+    except ValueError as e:
+        return error_response(e)
+    return JSONResponse({"message": "Data uploaded successfully."})
+
+
+async def create_chunked_upload(request):
+    try:
+        session = await run_in_threadpool(server.open_chunked_upload, request.query_params)
+    except ValueError as e:
+        return error_response(e)
+    return JSONResponse(session.to_dict(), status_code=201)
+
+
+async def chunked_upload_status(request):
+    try:
+        return JSONResponse(server.chunked_uploads.get(request.path_params['upload_id']).to_dict())
+    except KeyError as e:
+        return error_response(e)
+
+
+async def upload_chunk(request):
+    upload_id = request.path_params['upload_id']
+    offset = request.query_params.get('offset')
+    try:
+        # Streamed to the partial file as it is received, like the Flask handler does
+        length = request.headers.get('content-length')
+        session = await run_in_threadpool(
+            server.chunked_uploads.write_chunk, upload_id, int(offset) if offset else None,
+            BodyStreamReader(request, asyncio.get_running_loop()), int(length) if length else None,
+            request.headers.get('X-FedAurora-Chunk-Checksum'))
+        if not session.complete:
+            return JSONResponse(session.to_dict())
+        await run_in_threadpool(server.complete_chunked_upload, session)
+    except (KeyError, ValueError) as e:
+        return error_response(e)
+    return JSONResponse(dict(session.to_dict(), message="Data uploaded successfully."))
+
+
+async def reset(request):
+    # Waits for an aggregation in progress, off the event loop
+    await run_in_threadpool(server.reset_local_models_folder)
+    await sio.emit('server_reset')
+    return JSONResponse({"message": "Local models folder reset successfully."})
+
+
+async def global_model(request):
+    try:
+        # Served from memory once cached, only the first request after a restart reads the disk
+        status, payload, headers = await run_in_threadpool(
+            server.global_model_cache.respond, request.headers.get('accept'), request.headers.get('accept-encoding'),
+            request.headers.get('if-none-match'))
+    except FileNotFoundError as e:
+        return JSONResponse({'status': 'error', 'error': str(e)}, status_code=404)
+    return Response(payload, status_code=status, headers=headers)
+
+
+async def prometheus_metrics(request):
+    return PlainTextResponse(server.metrics.prometheus(server.round_state.snapshot()),
+                             media_type='text/plain; version=0.0.4')
+
+
+async def round_report(request):
+    round_id = request.query_params.get('round_id')
+    try:
+        return JSONResponse(server.metrics.round_report(int(round_id) if round_id else None))
+    except KeyError as e:
+        return error_response(e)
+
+
+async def current_round(request):
+    return JSONResponse(server.round_state.snapshot())
+
+
+async def registered_clients(request):
+    return JSONResponse(server.client_registry.clients())
+
+
+async def privacy(request):
+    return JSONResponse(server.privacy_report() or {'enabled': False})
+
+
+async def contents(request):
+    try:
+        files = await run_in_threadpool(server.list_folder, request.path_params['folder'])
+        return JSONResponse({'files': files})
+    except Exception as e:
+        return JSONResponse({'status': 'error', 'error': str(e)}, status_code=500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global loop, http_client
+    loop = asyncio.get_running_loop()
+    limits = httpx.Limits(max_connections=DEFAULT_MAX_WORKERS * 4, max_keepalive_connections=DEFAULT_MAX_WORKERS)
+    http_client = httpx.AsyncClient(limits=limits)
+    server.event_emitter = emit_event
+    server.model_broadcaster = broadcast_on_loop
+    await run_in_threadpool(server.publish_initial_model)
+    await run_in_threadpool(server.load_existing_local_models)
+    await run_in_threadpool(server.load_privacy_budget)
+    yield
+    await http_client.aclose()
+    await run_in_threadpool(server.client_registry.save)
+
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/static/logo.png', logo),
+        Route('/start_aggregation', start_aggregation, methods=['POST']),
+        Route('/upload', upload, methods=['POST']),
+        Route('/uploads', create_chunked_upload, methods=['POST']),
+        Route('/uploads/{upload_id}', chunked_upload_status, methods=['GET']),
+        Route('/uploads/{upload_id}', upload_chunk, methods=['PUT']),
+        Route('/reset', reset, methods=['POST']),
+        Route('/global_model', global_model),
+        Route('/round', current_round),
+        Route('/clients', registered_clients),
+        Route('/metrics', prometheus_metrics),
+        Route('/round_report', round_report),
+        Route('/privacy', privacy),
+        Route('/contents/{folder}', contents),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
+# socket.io on /socket.io, every other path goes to the Starlette app
+asgi_app = socketio.ASGIApp(sio, other_asgi_app=app)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(asgi_app, host='0.0.0.0', port=5000)
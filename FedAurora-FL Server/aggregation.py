@@ -0,0 +1,256 @@
+import threading
+
+import numpy as np
+
+
+def state_dict_to_arrays(state_dict):
+    """Convert a JSON state dict (nested lists / scalars) into float64 ndarrays of any rank."""
+    return {k: np.asarray(v, dtype=np.float64) for k, v in state_dict.items()}
+
+
+def arrays_to_state_dict(arrays):
+    """Convert ndarrays back to the JSON-compatible nested lists the clients expect."""
+    return {k: v.tolist() for k, v in arrays.items()}
+
+
+def stack_state_dicts(state_dicts):
+    """Stack every entry of the client state dicts along a new leading client axis."""
+    keys = state_dicts[0].keys()
+    return {k: np.stack([np.asarray(sd[k], dtype=np.float64) for sd in state_dicts]) for k in keys}
+
+
+def state_dict_signature(state_dict):
+    """Names and shapes of the entries of a state dict, models can only be averaged if these match."""
+    return tuple((k, np.shape(v)) for k, v in state_dict.items())
+
+
+def check_weight(weight):
+    weight = float(weight)
+    if not np.isfinite(weight) or weight <= 0:
+        raise ValueError(f"Client weight must be a positive number, got {weight}.")
+    return weight
+
+
+def average_state_dicts(state_dicts, weights=None):
+    """
+    Element-wise mean of the client state dicts, reduced in one vectorized call per entry.
+    With ``weights`` (e.g. the number of samples of every client) the weighted FedAvg mean is returned.
+    """
+    if not state_dicts:
+        raise ValueError("Cannot average an empty list of state dicts.")
+    stacked = stack_state_dicts(state_dicts)
+    if weights is None:
+        return arrays_to_state_dict({k: v.mean(axis=0) for k, v in stacked.items()})
+    if len(weights) != len(state_dicts):
+        raise ValueError("Expected one weight per state dict.")
+    w = np.array([check_weight(weight) for weight in weights])
+    w /= w.sum()
+    return arrays_to_state_dict({k: np.tensordot(w, v, axes=1) for k, v in stacked.items()})
+
+
+MEAN = "mean"
+MEDIAN = "median"
+TRIMMED_MEAN = "trimmed_mean"
+KRUM = "krum"
+AGGREGATORS = (MEAN, MEDIAN, TRIMMED_MEAN, KRUM)
+DEFAULT_TRIM_FRACTION = 0.1
+
+
+def coordinate_median(stacked):
+    """Element-wise median over the leading client axis, selected with a partition rather than a sort."""
+    n = len(stacked)
+    middle = n // 2
+    if n % 2:
+        return np.partition(stacked, middle, axis=0)[middle]
+    partitioned = np.partition(stacked, (middle - 1, middle), axis=0)
+    return (partitioned[middle - 1] + partitioned[middle]) / 2
+
+
+def trimmed_mean(stacked, trim_fraction=DEFAULT_TRIM_FRACTION):
+    """
+    Element-wise mean over the leading client axis after dropping the ``trim_fraction`` smallest and
+    largest values of every coordinate. One partition around both cut points replaces a full sort.
+    """
+    n = len(stacked)
+    trim = int(trim_fraction * n)
+    if not 0 <= trim_fraction < 0.5:
+        raise ValueError(f"Trim fraction must be in [0, 0.5), got {trim_fraction}.")
+    if trim == 0:
+        return stacked.mean(axis=0)
+    partitioned = np.partition(stacked, (trim, n - trim - 1), axis=0)
+    return partitioned[trim:n - trim].mean(axis=0)
+
+
+def krum_select(flat, num_byzantine=None, num_selected=1):
+    """
+    Indices of the (Multi-)Krum selection among the flattened client models ``flat`` (clients x
+    parameters): the ``num_selected`` models whose ``n - f - 2`` nearest neighbours are the closest,
+    with ``f`` the number of Byzantine clients tolerated (the most ``n > 2f + 2`` allows by default).
+    """
+    n = len(flat)
+    if num_byzantine is None:
+        num_byzantine = max(0, (n - 3) // 2)
+    if not 1 <= num_selected <= n:
+        raise ValueError(f"Cannot select {num_selected} of {n} models.")
+    if n == 1:
+        return np.arange(1)
+    neighbours = min(n - 1, max(1, n - num_byzantine - 2))
+    # Squared pairwise distances from the Gram matrix, one matrix product instead of n^2 differences
+    squared_norms = np.einsum("ij,ij->i", flat, flat)
+    distances = squared_norms[:, None] + squared_norms[None, :] - 2 * (flat @ flat.T)
+    np.maximum(distances, 0, out=distances)
+    np.fill_diagonal(distances, np.inf)
+    scores = np.partition(distances, neighbours - 1, axis=1)[:, :neighbours].sum(axis=1)
+    if num_selected == n:
+        return np.arange(n)
+    return np.sort(np.argpartition(scores, num_selected - 1)[:num_selected])
+
+
+def robust_aggregate_arrays(stacked, method, trim_fraction=DEFAULT_TRIM_FRACTION, num_byzantine=None,
+                            num_selected=1):
+    """Aggregate ``{name: clients x ...}`` stacked float64 arrays with one of the robust ``method``s."""
+    if method == MEDIAN:
+        return {k: coordinate_median(v) for k, v in stacked.items()}
+    if method == TRIMMED_MEAN:
+        return {k: trimmed_mean(v, trim_fraction) for k, v in stacked.items()}
+    if method == KRUM:
+        flat = np.concatenate([v.reshape(len(v), -1) for v in stacked.values()], axis=1)
+        selected = krum_select(flat, num_byzantine, num_selected)
+        return {k: v[selected].mean(axis=0) for k, v in stacked.items()}
+    raise ValueError(f"Unknown robust aggregator {method}, expected one of {', '.join(AGGREGATORS[1:])}.")
+
+
+def robust_aggregate_state_dicts(state_dicts, method, **options):
+    """
+    Coordinate-wise median, trimmed mean or Krum of the client state dicts. Unlike the FedAvg mean these
+    ignore the client weights, a client claiming many samples must not be able to outvote the others.
+    """
+    if not state_dicts:
+        raise ValueError("Cannot aggregate an empty list of state dicts.")
+    signature = state_dict_signature(state_dicts[0])
+    if any(state_dict_signature(sd) != signature for sd in state_dicts[1:]):
+        raise ValueError("State dict keys or shapes do not match.")
+    return arrays_to_state_dict(robust_aggregate_arrays(stack_state_dicts(state_dicts), method, **options))
+
+
+class RunningAggregator:
+    """
+    Streaming (weighted) mean: every client state dict is folded into a float64 running sum as soon
+    as it arrives, so peak memory is about one model regardless of how many clients take part.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sums = None
+        self._weights = {}
+
+    @property
+    def num_clients(self):
+        return len(self._weights)
+
+    @property
+    def total_weight(self):
+        return sum(self._weights.values())
+
+    def has_client(self, client_id):
+        return client_id in self._weights
+
+    def add(self, client_id, state_dict, weight=1.0, replaces=None):
+        """
+        Fold a client state dict, scaled by ``weight``, into the running sum. ``replaces`` is the
+        previous model of the same client when it uploads again within a round, and is taken out of
+        the sum first with the weight it was added with.
+        """
+        weight = check_weight(weight)
+        arrays = state_dict_to_arrays(state_dict)
+        previous = state_dict_to_arrays(replaces) if replaces is not None else None
+        with self._lock:
+            if self._sums is None:
+                self._sums = {k: v * weight for k, v in arrays.items()}
+            else:
+                self._check_keys(arrays)
+                if previous is not None and client_id in self._weights:
+                    self._check_keys(previous)
+                    for k, v in previous.items():
+                        np.subtract(self._sums[k], v * self._weights[client_id], out=self._sums[k])
+                for k, v in arrays.items():
+                    np.add(self._sums[k], v * weight if weight != 1.0 else v, out=self._sums[k])
+            self._weights[client_id] = weight
+
+    def weight(self, client_id):
+        return self._weights[client_id]
+
+    def remove(self, client_id, state_dict):
+        """Take the state dict a client was last added with out of the running sum again."""
+        arrays = state_dict_to_arrays(state_dict)
+        with self._lock:
+            weight = self._weights.pop(client_id)
+            if not self._weights:
+                self._sums = None
+                return
+            for k, v in arrays.items():
+                np.subtract(self._sums[k], v * weight, out=self._sums[k])
+
+    def average(self):
+        with self._lock:
+            if not self._weights:
+                raise ValueError("Cannot average an empty running sum.")
+            total_weight = self.total_weight
+            return arrays_to_state_dict({k: v / total_weight for k, v in self._sums.items()})
+
+    def reset(self):
+        with self._lock:
+            self._sums = None
+            self._weights.clear()
+
+    def _check_keys(self, arrays):
+        if arrays.keys() != self._sums.keys():
+            raise ValueError("State dict keys do not match the models already aggregated.")
+        for k, v in arrays.items():
+            if v.shape != self._sums[k].shape:
+                raise ValueError(f"Shape mismatch for {k}: {v.shape} != {self._sums[k].shape}")
+
+
+class ShardedAggregator:
+    """
+    Aggregates the stored models of a large round on a pool of worker processes. Every worker sums a
+    shard of the clients, and the partial sums are combined and divided at the end, so the round time
+    scales down with the number of cores.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+
+    def average(self, paths):
+        if not paths:
+            raise ValueError("Cannot average an empty list of models.")
+        from shard_worker import main_script_hidden, sum_model_files
+
+        shards = [shard for shard in (paths[i::self.workers] for i in range(self.workers)) if shard]
+        pool = self._pool()
+        with main_script_hidden():
+            # The worker processes are started by the submissions
+            futures = [pool.submit(sum_model_files, shard) for shard in shards]
+        partials = [future.result() for future in futures]
+        sums, total_weight = partials[0]
+        for partial_sums, partial_weight in partials[1:]:
+            if state_dict_signature(partial_sums) != state_dict_signature(sums):
+                raise ValueError("Models of different shards do not have the same shapes.")
+            for k, v in partial_sums.items():
+                sums[k] += v
+            total_weight += partial_weight
+        return arrays_to_state_dict({k: v / total_weight for k, v in sums.items()})
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # Spawned rather than forked, the server process runs request threads that may hold locks
+            from shard_worker import new_pool
+
+            self._executor = new_pool(self.workers)
+        return self._executor
@@ -0,0 +1,124 @@
+import threading
+
+import numpy as np
+
+from aggregation import arrays_to_state_dict, check_weight, state_dict_signature, state_dict_to_arrays
+from round_state import StaleRoundError
+
+FEDASYNC = "fedasync"
+FEDBUFF = "fedbuff"
+ASYNC_MODES = (FEDASYNC, FEDBUFF)
+DEFAULT_ALPHA = 0.5
+DEFAULT_STALENESS_EXPONENT = 0.5
+DEFAULT_BUFFER_SIZE = 10
+# Updates from a version older than this many versions are rejected, only this window of versions is kept
+DEFAULT_MAX_STALENESS = 100
+
+
+def staleness_weight(staleness, exponent=DEFAULT_STALENESS_EXPONENT):
+    """Polynomial staleness discount ``(1 + staleness) ** -exponent`` of FedAsync."""
+    return (1.0 + max(0, staleness)) ** -exponent
+
+
+def writable_arrays(state_dict):
+    """Float64 copies of the tensors of a state dict, safe to update in place."""
+    return {k: np.array(v, dtype=np.float64) for k, v in state_dict.items()}
+
+
+class AsyncAggregator:
+    """
+    Asynchronous federated aggregation: every update moves the global model as it arrives, instead of
+    waiting for every client of a round, and the global version advances continuously.
+
+    ``fedasync``: the update is mixed in right away, ``x = (1 - a) x + a x_client`` with ``a`` the mixing
+    factor ``alpha`` discounted by the staleness of the update (how many versions were published since the
+    version the client trained from).
+    ``fedbuff``: the staleness-weighted updates ``x_client - x_base`` are buffered, and every ``buffer_size``
+    updates their weighted mean is applied with the ``alpha`` server learning rate. ``load_version`` returns
+    the state dict of a past version, the ``x_base`` the client trained from.
+    Updates more than ``max_staleness`` versions behind are rejected with StaleRoundError, so only the
+    versions from ``oldest_version()`` on have to be kept.
+    """
+
+    def __init__(self, mode=FEDASYNC, alpha=DEFAULT_ALPHA, staleness_exponent=DEFAULT_STALENESS_EXPONENT,
+                 buffer_size=DEFAULT_BUFFER_SIZE, model=None, version=0, load_version=None,
+                 max_staleness=DEFAULT_MAX_STALENESS):
+        if mode not in ASYNC_MODES:
+            raise ValueError(f"Unknown asynchronous mode {mode}, expected one of {', '.join(ASYNC_MODES)}.")
+        if not 0 < alpha <= 1:
+            raise ValueError(f"Mixing factor must be in (0, 1], got {alpha}.")
+        if max_staleness < 0:
+            raise ValueError(f"Maximum staleness must not be negative, got {max_staleness}.")
+        if mode == FEDBUFF and load_version is None:
+            raise ValueError("FedBuff needs the past versions of the global model.")
+        self.mode = mode
+        self.alpha = alpha
+        self.staleness_exponent = staleness_exponent
+        self.buffer_size = buffer_size
+        self.max_staleness = max_staleness
+        self.version = version
+        self._model = writable_arrays(model) if model is not None else None
+        self._load_version = load_version
+        self._buffer = None
+        self._buffer_weight = 0.0
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    @property
+    def buffered(self):
+        return self._buffered
+
+    def oldest_version(self):
+        """The oldest version an update can still be based on, older ones are not needed anymore."""
+        return max(1, self.version - self.max_staleness)
+
+    def model(self):
+        """The current global model as JSON-compatible lists, None before the first update."""
+        with self._lock:
+            return arrays_to_state_dict(self._model) if self._model is not None else None
+
+    def submit(self, state_dict, base_version=None, weight=1.0):
+        """
+        Merge a client model trained from global version ``base_version`` (the current one by default).
+        Returns ``(version, staleness)``, the version being the new one if the update advanced it, else None.
+        """
+        weight = check_weight(weight)
+        arrays = state_dict_to_arrays(state_dict)
+        with self._lock:
+            if self._model is None:
+                # The first model becomes version 1, there is nothing to mix it with yet. Binary uploads and
+                # stored versions are read-only views, the global model is updated in place
+                self._model = writable_arrays(arrays)
+                self.version += 1
+                return self.version, 0
+            if state_dict_signature(arrays) != state_dict_signature(self._model):
+                raise ValueError("State dict keys or shapes do not match the global model.")
+            base_version = self.version if base_version is None else base_version
+            if base_version > self.version:
+                raise ValueError(f"Update from version {base_version}, the latest version is {self.version}.")
+            staleness = self.version - base_version
+            if staleness > self.max_staleness:
+                raise StaleRoundError(f"Update from version {base_version}, more than {self.max_staleness} "
+                                      f"versions behind the latest version {self.version}.")
+            discount = staleness_weight(staleness, self.staleness_exponent)
+            if self.mode == FEDASYNC:
+                mixing = self.alpha * discount
+                for k, v in arrays.items():
+                    self._model[k] *= 1 - mixing
+                    self._model[k] += mixing * v
+                self.version += 1
+                return self.version, staleness
+            base = self._model if staleness == 0 else state_dict_to_arrays(self._load_version(base_version))
+            if self._buffer is None:
+                self._buffer = {k: np.zeros_like(v) for k, v in self._model.items()}
+            for k, v in arrays.items():
+                self._buffer[k] += (discount * weight) * (v - base[k])
+            self._buffer_weight += discount * weight
+            self._buffered += 1
+            if self._buffered < self.buffer_size:
+                return None, staleness
+            for k, v in self._buffer.items():
+                self._model[k] += self.alpha * v / self._buffer_weight
+            self._buffer, self._buffer_weight, self._buffered = None, 0.0, 0
+            self.version += 1
+            return self.version, staleness
@@ -0,0 +1,104 @@
+"""
+Compare the vectorized aggregation engine against the original pure-Python loop.
+
+Usage (from the FedAurora-FL Server folder):
+    python benchmarks/benchmark_aggregation.py --clients 10 50 --width 1 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregation import average_state_dicts  # noqa: E402
+
+# Layer shapes of the autoencoder currently trained by the clients (see global_models/averaged_model.json)
+BASE_SHAPES = {
+    "encoder.0.weight": (64, 19),
+    "encoder.0.bias": (64,),
+    "encoder.3.weight": (32, 64),
+    "encoder.3.bias": (32,),
+    "decoder.0.weight": (64, 32),
+    "decoder.0.bias": (64,),
+    "decoder.3.weight": (19, 64),
+    "decoder.3.bias": (19,),
+}
+
+
+def loop_average_state_dicts(state_dicts):
+    # Original FedAurora implementation, kept verbatim as the baseline
+    avg_state_dict = {}
+    for k, v in state_dicts[0].items():
+        if isinstance(v, list):
+            if isinstance(v[0], list):
+                avg_state_dict[k] = [[0.0] * len(v[0]) for _ in v]
+            else:
+                avg_state_dict[k] = [0.0] * len(v)
+        else:
+            avg_state_dict[k] = 0.0
+    for state_dict in state_dicts:
+        for k, v in state_dict.items():
+            if isinstance(v, list):
+                if isinstance(v[0], list):
+                    for i in range(len(v)):
+                        for j in range(len(v[i])):
+                            avg_state_dict[k][i][j] += v[i][j]
+                else:
+                    for i in range(len(v)):
+                        avg_state_dict[k][i] += v[i]
+            else:
+                avg_state_dict[k] += v
+    for k, v in avg_state_dict.items():
+        if isinstance(v, list):
+            if isinstance(v[0], list):
+                for i in range(len(v)):
+                    for j in range(len(v[i])):
+                        avg_state_dict[k][i][j] /= len(state_dicts)
+            else:
+                avg_state_dict[k] = [x / len(state_dicts) for x in v]
+        else:
+            avg_state_dict[k] /= len(state_dicts)
+    return avg_state_dict
+
+
+def make_state_dicts(num_clients, width, seed=0):
+    rng = np.random.default_rng(seed)
+    shapes = {k: tuple(dim * width for dim in shape) for k, shape in BASE_SHAPES.items()}
+    return [{k: rng.standard_normal(shape).tolist() for k, shape in shapes.items()} for _ in range(num_clients)]
+
+
+def best_of(func, state_dicts, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(state_dicts)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--width", type=int, nargs="+", default=[1, 4],
+                        help="Multiplier applied to every dimension of the base layer shapes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'width':>6} {'params':>10} {'loop (s)':>10} {'numpy (s)':>10} {'speedup':>8}")
+    for num_clients in args.clients:
+        for width in args.width:
+            state_dicts = make_state_dicts(num_clients, width)
+            params = sum(np.asarray(v).size for v in state_dicts[0].values())
+            loop_time, expected = best_of(loop_average_state_dicts, state_dicts, args.repeat)
+            numpy_time, actual = best_of(average_state_dicts, state_dicts, args.repeat)
+            for k in expected:
+                np.testing.assert_allclose(actual[k], expected[k], rtol=1e-9, atol=1e-12)
+            print(f"{num_clients:>8} {width:>6} {params:>10} {loop_time:>10.4f} {numpy_time:>10.4f} "
+                  f"{loop_time / numpy_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measure the per-round cost of the robust aggregators against the plain mean of the same stacked client models.
+
+Usage (from the FedAurora-FL Server folder):
+    python benchmarks/benchmark_robust_aggregation.py --clients 10 100 1000 --width 1
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregation import KRUM, MEDIAN, TRIMMED_MEAN, robust_aggregate_arrays  # noqa: E402
+from benchmark_aggregation import BASE_SHAPES  # noqa: E402
+
+METHODS = {
+    "mean": lambda stacked: {k: v.mean(axis=0) for k, v in stacked.items()},
+    MEDIAN: lambda stacked: robust_aggregate_arrays(stacked, MEDIAN),
+    TRIMMED_MEAN: lambda stacked: robust_aggregate_arrays(stacked, TRIMMED_MEAN, trim_fraction=0.1),
+    KRUM: lambda stacked: robust_aggregate_arrays(stacked, KRUM),
+}
+
+
+def best_of(func, stacked, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(stacked)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--width", type=int, default=1,
+                        help="Multiplier applied to every dimension of the base layer shapes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    shapes = {k: tuple(dim * args.width for dim in shape) for k, shape in BASE_SHAPES.items()}
+    params = sum(int(np.prod(shape)) for shape in shapes.values())
+    print(f"{params} parameters per model")
+    print(f"{'clients':>8} {'method':>13} {'time (s)':>10} {'vs mean':>8}")
+    for num_clients in args.clients:
+        # Already stacked, as the server does once per round for every aggregator
+        stacked = {k: rng.standard_normal((num_clients,) + shape) for k, shape in shapes.items()}
+        mean_time = None
+        for name, func in METHODS.items():
+            elapsed = best_of(func, stacked, args.repeat)
+            mean_time = mean_time or elapsed
+            print(f"{num_clients:>8} {name:>13} {elapsed:>10.4f} {elapsed / mean_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Time the aggregation of a stored round on a pool of worker processes for an increasing number of workers.
+
+Usage (from the FedAurora-FL Server folder):
+    python benchmarks/benchmark_sharded_aggregation.py --clients 200 --width 8 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregation import ShardedAggregator  # noqa: E402
+from benchmark_aggregation import BASE_SHAPES  # noqa: E402
+from model_store import ModelStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--width", type=int, default=8,
+                        help="Multiplier applied to every dimension of the base layer shapes")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    shapes = {k: tuple(dim * args.width for dim in shape) for k, shape in BASE_SHAPES.items()}
+    with tempfile.TemporaryDirectory() as folder:
+        store = ModelStore(os.path.join(folder, "local_models"), os.path.join(folder, "global_models"))
+        for i in range(args.clients):
+            store.save_local(f"client{i}", {k: rng.standard_normal(shape) for k, shape in shapes.items()},
+                             metadata={"weight": float(rng.integers(1, 500))})
+        paths = [store.stored_local_path(f"client{i}") for i in range(args.clients)]
+        params = sum(int(np.prod(shape)) for shape in shapes.values())
+        print(f"{args.clients} clients, {params} parameters per model, {os.cpu_count()} CPUs")
+        if max(args.workers) > (os.cpu_count() or 1):
+            print("More workers than CPUs: the extra workers share the cores and cannot speed the round up")
+        print(f"{'workers':>8} {'time (s)':>10} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            aggregator = ShardedAggregator(workers)
+            aggregator.average(paths[:workers])  # Start the worker processes outside of the timing
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                aggregator.average(paths)
+                timings.append(time.perf_counter() - start)
+            aggregator.shutdown()
+            baseline = baseline or min(timings)
+            print(f"{workers:>8} {min(timings):>10.4f} {baseline / min(timings):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
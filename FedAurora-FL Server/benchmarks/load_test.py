@@ -0,0 +1,214 @@
+"""
+Load test of a locally started FedAurora server with simulated clients.
+
+Starts the server (Flask or the ASGI mode) in a temporary folder, runs rounds in which N simulated clients
+upload synthetic state dicts concurrently and receive the global model on a local stub /receive_model
+endpoint, and reports per round:
+    upload p50/p90/p99   latency of the /upload requests
+    aggregation          last upload answered -> first global model received (aggregate + persist)
+    fan-out              first -> last global model received
+    peak RSS             high-water mark of the server process during the round (VmHWM)
+
+Usage (from the FedAurora-FL Server folder):
+    python benchmarks/load_test.py --clients 100 --rounds 3 --width 4 --format binary
+    python benchmarks/load_test.py --clients 100 --layer fc1.weight=1024x1024 --layer fc1.bias=1024 --server async
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+server_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, server_folder)
+
+from benchmark_aggregation import BASE_SHAPES  # noqa: E402
+from model_format import JSON_MEDIA_TYPE, MEDIA_TYPE, encode_state_dict  # noqa: E402
+
+SERVER_COMMANDS = {
+    "flask": "import FedAurora as s; s.socketio.run(s.app, host='127.0.0.1', port={port}, "
+             "allow_unsafe_werkzeug=True)",
+    "async": "import uvicorn, FedAuroraAsync as s; uvicorn.run(s.asgi_app, host='127.0.0.1', port={port}, "
+             "log_level='warning')",
+}
+
+
+class ReceiverHandler(BaseHTTPRequestHandler):
+    """Stub /receive_model of every simulated client, at /<client_id>/receive_model."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.record(self.headers.get('X-FedAurora-Round'), time.perf_counter())
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class Receiver(ThreadingHTTPServer):
+    daemon_threads = True
+    # Every client may receive its model at the same time, a short backlog would drop connections
+    request_queue_size = 1024
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ReceiverHandler)
+        self.condition = threading.Condition()
+        self.arrivals = {}
+
+    def record(self, round_id, arrival):
+        with self.condition:
+            self.arrivals.setdefault(round_id, []).append(arrival)
+            self.condition.notify_all()
+
+    def wait_for(self, round_id, count, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.arrivals.get(round_id, [])) >= count, timeout=timeout)
+            return list(self.arrivals.get(round_id, []))
+
+
+def parse_shape(text):
+    name, _, dims = text.partition("=")
+    return name, tuple(int(dim) for dim in dims.split("x")) if dims else ()
+
+
+def peak_rss(pid, reset=False):
+    """Peak resident set size of a process in MiB, from /proc. ``reset`` starts a new high-water mark."""
+    if reset:
+        try:
+            with open(f"/proc/{pid}/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+        return None
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def start_server(kind, port, folder, env):
+    command = [sys.executable, "-c", SERVER_COMMANDS[kind].format(port=port)]
+    process = subprocess.Popen(command, cwd=folder, env=dict(os.environ, PYTHONPATH=server_folder, **env),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{url}/round", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"The {kind} server did not start on port {port}.")
+
+
+def wait_for_round(url, round_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = requests.get(f"{url}/round", timeout=5).json()
+        if status['round_id'] == round_id and status['status'] == 'collecting':
+            return
+        time.sleep(0.02)
+    raise RuntimeError(f"Round {round_id} did not start.")
+
+
+def run_round(url, receiver_url, receiver, round_id, payloads, media_type, concurrency, server_pid):
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def upload(client):
+        client_id, payload = client
+        start = time.perf_counter()
+        response = session.post(f"{url}/upload", data=payload, headers={'Content-Type': media_type},
+                                params={'client_id': client_id, 'client_address': f"{receiver_url}/{client_id}",
+                                        'round_id': round_id})
+        response.raise_for_status()
+        return time.perf_counter() - start, time.perf_counter()
+
+    peak_rss(server_pid, reset=True)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(upload, payloads.items()))
+    latencies = np.array([latency for latency, _ in results]) * 1000
+    last_upload = max(done for _, done in results)
+    arrivals = receiver.wait_for(str(round_id), len(payloads), timeout=300)
+    if len(arrivals) < len(payloads):
+        raise RuntimeError(f"Round {round_id}: only {len(arrivals)}/{len(payloads)} clients got the model.")
+    return {'round': round_id,
+            'upload_p50_ms': float(np.percentile(latencies, 50)),
+            'upload_p90_ms': float(np.percentile(latencies, 90)),
+            'upload_p99_ms': float(np.percentile(latencies, 99)),
+            'aggregation_s': min(arrivals) - last_upload,
+            'fan_out_s': max(arrivals) - min(arrivals),
+            'peak_rss_mib': peak_rss(server_pid)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--width", type=int, default=1,
+                        help="Multiplier applied to every dimension of the base layer shapes")
+    parser.add_argument("--layer", action="append", type=parse_shape, metavar="NAME=DIMxDIM",
+                        help="Layer shape replacing the base shapes, can be repeated")
+    parser.add_argument("--format", choices=["json", "binary"], default="binary")
+    parser.add_argument("--server", choices=sorted(SERVER_COMMANDS), default="flask")
+    parser.add_argument("--concurrency", type=int, default=32, help="Uploads in flight at once")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Environment variable of the server, e.g. FEDAURORA_AGGREGATION_WORKERS=4")
+    parser.add_argument("--json", help="Also write the per-round results to this file")
+    args = parser.parse_args()
+
+    shapes = dict(args.layer) if args.layer else {
+        k: tuple(dim * args.width for dim in shape) for k, shape in BASE_SHAPES.items()}
+    media_type = MEDIA_TYPE if args.format == "binary" else JSON_MEDIA_TYPE
+    rng = np.random.default_rng(0)
+    receiver = Receiver()
+    threading.Thread(target=receiver.serve_forever, daemon=True).start()
+    receiver_url = f"http://127.0.0.1:{receiver.server_address[1]}"
+    env = dict(item.split("=", 1) for item in args.env)
+
+    with tempfile.TemporaryDirectory() as folder:
+        process, url = start_server(args.server, args.port, folder, env)
+        try:
+            params = sum(int(np.prod(shape)) for shape in shapes.values())
+            print(f"{args.server} server, {args.clients} clients, {params} parameters per model, {args.format}")
+            requests.post(f"{url}/start_aggregation", data={'num_clients': args.clients, 'num_rounds': args.rounds})
+            print(f"{'round':>5} {'p50 (ms)':>9} {'p90 (ms)':>9} {'p99 (ms)':>9} {'aggr (s)':>9} {'fan-out (s)':>11} "
+                  f"{'peak RSS (MiB)':>14}")
+            results = []
+            for round_id in range(1, args.rounds + 1):
+                # Serialized before the round starts, so only the server is measured
+                payloads = {}
+                for i in range(args.clients):
+                    state_dict = {k: rng.standard_normal(shape, dtype=np.float32) for k, shape in shapes.items()}
+                    payloads[f"client{i}"] = (encode_state_dict(state_dict) if args.format == "binary" else
+                                              json.dumps({k: v.tolist() for k, v in state_dict.items()}).encode())
+                wait_for_round(url, round_id)
+                result = run_round(url, receiver_url, receiver, round_id, payloads, media_type, args.concurrency,
+                                   process.pid)
+                results.append(result)
+                print(f"{round_id:>5} {result['upload_p50_ms']:>9.1f} {result['upload_p90_ms']:>9.1f} "
+                      f"{result['upload_p99_ms']:>9.1f} {result['aggregation_s']:>9.3f} {result['fan_out_s']:>11.3f} "
+                      f"{result['peak_rss_mib'] or float('nan'):>14.1f}")
+        finally:
+            process.terminate()
+            process.wait()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'args': {k: v for k, v in vars(args).items() if k != 'layer'}, 'shapes': shapes,
+                       'rounds': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
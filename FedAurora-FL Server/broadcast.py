@@ -0,0 +1,150 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from model_format import JSON_MEDIA_TYPE
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_TIMEOUT = (3.05, 30)  # (connect, read) seconds per attempt
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5  # seconds, doubled after every failed attempt
+
+
+@dataclass
+class DeliveryResult:
+    client_id: str
+    client_address: str
+    success: bool
+    status_code: int = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    error: str = None
+    payload_size: int = 0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def create_session(pool_size=DEFAULT_MAX_WORKERS):
+    """A requests session whose connection pool is large enough for one connection per worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def deliver(session, client_id, client_address, payload, content_type=JSON_MEDIA_TYPE, headers=None,
+            timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """POST the serialized model to one client, retrying connection errors and 5xx answers with backoff."""
+    headers = dict(headers or {}, **{"Content-Type": content_type})
+    result = DeliveryResult(client_id=client_id, client_address=client_address, success=False,
+                            payload_size=len(payload))
+    start = time.perf_counter()
+    for attempt in range(retries + 1):
+        result.attempts = attempt + 1
+        try:
+            response = session.post(f"{client_address}/receive_model", data=payload,
+                                    headers=headers, timeout=timeout)
+            result.status_code = response.status_code
+            if response.status_code == 200:
+                result.success = True
+                result.error = None
+                break
+            result.error = response.text[:200]
+            if response.status_code < 500:
+                # The client rejected the model, sending it again will not help
+                break
+        except requests.RequestException as e:
+            result.error = str(e)
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def broadcast_model(clients, payloads, content_types=None, session=None, max_workers=DEFAULT_MAX_WORKERS,
+                    client_payloads=None, **delivery_options):
+    """
+    Push an already serialized model to every ``client_id -> client_address`` in ``clients`` in parallel
+    through a bounded thread pool. ``payloads`` maps a Content-Type to the model serialized in it and
+    ``content_types`` the client id to the Content-Type it wants (JSON by default). ``client_payloads``
+    replaces the shared payload of some clients with their own ``(content_type, payload, extra_headers)``,
+    e.g. a delta against the last model they received. Returns one DeliveryResult per client.
+    """
+    if not clients:
+        return []
+    content_types = content_types or {}
+    client_payloads = client_payloads or {}
+    session = session or create_session(max_workers)
+    headers = delivery_options.pop("headers", None) or {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(clients))) as executor:
+        futures = []
+        for client_id, client_address in clients.items():
+            if client_id in client_payloads:
+                content_type, payload, extra_headers = client_payloads[client_id]
+            else:
+                content_type = content_types.get(client_id, JSON_MEDIA_TYPE)
+                payload, extra_headers = payloads[content_type], {}
+            futures.append(executor.submit(deliver, session, client_id, client_address, payload, content_type,
+                                           headers=dict(headers, **extra_headers), **delivery_options))
+        return [future.result() for future in futures]
+
+
+async def deliver_async(client, client_id, client_address, payload, content_type=JSON_MEDIA_TYPE, headers=None,
+                        timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """``deliver`` on an ``httpx.AsyncClient``: the event loop serves other requests while waiting."""
+    import httpx
+
+    headers = dict(headers or {}, **{"Content-Type": content_type})
+    connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    result = DeliveryResult(client_id=client_id, client_address=client_address, success=False,
+                            payload_size=len(payload))
+    start = time.perf_counter()
+    for attempt in range(retries + 1):
+        result.attempts = attempt + 1
+        try:
+            response = await client.post(f"{client_address}/receive_model", content=payload, headers=headers,
+                                         timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+            result.status_code = response.status_code
+            if response.status_code == 200:
+                result.success = True
+                result.error = None
+                break
+            result.error = response.text[:200]
+            if response.status_code < 500:
+                break
+        except httpx.HTTPError as e:
+            result.error = str(e) or type(e).__name__
+        if attempt < retries:
+            await asyncio.sleep(backoff * 2 ** attempt)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def broadcast_model_async(clients, payloads, client, content_types=None, client_payloads=None,
+                                max_concurrency=DEFAULT_MAX_WORKERS * 4, **delivery_options):
+    """
+    ``broadcast_model`` with non-blocking I/O on a shared ``httpx.AsyncClient``: one coroutine per client,
+    at most ``max_concurrency`` requests in flight instead of one thread per request.
+    """
+    content_types = content_types or {}
+    client_payloads = client_payloads or {}
+    headers = delivery_options.pop("headers", None) or {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def send(client_id, client_address):
+        if client_id in client_payloads:
+            content_type, payload, extra_headers = client_payloads[client_id]
+        else:
+            content_type = content_types.get(client_id, JSON_MEDIA_TYPE)
+            payload, extra_headers = payloads[content_type], {}
+        async with semaphore:
+            return await deliver_async(client, client_id, client_address, payload, content_type,
+                                       headers=dict(headers, **extra_headers), **delivery_options)
+
+    return list(await asyncio.gather(*(send(client_id, address) for client_id, address in clients.items())))
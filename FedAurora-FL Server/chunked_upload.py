@@ -0,0 +1,178 @@
+"""
+Resumable uploads of large models in chunks.
+
+A client opens an upload with the total size and SHA-256 of the body it is about to send, then sends the
+body in chunks, each tagged with its offset and its own SHA-256. Chunks are streamed to a partial file on
+disk, never held in memory whole. After a dropped connection the client asks for the current offset and
+resends only what is missing. Once the last byte arrives the whole file is checked against the checksum
+of the body before the model is read from it. Sessions without a chunk for ``ttl`` seconds are abandoned
+and deleted.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from model_store import atomic_write
+
+BLOCK_SIZE = 1 << 20
+DEFAULT_SESSION_TTL = 24 * 3600
+
+
+class ChunkOffsetError(ValueError):
+    """Raised for a chunk that does not start where the bytes received so far end."""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+class UploadSession:
+    """A chunked upload in progress: its expected size and checksum, the bytes received so far and the
+    upload parameters (client id, round, weight, ...) to apply to the model once complete. ``updated`` is the
+    time it was opened or last got a chunk."""
+
+    def __init__(self, upload_id, total_size, checksum, params, offset=0, updated=None):
+        self.upload_id = upload_id
+        self.total_size = total_size
+        self.checksum = checksum
+        self.params = params
+        self.offset = offset
+        self.updated = time.time() if updated is None else updated
+        self.lock = threading.Lock()
+
+    @property
+    def complete(self):
+        return self.offset == self.total_size
+
+    def to_dict(self):
+        return {'upload_id': self.upload_id, 'offset': self.offset, 'total_size': self.total_size,
+                'complete': self.complete}
+
+
+class ChunkedUploads:
+    """
+    The chunked uploads in progress, each one a ``<upload_id>.part`` file with a ``<upload_id>.json``
+    description next to it in ``folder``, so uploads can also be resumed after a server restart. Sessions
+    idle for longer than ``ttl`` seconds are swept at startup and whenever an upload is opened.
+    """
+
+    def __init__(self, folder, ttl=DEFAULT_SESSION_TTL):
+        self.folder = folder
+        self.ttl = ttl
+        os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        for filename in os.listdir(folder):
+            if filename.endswith(".json"):
+                with open(os.path.join(folder, filename)) as f:
+                    info = json.load(f)
+                session = UploadSession(**info)
+                self._sessions[session.upload_id] = session
+        self.sweep()
+
+    def part_path(self, upload_id):
+        return os.path.join(self.folder, f"{upload_id}.part")
+
+    def _info_path(self, upload_id):
+        return os.path.join(self.folder, f"{upload_id}.json")
+
+    def create(self, total_size, checksum, params):
+        if total_size <= 0:
+            raise ValueError(f"Upload size must be positive, got {total_size}.")
+        if len(checksum or "") != 64:
+            raise ValueError("Expected the SHA-256 hex digest of the whole upload.")
+        self.sweep()
+        session = UploadSession(uuid.uuid4().hex, total_size, checksum.lower(), params)
+        open(self.part_path(session.upload_id), "wb").close()
+        self._save(session)
+        with self._lock:
+            self._sessions[session.upload_id] = session
+        return session
+
+    def get(self, upload_id):
+        with self._lock:
+            session = self._sessions.get(upload_id)
+        if session is None:
+            raise KeyError(f"Unknown upload {upload_id}.")
+        return session
+
+    def write_chunk(self, upload_id, offset, stream, length, checksum):
+        """
+        Append ``length`` bytes read from ``stream`` at ``offset``, streamed to disk in blocks. A chunk whose
+        SHA-256 is not ``checksum`` is cut off again, the client resends it from the same offset.
+        """
+        session = self.get(upload_id)
+        with session.lock:
+            self._check_open(session)
+            if offset != session.offset:
+                raise ChunkOffsetError(f"Chunk at offset {offset}, expected offset {session.offset}.",
+                                       session.offset)
+            if length is None or length <= 0 or offset + length > session.total_size:
+                raise ValueError(f"Chunk of {length} bytes does not fit an upload of {session.total_size} bytes.")
+            digest = hashlib.sha256()
+            with open(self.part_path(upload_id), "r+b") as f:
+                f.seek(offset)
+                remaining = length
+                while remaining:
+                    block = stream.read(min(BLOCK_SIZE, remaining))
+                    if not block:
+                        break
+                    digest.update(block)
+                    f.write(block)
+                    remaining -= len(block)
+                if remaining or digest.hexdigest() != (checksum or "").lower():
+                    f.truncate(offset)
+                    raise ValueError(f"Chunk at offset {offset} is incomplete or does not match its checksum.")
+                f.flush()
+                os.fsync(f.fileno())
+            session.offset += length
+            session.updated = time.time()
+            self._save(session)
+            return session
+
+    def _check_open(self, session):
+        # A sweep may have discarded the session while the caller waited for its lock
+        with self._lock:
+            if self._sessions.get(session.upload_id) is not session:
+                raise KeyError(f"Unknown upload {session.upload_id}.")
+
+    def verify(self, upload_id):
+        """Check the complete file against the checksum of the whole upload, reading it in blocks."""
+        session = self.get(upload_id)
+        digest = hashlib.sha256()
+        with open(self.part_path(upload_id), "rb") as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+                digest.update(block)
+        if digest.hexdigest() != session.checksum:
+            raise ValueError(f"Upload {upload_id} does not match its checksum.")
+        return self.part_path(upload_id)
+
+    def discard(self, upload_id):
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+        for path in (self.part_path(upload_id), self._info_path(upload_id)):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def sweep(self, now=None):
+        """Discard the sessions idle for longer than the TTL, except one getting a chunk, and return their ids."""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [session for session in self._sessions.values() if now - session.updated > self.ttl]
+        swept = []
+        for session in expired:
+            if session.lock.acquire(blocking=False):
+                try:
+                    self.discard(session.upload_id)
+                finally:
+                    session.lock.release()
+                swept.append(session.upload_id)
+        return swept
+
+    def _save(self, session):
+        info = {'upload_id': session.upload_id, 'total_size': session.total_size, 'checksum': session.checksum,
+                'params': session.params, 'offset': session.offset, 'updated': session.updated}
+        atomic_write(self._info_path(session.upload_id), lambda f: f.write(json.dumps(info).encode("utf-8")))
@@ -0,0 +1,121 @@
+"""
+Persistent registry of the clients the global model is pushed to.
+
+Every client that uploaded is kept with its address, the format and delta compression it wants, when it
+was last seen, the last global round and time it received, and its consecutive delivery failures. The
+registry is written to a JSON file, so a restarted server still knows where to push the next model, and
+it owns the keep-alive HTTP session the models are pushed through, so broadcasts to a stable fleet reuse
+their connections. A client whose delivery failed is skipped by the following broadcasts for an
+exponentially growing backoff, and evicted after ``max_failures`` failures in a row; its next upload
+registers it again.
+"""
+import json
+import os
+import threading
+import time
+
+from broadcast import DEFAULT_MAX_WORKERS, create_session
+from model_store import atomic_write
+
+DEFAULT_MAX_FAILURES = 5
+DEFAULT_BACKOFF = 30.0  # seconds, doubled after every failed broadcast in a row
+DEFAULT_MAX_BACKOFF = 3600.0
+
+
+class ClientRegistry:
+    """
+    Thread-safe ``client_id -> record`` map, saved to ``path`` (in memory only without one). A record holds
+    ``address``, ``media_type``, ``accept_delta``, ``delivered_round``, ``last_seen``, ``last_delivery``,
+    ``failures`` and ``retry_at``, times being Unix timestamps.
+    """
+
+    def __init__(self, path=None, max_failures=DEFAULT_MAX_FAILURES, backoff=DEFAULT_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF, pool_size=DEFAULT_MAX_WORKERS):
+        self.path = path
+        self.max_failures = max_failures
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Shared by every broadcast, its pool keeps the connections to the clients alive between rounds
+        self.session = create_session(pool_size)
+        self._lock = threading.Lock()
+        self._clients = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._clients = json.load(f)
+
+    def register(self, client_id, address, media_type=None, accept_delta=None):
+        """Record an upload of ``client_id``: it is alive, so any backoff is lifted."""
+        with self._lock:
+            client = self._clients.get(client_id)
+            changed = client is None or (client['address'], client['media_type'], client['accept_delta'],
+                                         client['failures']) != (address, media_type, accept_delta, 0)
+            if client is None:
+                client = self._clients[client_id] = {'delivered_round': None, 'last_delivery': None}
+            client.update(address=address, media_type=media_type, accept_delta=accept_delta,
+                          last_seen=time.time(), failures=0, retry_at=None)
+            # Only a new or changed client is written right away, a last_seen update waits for the next save
+            if changed:
+                self._save()
+
+    def clients(self):
+        """Snapshot of every known client, as ``{client_id: record}``."""
+        with self._lock:
+            return {client_id: dict(client) for client_id, client in self._clients.items()}
+
+    def targets(self, now=None):
+        """``(clients, skipped)``: snapshot of the clients to push to now, and the IDs of those backing off."""
+        now = time.time() if now is None else now
+        with self._lock:
+            skipped = sorted(client_id for client_id, client in self._clients.items()
+                             if client['retry_at'] is not None and client['retry_at'] > now)
+            return {client_id: dict(client) for client_id, client in self._clients.items()
+                    if client_id not in skipped}, skipped
+
+    def record_delivery(self, client_id, round_number):
+        """Remember that ``client_id`` holds global round ``round_number``, the base of its next delta."""
+        with self._lock:
+            if client_id in self._clients:
+                self._clients[client_id]['delivered_round'] = round_number
+
+    def record_deliveries(self, deliveries, round_number, now=None):
+        """
+        Apply the DeliveryResults of a broadcast of ``round_number`` and save the registry. A failure backs
+        the client off, the ``max_failures``-th in a row evicts it. Returns the IDs of the evicted clients.
+        """
+        now = time.time() if now is None else now
+        evicted = []
+        with self._lock:
+            for delivery in deliveries:
+                client = self._clients.get(delivery.client_id)
+                if client is None:
+                    continue
+                if delivery.success:
+                    client.update(delivered_round=round_number, last_delivery=now, failures=0, retry_at=None)
+                    continue
+                client['failures'] += 1
+                if client['failures'] >= self.max_failures:
+                    del self._clients[delivery.client_id]
+                    evicted.append(delivery.client_id)
+                else:
+                    client['retry_at'] = now + min(self.backoff * 2 ** (client['failures'] - 1), self.max_backoff)
+            self._save()
+        return evicted
+
+    def remove(self, client_id):
+        with self._lock:
+            if self._clients.pop(client_id, None) is not None:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def close(self):
+        self.save()
+        self.session.close()
+
+    def _save(self):
+        # Only called with the lock held
+        if self.path is not None:
+            data = json.dumps(self._clients).encode("utf-8")
+            atomic_write(self.path, lambda f: f.write(data))
@@ -0,0 +1,94 @@
+"""
+Compressed model deltas against a global round, carried in the binary model format.
+
+A delta payload is a regular binary model whose metadata is
+    {"encoding": "delta", "base_round": N, "compression": ..., "tensors": {name: {"shape": [...], ...}}}
+and whose tensors hold, per state-dict entry, the compressed difference to global round N:
+    float16   ``name``: the dense delta as float16
+    int8      ``name``: the dense delta quantized to int8, ``scale`` in the tensor metadata
+    topk      ``name.indices`` (uint32, flat) and ``name.values`` (float16): the k largest changes by magnitude
+The receiver rebuilds the full tensors by adding the decoded delta to its copy of round N.
+"""
+import numpy as np
+
+from model_format import encode_state_dict
+
+DELTA_ENCODING = "delta"
+FLOAT16 = "float16"
+INT8 = "int8"
+TOPK = "topk"
+COMPRESSIONS = (FLOAT16, INT8, TOPK)
+DEFAULT_TOPK_FRACTION = 0.1
+
+
+def is_delta(metadata):
+    return metadata.get("encoding") == DELTA_ENCODING
+
+
+def encode_delta(state_dict, base, compression=FLOAT16, base_round=None, topk_fraction=DEFAULT_TOPK_FRACTION):
+    """Compress ``state_dict - base`` and serialize it in the binary model format."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown delta compression {compression}, expected one of {', '.join(COMPRESSIONS)}.")
+    tensors, tensor_metadata = {}, {}
+    for name, value in state_dict.items():
+        delta = np.asarray(value, dtype=np.float32) - np.asarray(base[name], dtype=np.float32)
+        info = {"shape": list(delta.shape)}
+        if compression == FLOAT16:
+            tensors[name] = delta.astype(np.float16)
+        elif compression == INT8:
+            peak = float(np.abs(delta).max()) if delta.size else 0.0
+            scale = peak / 127 if peak > 0 else 1.0
+            tensors[name] = np.clip(np.rint(delta / scale), -127, 127).astype(np.int8)
+            info["scale"] = scale
+        else:
+            flat = delta.ravel()
+            k = min(flat.size, max(1, int(np.ceil(topk_fraction * flat.size)))) if flat.size else 0
+            # argpartition selects the k largest magnitudes in linear time, no full sort
+            indices = np.sort(np.argpartition(np.abs(flat), flat.size - k)[flat.size - k:]) if k else np.empty(0)
+            tensors[f"{name}.indices"] = indices.astype(np.uint32)
+            tensors[f"{name}.values"] = flat[indices.astype(np.intp)].astype(np.float16)
+        tensor_metadata[name] = info
+    metadata = {"encoding": DELTA_ENCODING, "base_round": base_round, "compression": compression,
+                "tensors": tensor_metadata}
+    return encode_state_dict(tensors, dtype=None, metadata=metadata)
+
+
+def decode_delta(tensors, metadata):
+    """Expand the compressed tensors of a delta payload into dense float32 deltas."""
+    compression = metadata.get("compression")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown delta compression {compression}.")
+    deltas = {}
+    for name, info in metadata.get("tensors", {}).items():
+        shape = tuple(info["shape"])
+        if compression == TOPK:
+            indices, values = tensors.get(f"{name}.indices"), tensors.get(f"{name}.values")
+            if indices is None or values is None or indices.shape != values.shape:
+                raise ValueError(f"Sparse delta of {name} is incomplete.")
+            size = int(np.prod(shape, dtype=np.int64))
+            if indices.size and int(indices.max()) >= size:
+                raise ValueError(f"Sparse delta of {name} has indices out of range.")
+            delta = np.zeros(size, dtype=np.float32)
+            delta[indices.astype(np.intp)] = values
+            deltas[name] = delta.reshape(shape)
+        else:
+            if name not in tensors or tensors[name].shape != shape:
+                raise ValueError(f"Delta of {name} is missing or does not have shape {list(shape)}.")
+            delta = tensors[name].astype(np.float32)
+            if compression == INT8:
+                delta *= info["scale"]
+            deltas[name] = delta
+    return deltas
+
+
+def apply_delta(base, deltas):
+    """Rebuild the full float32 state dict from its ``base`` round and the decoded ``deltas``."""
+    if base.keys() != deltas.keys():
+        raise ValueError("Delta entries do not match the entries of its base model.")
+    full = {}
+    for name, delta in deltas.items():
+        base_value = np.asarray(base[name], dtype=np.float32)
+        if base_value.shape != delta.shape:
+            raise ValueError(f"Delta of {name} has shape {delta.shape}, its base {base_value.shape}.")
+        full[name] = base_value + delta
+    return full
@@ -0,0 +1,166 @@
+"""
+Per-round instrumentation of the server: timing spans of every stage of a round, payload sizes of the
+uploads, latencies of the broadcasts and bytes in/out. Exposed as JSON round reports and in the
+Prometheus text format.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Stages of a round: receive and parse are summed over the uploads, the others run once per round
+STAGES = ('receive', 'parse', 'aggregate', 'persist', 'broadcast')
+DEFAULT_HISTORY = 100
+
+
+class RoundMetrics:
+    """Measurements of a single round."""
+
+    def __init__(self, round_id):
+        self.round_id = round_id
+        self.started = time.time()
+        self.finished = None
+        self.status = 'collecting'
+        self.spans = dict.fromkeys(STAGES, 0.0)
+        self.uploads = {}
+        self.deliveries = {}
+
+    @property
+    def bytes_in(self):
+        return sum(upload['bytes'] for upload in self.uploads.values())
+
+    @property
+    def bytes_out(self):
+        return sum(delivery['bytes'] for delivery in self.deliveries.values() if delivery['success'])
+
+    def to_dict(self):
+        return {'round_id': self.round_id, 'status': self.status, 'started': self.started,
+                'finished': self.finished,
+                'duration': (self.finished or time.time()) - self.started,
+                'spans': dict(self.spans), 'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out,
+                'uploads': dict(self.uploads), 'deliveries': dict(self.deliveries)}
+
+
+class Metrics:
+    """
+    Thread-safe collector of the RoundMetrics of the last ``history`` rounds, plus counters over the whole
+    life of the server for the Prometheus endpoint.
+    """
+
+    def __init__(self, history=DEFAULT_HISTORY):
+        self._lock = threading.Lock()
+        self._history = history
+        self._rounds = OrderedDict()
+        self._totals = {'uploads': 0, 'bytes_in': 0, 'bytes_out': 0, 'deliveries_success': 0,
+                        'deliveries_failure': 0, 'delivery_seconds': 0.0, 'rounds_complete': 0, 'rounds_failed': 0}
+        self._stage_sums = dict.fromkeys(STAGES, 0.0)
+        self._stage_counts = dict.fromkeys(STAGES, 0)
+
+    def _round(self, round_id):
+        # Only called with the lock held
+        if round_id not in self._rounds:
+            self._rounds[round_id] = RoundMetrics(round_id)
+            while len(self._rounds) > self._history:
+                self._rounds.popitem(last=False)
+        return self._rounds[round_id]
+
+    def start_round(self, round_id):
+        """Start measuring round ``round_id``, from now on."""
+        with self._lock:
+            self._rounds.pop(round_id, None)
+            self._round(round_id)
+
+    def add_span(self, round_id, stage, seconds):
+        with self._lock:
+            self._round(round_id).spans[stage] += seconds
+            self._stage_sums[stage] += seconds
+            self._stage_counts[stage] += 1
+
+    @contextmanager
+    def span(self, round_id, stage):
+        """Time the block as ``stage`` of round ``round_id``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(round_id, stage, time.perf_counter() - start)
+
+    def record_upload(self, round_id, client_id, nbytes, receive=None, parse=None):
+        with self._lock:
+            self._round(round_id).uploads[client_id] = {'bytes': nbytes, 'receive': receive, 'parse': parse}
+            self._totals['uploads'] += 1
+            self._totals['bytes_in'] += nbytes
+        for stage, seconds in (('receive', receive), ('parse', parse)):
+            if seconds is not None:
+                self.add_span(round_id, stage, seconds)
+
+    def record_deliveries(self, round_id, deliveries):
+        with self._lock:
+            current = self._round(round_id)
+            for delivery in deliveries:
+                nbytes = delivery.payload_size if delivery.success else 0
+                current.deliveries[delivery.client_id] = {'bytes': nbytes, 'latency': delivery.elapsed,
+                                                          'attempts': delivery.attempts, 'success': delivery.success}
+                self._totals['deliveries_success' if delivery.success else 'deliveries_failure'] += 1
+                self._totals['delivery_seconds'] += delivery.elapsed
+                self._totals['bytes_out'] += nbytes
+
+    def finish_round(self, round_id, status='complete'):
+        with self._lock:
+            current = self._round(round_id)
+            current.status = status
+            current.finished = time.time()
+            self._totals[f'rounds_{status}'] += 1
+
+    def round_report(self, round_id=None):
+        """JSON report of round ``round_id``, by default of the last round with measurements."""
+        with self._lock:
+            if round_id is None:
+                if not self._rounds:
+                    raise KeyError("No round has been measured yet.")
+                round_id = next(reversed(self._rounds))
+            if round_id not in self._rounds:
+                raise KeyError(f"No measurements of round {round_id}.")
+            return self._rounds[round_id].to_dict()
+
+    def prometheus(self, round_status=None):
+        """Counters and the spans of the last round in the Prometheus text exposition format."""
+        with self._lock:
+            totals = dict(self._totals)
+            stage_sums, stage_counts = dict(self._stage_sums), dict(self._stage_counts)
+            last = next(reversed(self._rounds.values())).to_dict() if self._rounds else None
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP fedaurora_{name} {help_text}")
+            lines.append(f"# TYPE fedaurora_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"fedaurora_{name}{labels} {value}")
+
+        metric('rounds_total', 'counter', 'Finished rounds.',
+               [('{status="complete"}', totals['rounds_complete']), ('{status="failed"}', totals['rounds_failed'])])
+        metric('uploads_total', 'counter', 'Accepted client uploads.', [('', totals['uploads'])])
+        metric('received_bytes_total', 'counter', 'Bytes of accepted client uploads.', [('', totals['bytes_in'])])
+        metric('sent_bytes_total', 'counter', 'Bytes of the global models delivered to clients.',
+               [('', totals['bytes_out'])])
+        metric('deliveries_total', 'counter', 'Deliveries of the global model to clients.',
+               [('{result="success"}', totals['deliveries_success']),
+                ('{result="failure"}', totals['deliveries_failure'])])
+        metric('delivery_seconds_total', 'counter', 'Time spent delivering global models, retries included.',
+               [('', totals['delivery_seconds'])])
+        metric('stage_seconds_total', 'counter', 'Time spent in every stage of the rounds.',
+               [(f'{{stage="{stage}"}}', stage_sums[stage]) for stage in STAGES])
+        metric('stage_spans_total', 'counter', 'Number of measured spans of every stage.',
+               [(f'{{stage="{stage}"}}', stage_counts[stage]) for stage in STAGES])
+        if last is not None:
+            metric('last_round_stage_seconds', 'gauge', 'Time spent in every stage of the last measured round.',
+                   [(f'{{stage="{stage}"}}', last['spans'][stage]) for stage in STAGES])
+            metric('last_round_duration_seconds', 'gauge', 'Duration of the last measured round.',
+                   [('', last['duration'])])
+        if round_status is not None:
+            metric('round_id', 'gauge', 'ID of the current round.', [('', round_status['round_id'])])
+            metric('round_received_models', 'gauge', 'Models received in the current round.',
+                   [('', round_status['received'])])
+            metric('round_expected_models', 'gauge', 'Models expected in the current round.',
+                   [('', round_status['total'])])
+        return "\n".join(lines) + "\n"
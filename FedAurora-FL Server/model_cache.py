@@ -0,0 +1,99 @@
+"""
+In-memory cache of the latest global model for the pull endpoint, ``GET /global_model``.
+
+Every version is serialized once per format when it is published (and gzipped once, the first time a
+client asks for it), so polling clients are answered from memory instead of reading and re-encoding the
+model file on every request. Responses carry a strong ETag and the version, and a client sending the
+ETag of the model it already holds in If-None-Match gets a bodiless 304.
+"""
+import gzip
+import hashlib
+import threading
+
+from model_format import preferred_media_type
+
+IDENTITY = "identity"
+GZIP = "gzip"
+GZIP_LEVEL = 6
+
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip (listed, or ``*``, without ``q=0``)."""
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() in (GZIP, "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header lists ``etag``, compared weakly as GET requests are."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class GlobalModelCache:
+    """
+    Thread-safe cache of the serialized payloads of the latest global model version.
+    ``load_latest()`` returns ``(version, {media_type: payload})`` of the latest stored model, it is only
+    called while nothing was published since the server started; FileNotFoundError if there is none.
+    """
+
+    def __init__(self, load_latest=None):
+        self._load_latest = load_latest
+        self._lock = threading.Lock()
+        self.version = None
+        self._variants = {}
+        self._etags = {}
+
+    def _set(self, version, payloads):
+        # Only called with the lock held
+        self.version = version
+        self._variants = {media_type: {IDENTITY: payload} for media_type, payload in payloads.items()}
+        self._etags = {}
+
+    def update(self, version, payloads):
+        """Publish ``version`` with its serialized ``payloads`` per Content-Type, unless a newer one is cached."""
+        with self._lock:
+            if self.version is None or version >= self.version:
+                self._set(version, payloads)
+
+    def get(self, media_type, encoding=IDENTITY):
+        """``(payload, etag, version)`` of the latest global model in ``media_type`` and ``encoding``."""
+        with self._lock:
+            if self.version is None:
+                if self._load_latest is None:
+                    raise FileNotFoundError("No global model has been stored yet.")
+                self._set(*self._load_latest())
+            variants = self._variants[media_type]
+            if encoding not in variants:
+                # Compressed while holding the lock: the clients polling right after a new version is
+                # published wait for a single compression instead of each running their own
+                variants[encoding] = gzip.compress(variants[IDENTITY], GZIP_LEVEL, mtime=0)
+            key = (media_type, encoding)
+            if key not in self._etags:
+                # The digest tells apart models of the same version number, e.g. after the history was cleared
+                digest = hashlib.sha256(variants[encoding]).hexdigest()[:16]
+                self._etags[key] = f'"{self.version}-{digest}"'
+            return variants[encoding], self._etags[key], self.version
+
+    def respond(self, accept=None, accept_encoding=None, if_none_match=None):
+        """
+        Negotiate a ``GET /global_model`` request from its Accept, Accept-Encoding and If-None-Match headers.
+        Returns ``(status, body, headers)``: 200 with the model, or 304 without a body if it is unchanged.
+        """
+        media_type = preferred_media_type(accept)
+        encoding = GZIP if accepts_gzip(accept_encoding) else IDENTITY
+        payload, etag, version = self.get(media_type, encoding)
+        # no-cache: intermediaries may store the model but must revalidate it, which the ETag makes cheap
+        headers = {'ETag': etag, 'X-FedAurora-Round': str(version), 'Cache-Control': 'no-cache',
+                   'Vary': 'Accept, Accept-Encoding'}
+        if etag_matches(if_none_match, etag):
+            return 304, b"", headers
+        headers['Content-Type'] = media_type
+        if encoding == GZIP:
+            headers['Content-Encoding'] = GZIP
+        return 200, payload, headers
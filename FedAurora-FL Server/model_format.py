@@ -0,0 +1,141 @@
+"""
+Compact binary wire and storage format for state dicts.
+
+Layout (all integers little-endian):
+    4 bytes   magic b"FAUR"
+    uint16    format version
+    uint16    reserved (0)
+    uint32    length of the JSON header in bytes
+    header    UTF-8 JSON: {"tensors": [{"name", "dtype", "shape", "offset", "nbytes"}, ...], "metadata": {...}}
+    padding   up to the next ALIGNMENT boundary
+    data      contiguous little-endian tensor buffers, each starting on an ALIGNMENT boundary;
+              offsets in the header are relative to the start of the data section
+
+The alignment lets the buffers be mapped straight into NumPy views, without parsing or copying.
+"""
+import json
+import struct
+
+import numpy as np
+
+MEDIA_TYPE = "application/x-fedaurora-model"
+JSON_MEDIA_TYPE = "application/json"
+MAGIC = b"FAUR"
+VERSION = 1
+ALIGNMENT = 64
+DEFAULT_DTYPE = "<f4"
+_PREAMBLE = struct.Struct("<4sHHI")
+
+
+def _align(n):
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def _as_little_endian(value, dtype):
+    if dtype is not None:
+        return np.asarray(value, dtype=dtype)
+    # Keep the dtype of the array (e.g. float16 or int8 compressed tensors), only fix its byte order
+    array = np.asarray(value)
+    return array.astype(array.dtype.newbyteorder("<"), copy=False)
+
+
+def as_stored(state_dict, dtype=DEFAULT_DTYPE):
+    """The tensors of ``state_dict`` converted to ``dtype``, the exact values a model file holds."""
+    return {k: _as_little_endian(v, dtype) for k, v in state_dict.items()}
+
+
+def encode_header(state_dict, dtype=DEFAULT_DTYPE, metadata=None):
+    """
+    Build the preamble + header for ``state_dict`` and return it with the arrays to write after it.
+    Tensors are converted to ``dtype``, or keep their own dtype when it is None.
+    """
+    arrays = as_stored(state_dict, dtype)
+    tensors = []
+    offset = 0
+    for name, array in arrays.items():
+        tensors.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape),
+                        "offset": offset, "nbytes": array.nbytes})
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({"tensors": tensors, "metadata": metadata or {}}).encode("utf-8")
+    preamble = _PREAMBLE.pack(MAGIC, VERSION, 0, len(header)) + header
+    preamble += b"\0" * (_align(len(preamble)) - len(preamble))
+    return preamble, tensors, arrays
+
+
+def encode_state_dict(state_dict, dtype=DEFAULT_DTYPE, metadata=None):
+    """Serialize a state dict (nested lists or ndarrays) into the binary format."""
+    preamble, tensors, arrays = encode_header(state_dict, dtype, metadata)
+    data_size = _align(tensors[-1]["offset"] + tensors[-1]["nbytes"]) if tensors else 0
+    buffer = bytearray(len(preamble) + data_size)
+    buffer[:len(preamble)] = preamble
+    for tensor in tensors:
+        start = len(preamble) + tensor["offset"]
+        buffer[start:start + tensor["nbytes"]] = arrays[tensor["name"]].tobytes()
+    return bytes(buffer)
+
+
+def write_state_dict(f, state_dict, dtype=DEFAULT_DTYPE, metadata=None):
+    """Stream a state dict in the binary format to an open binary file, one tensor at a time."""
+    preamble, tensors, arrays = encode_header(state_dict, dtype, metadata)
+    f.write(preamble)
+    written = 0
+    for tensor in tensors:
+        f.write(b"\0" * (tensor["offset"] - written))
+        f.write(memoryview(np.ascontiguousarray(arrays[tensor["name"]])).cast("B"))
+        written = tensor["offset"] + tensor["nbytes"]
+    f.write(b"\0" * (_align(written) - written))
+
+
+def decode_header(buffer):
+    """Parse the preamble and header. Returns (header dict, offset of the data section)."""
+    if len(buffer) < _PREAMBLE.size:
+        raise ValueError("Model payload is too short.")
+    magic, version, _, header_length = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Model payload is not in the FedAurora binary format.")
+    if version != VERSION:
+        raise ValueError(f"Unsupported FedAurora binary format version {version}.")
+    header_end = _PREAMBLE.size + header_length
+    if len(buffer) < header_end:
+        raise ValueError("Model payload header is truncated.")
+    header = json.loads(bytes(buffer[_PREAMBLE.size:header_end]).decode("utf-8"))
+    return header, _align(header_end)
+
+
+def decode_state_dict(buffer, with_metadata=False):
+    """
+    Deserialize a binary model into ``{name: ndarray}``. The arrays are read-only views on ``buffer``
+    (bytes, bytearray, mmap, ...), no tensor data is copied.
+    """
+    header, data_start = decode_header(buffer)
+    state_dict = {}
+    for tensor in header["tensors"]:
+        dtype = np.dtype(tensor["dtype"])
+        count = int(np.prod(tensor["shape"], dtype=np.int64))
+        if count * dtype.itemsize != tensor["nbytes"]:
+            raise ValueError(f"Tensor {tensor['name']} size does not match its shape.")
+        start = data_start + tensor["offset"]
+        if start + tensor["nbytes"] > len(buffer):
+            raise ValueError(f"Tensor {tensor['name']} is truncated.")
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=start)
+        state_dict[tensor["name"]] = array.reshape(tensor["shape"])
+    if with_metadata:
+        return state_dict, header.get("metadata", {})
+    return state_dict
+
+
+def is_binary_media_type(mimetype):
+    return mimetype == MEDIA_TYPE
+
+
+def preferred_media_type(accept):
+    """The binary format if an Accept header lists it, JSON otherwise."""
+    accepted = [part.split(";")[0].strip() for part in (accept or "").split(",")]
+    return MEDIA_TYPE if MEDIA_TYPE in accepted else JSON_MEDIA_TYPE
+
+
+def encode_for_media_type(state_dict, mimetype):
+    """Serialize a JSON-compatible state dict for the given Content-Type."""
+    if is_binary_media_type(mimetype):
+        return encode_state_dict(state_dict)
+    return json.dumps(state_dict).encode("utf-8")
@@ -0,0 +1,156 @@
+import json
+import mmap
+import os
+import re
+
+from model_format import decode_state_dict, write_state_dict
+
+LOCAL_MODEL_SUFFIX = "_model.bin"
+LEGACY_LOCAL_MODEL_SUFFIX = "_model.json"
+LATEST_GLOBAL_MODEL = "averaged_model"
+GLOBAL_ROUND_PATTERN = re.compile(r"^averaged_model_round_(\d+)\.bin$")
+
+
+def atomic_write(path, write):
+    """
+    Write a file through ``write(f)`` into a temporary file next to ``path`` and rename it into place,
+    so a crash never leaves a half-written model behind.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def map_file(path):
+    """Read-only memory mapping of a whole file."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"Model file {path} is empty.")
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def map_model_file(path, with_metadata=False):
+    """Memory-map a binary model file. The tensors are zero-copy read-only NumPy views on the mapping."""
+    return decode_state_dict(map_file(path), with_metadata=with_metadata)
+
+
+def load_model_file(path):
+    """Returns ``(state_dict, metadata)`` of a binary model file, or of a JSON one stored by earlier versions."""
+    if path.endswith(LEGACY_LOCAL_MODEL_SUFFIX):
+        with open(path, "r") as f:
+            return json.load(f), {}
+    return map_model_file(path, with_metadata=True)
+
+
+class ModelStore:
+    """
+    On-disk store of the client models of the current round (one memory-mapped binary file per client)
+    and of the versioned history of global models, one file per aggregation round.
+    """
+
+    def __init__(self, local_folder, global_folder):
+        self.local_folder = local_folder
+        self.global_folder = global_folder
+        os.makedirs(local_folder, exist_ok=True)
+        os.makedirs(global_folder, exist_ok=True)
+
+    # Client models
+
+    def local_path(self, client_id):
+        return os.path.join(self.local_folder, f"{client_id}{LOCAL_MODEL_SUFFIX}")
+
+    def save_local(self, client_id, state_dict, metadata=None):
+        atomic_write(self.local_path(client_id), lambda f: write_state_dict(f, state_dict, metadata=metadata))
+        legacy_path = os.path.join(self.local_folder, f"{client_id}{LEGACY_LOCAL_MODEL_SUFFIX}")
+        if os.path.exists(legacy_path):
+            os.unlink(legacy_path)
+        return self.local_path(client_id)
+
+    def stored_local_path(self, client_id):
+        """Path of the stored model of a client, including JSON models stored by earlier versions."""
+        path = self.local_path(client_id)
+        if os.path.exists(path):
+            return path
+        return os.path.join(self.local_folder, f"{client_id}{LEGACY_LOCAL_MODEL_SUFFIX}")
+
+    def load_local(self, client_id):
+        """Returns ``(state_dict, metadata)`` of a client model, tensors are views on the mapped file."""
+        return load_model_file(self.stored_local_path(client_id))
+
+    def has_local(self, client_id):
+        return any(os.path.exists(os.path.join(self.local_folder, f"{client_id}{suffix}"))
+                   for suffix in (LOCAL_MODEL_SUFFIX, LEGACY_LOCAL_MODEL_SUFFIX))
+
+    def local_client_ids(self):
+        client_ids = []
+        for filename in sorted(os.listdir(self.local_folder)):
+            for suffix in (LOCAL_MODEL_SUFFIX, LEGACY_LOCAL_MODEL_SUFFIX):
+                if filename.endswith(suffix):
+                    client_ids.append(filename[:-len(suffix)])
+        return client_ids
+
+    def delete_local(self, client_id):
+        for suffix in (LOCAL_MODEL_SUFFIX, LEGACY_LOCAL_MODEL_SUFFIX):
+            path = os.path.join(self.local_folder, f"{client_id}{suffix}")
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def clear_local(self):
+        for filename in os.listdir(self.local_folder):
+            file_path = os.path.join(self.local_folder, filename)
+            if os.path.isfile(file_path):
+                os.unlink(file_path)
+
+    # Global models
+
+    def global_round_path(self, round_number):
+        return os.path.join(self.global_folder, f"averaged_model_round_{round_number:05d}.bin")
+
+    def global_rounds(self):
+        rounds = []
+        for filename in os.listdir(self.global_folder):
+            match = GLOBAL_ROUND_PATTERN.match(filename)
+            if match:
+                rounds.append(int(match.group(1)))
+        return sorted(rounds)
+
+    def latest_global_round(self):
+        rounds = self.global_rounds()
+        return rounds[-1] if rounds else None
+
+    def save_global(self, state_dict, payloads, metadata=None):
+        """
+        Store the averaged model of a new round in the history and replace the latest model files
+        (``averaged_model.<extension>``) with the already serialized ``payloads`` (extension -> bytes).
+        Returns the new round number.
+        """
+        round_number = (self.latest_global_round() or 0) + 1
+        metadata = dict(metadata or {}, round=round_number)
+        atomic_write(self.global_round_path(round_number),
+                     lambda f: write_state_dict(f, state_dict, metadata=metadata))
+        for extension, payload in payloads.items():
+            atomic_write(os.path.join(self.global_folder, f"{LATEST_GLOBAL_MODEL}{extension}"),
+                         lambda f: f.write(payload))
+        return round_number
+
+    def prune_global(self, oldest):
+        """Delete the history files of the global rounds before ``oldest``, the latest model files are kept."""
+        for round_number in self.global_rounds():
+            if round_number >= oldest:
+                break
+            os.unlink(self.global_round_path(round_number))
+
+    def load_global(self, round_number=None):
+        """Returns ``(state_dict, metadata)`` of a global round, the latest one by default."""
+        round_number = round_number or self.latest_global_round()
+        if round_number is None:
+            raise FileNotFoundError("No global model has been stored yet.")
+        return map_model_file(self.global_round_path(round_number), with_metadata=True)
@@ -0,0 +1,101 @@
+import math
+import threading
+
+import numpy as np
+
+from aggregation import arrays_to_state_dict, state_dict_to_arrays
+
+DEFAULT_DELTA = 1e-5
+# Rényi orders the privacy budget is tracked at, the tightest one is reported
+DEFAULT_ORDERS = (1.25, 1.5, 1.75, 2, 2.5, 3, 4, 5, 6, 8, 10, 12, 16, 20, 24, 32, 48, 64, 128, 256)
+
+
+def l2_norm(arrays):
+    """Global L2 norm over every tensor of a state dict, as if they were one flat vector."""
+    return math.sqrt(sum(float(np.vdot(v, v)) for v in arrays.values()))
+
+
+def clip_update(state_dict, clip_norm, base):
+    """
+    Scale the update of a client (its model minus the ``base`` global model it trained from) down to an L2
+    norm of at most ``clip_norm``. Returns ``(float64 arrays, norm before clipping)``.
+    """
+    arrays = state_dict_to_arrays(state_dict)
+    base = state_dict_to_arrays(base)
+    if base.keys() != arrays.keys():
+        raise ValueError("State dict keys do not match the global model.")
+    updates = {k: v - base[k] for k, v in arrays.items()}
+    norm = l2_norm(updates)
+    if norm <= clip_norm:
+        return arrays, norm
+    scale = clip_norm / norm
+    return {k: base[k] + u * scale for k, u in updates.items()}, norm
+
+
+class PrivacyAccountant:
+    """
+    Tracks the (epsilon, delta) budget spent by the Gaussian mechanism across rounds with Rényi DP: every
+    round with noise multiplier sigma costs alpha / (2 sigma^2) at order alpha, and the rounds compose by
+    summing. Assumes every client of a round takes part, without the amplification of client sampling.
+    """
+
+    def __init__(self, delta=DEFAULT_DELTA, orders=DEFAULT_ORDERS):
+        self.delta = delta
+        self.orders = np.asarray(orders, dtype=np.float64)
+        self.rounds = 0
+        self._rdp = np.zeros_like(self.orders)
+        self._lock = threading.Lock()
+
+    def spend(self, noise_multiplier, rounds=1):
+        if noise_multiplier <= 0:
+            raise ValueError(f"Noise multiplier must be positive, got {noise_multiplier}.")
+        with self._lock:
+            self._rdp += rounds * self.orders / (2 * noise_multiplier ** 2)
+            self.rounds += rounds
+
+    def epsilon(self):
+        with self._lock:
+            if not self.rounds:
+                return 0.0
+            return float(np.min(self._rdp + math.log(1 / self.delta) / (self.orders - 1)))
+
+    def snapshot(self):
+        return {'rounds': self.rounds, 'epsilon': self.epsilon(), 'delta': self.delta}
+
+
+class GaussianMechanism:
+    """
+    Differential privacy stage of the aggregation pipeline: every client update is clipped to an L2 norm
+    of ``clip_norm`` on upload, and Gaussian noise with a standard deviation of ``noise_multiplier`` times
+    the sensitivity of the weighted mean is added to the aggregate. Noise comes from a generator seeded
+    with ``seed``, so a run can be reproduced.
+    """
+
+    def __init__(self, clip_norm, noise_multiplier, seed=None, accountant=None):
+        if clip_norm <= 0 or noise_multiplier <= 0:
+            raise ValueError("Clip norm and noise multiplier must be positive.")
+        self.clip_norm = clip_norm
+        self.noise_multiplier = noise_multiplier
+        self.accountant = accountant or PrivacyAccountant()
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def clip(self, state_dict, base):
+        return clip_update(state_dict, self.clip_norm, base)[0]
+
+    def noise_std(self, weights):
+        """Standard deviation of the noise for a weighted mean of clipped updates with ``weights``."""
+        weights = np.asarray(weights, dtype=np.float64)
+        # Changing one client moves the weighted mean by at most its share of the clip norm
+        return self.noise_multiplier * self.clip_norm * float(weights.max() / weights.sum())
+
+    def add_noise(self, state_dict, weights):
+        """Return the aggregate with Gaussian noise added and charge one round to the accountant."""
+        if not len(weights):
+            raise ValueError("Cannot add noise to an aggregate of no clients.")
+        std = self.noise_std(weights)
+        arrays = state_dict_to_arrays(state_dict)
+        with self._lock:
+            noisy = {k: v + self._rng.standard_normal(v.shape) * std for k, v in arrays.items()}
+        self.accountant.spend(self.noise_multiplier)
+        return arrays_to_state_dict(noisy)
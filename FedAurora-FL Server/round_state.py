@@ -0,0 +1,220 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from aggregation import RunningAggregator, state_dict_signature
+from client_registry import ClientRegistry
+
+IDLE = 'idle'
+COLLECTING = 'collecting'
+AGGREGATING = 'aggregating'
+
+
+class StaleRoundError(ValueError):
+    """Raised for an upload that does not belong to the round currently collecting models."""
+
+
+class Round:
+    """Everything that belongs to a single round: its ID, the clients that uploaded and their running sum."""
+
+    def __init__(self, round_id):
+        self.round_id = round_id
+        self.aggregator = RunningAggregator()
+        self.received = set()
+        self._client_locks = {}
+        self._signature = None
+        self._signature_lock = threading.Lock()
+
+    def client_lock(self, client_id):
+        # Only called with the RoundState condition held
+        return self._client_locks.setdefault(client_id, threading.Lock())
+
+    def check_signature(self, state_dict):
+        """
+        Raise ValueError unless the names and shapes of ``state_dict`` match the first model of the round.
+        Used when models are only stored on upload and summed later, not folded into the aggregator.
+        """
+        signature = state_dict_signature(state_dict)
+        with self._signature_lock:
+            if self._signature is None:
+                self._signature = signature
+            elif signature != self._signature:
+                raise ValueError("State dict keys or shapes do not match the models already uploaded.")
+
+
+class RoundState:
+    """
+    Thread-safe manager of the current federated round and of the known clients. Uploads run
+    concurrently with each other (only two uploads of the same client are serialized), and are fenced
+    off from aggregation and resets: ``seal`` waits for the in-flight uploads and hands the aggregator a
+    round nobody writes to anymore, and a reset swaps in a fresh round instead of clearing shared state.
+    The aggregator thread is woken up as soon as the last expected client arrives, or the round deadline
+    passes, instead of polling the local models folder.
+    """
+
+    def __init__(self, round_id=1, registry=None):
+        self._condition = threading.Condition()
+        self._round = Round(round_id)
+        self._status = IDLE
+        self._expected = 0
+        self._quorum = 1.0
+        self._deadline = None
+        self._in_flight = 0
+        # The clients the global model is pushed to, kept across rounds (and restarts, if it has a file)
+        self.registry = registry if registry is not None else ClientRegistry()
+
+    @property
+    def round_id(self):
+        return self._round.round_id
+
+    def start(self, expected, round_id=None, quorum=1.0, timeout=None):
+        """
+        Start collecting ``expected`` models. Once ``timeout`` seconds have passed the round is aggregated
+        with whatever has arrived, provided at least a ``quorum`` fraction of the expected clients uploaded.
+        """
+        if not 0 < quorum <= 1:
+            raise ValueError(f"Quorum must be a fraction in (0, 1], got {quorum}.")
+        with self._condition:
+            if round_id is not None:
+                self._round.round_id = round_id
+            self._status = COLLECTING
+            self._expected = expected
+            self._quorum = quorum
+            self._deadline = time.monotonic() + timeout if timeout is not None else None
+            self._condition.notify_all()
+            return self._snapshot()
+
+    def check_upload(self, round_id=None):
+        """Raise StaleRoundError if an upload tagged with ``round_id`` cannot be accepted right now."""
+        with self._condition:
+            self._check_upload(round_id)
+
+    @contextmanager
+    def upload(self, client_id, round_id=None, client_address=None, media_type=None, accept_delta=None):
+        """
+        Admit an upload into the current round and yield that Round, to fold the model into its
+        aggregator. The client only counts as received, and its address is only registered, once the
+        block completes without an exception.
+        """
+        with self._condition:
+            self._check_upload(round_id)
+            current = self._round
+            client_lock = current.client_lock(client_id)
+            self._in_flight += 1
+        try:
+            with client_lock:
+                yield current
+        except BaseException:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+            raise
+        if client_address is not None:
+            self.registry.register(client_id, client_address, media_type, accept_delta)
+        with self._condition:
+            self._in_flight -= 1
+            current.received.add(client_id)
+            self._condition.notify_all()
+
+    def record_upload(self, client_id, round_id=None):
+        with self.upload(client_id, round_id):
+            pass
+        return self.snapshot()
+
+    def clients(self):
+        """Snapshot of the known clients, see ClientRegistry."""
+        return self.registry.clients()
+
+    def record_delivery(self, client_id, round_number):
+        self.registry.record_delivery(client_id, round_number)
+
+    def seal(self):
+        """
+        Stop accepting uploads, wait for the ones in flight and return the Round to aggregate. Nothing
+        writes to it anymore, so it can be read without holding any lock.
+        """
+        with self._condition:
+            self._status = AGGREGATING
+            self._condition.wait_for(lambda: self._in_flight == 0)
+            return self._round
+
+    def finish(self, next_round_id):
+        """Close the round and wait, idle, for the next one. Uploads tagged ``next_round_id`` are accepted."""
+        with self._condition:
+            self._round = Round(next_round_id)
+            self._status = IDLE
+            self._deadline = None
+            self._condition.notify_all()
+            return self._snapshot()
+
+    def reset(self, clear=None):
+        """
+        Discard every model of the round being collected. Waits for an aggregation in progress and for
+        the uploads in flight, then calls ``clear`` (e.g. to delete the stored models) before any new
+        upload is admitted.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._status != AGGREGATING and self._in_flight == 0)
+            self._round = Round(self._round.round_id)
+            if clear is not None:
+                clear()
+            self._condition.notify_all()
+            return self._snapshot()
+
+    def is_complete(self):
+        with self._condition:
+            return self._is_complete()
+
+    def wait_until_complete(self, timeout=None):
+        """Block until every expected client has uploaded. Returns False if ``timeout`` expired first."""
+        with self._condition:
+            return self._condition.wait_for(self._is_complete, timeout=timeout)
+
+    def wait_for_round(self):
+        """
+        Block until the round can be aggregated: every expected client uploaded, or the deadline passed
+        with the quorum met. Returns False if the deadline passed without the quorum.
+        """
+        with self._condition:
+            while not self._is_complete():
+                if self._deadline is None:
+                    self._condition.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._quorum_met()
+                self._condition.wait(remaining)
+            return True
+
+    def snapshot(self):
+        with self._condition:
+            return self._snapshot()
+
+    def received_clients(self):
+        with self._condition:
+            return sorted(self._round.received)
+
+    def _check_upload(self, round_id):
+        if self._status == AGGREGATING:
+            raise StaleRoundError(f"Round {self._round.round_id} is already being aggregated.")
+        if round_id is not None and round_id != self._round.round_id:
+            raise StaleRoundError(
+                f"Upload for round {round_id} rejected, the current round is {self._round.round_id}.")
+
+    def _required(self):
+        return max(1, math.ceil(self._quorum * self._expected))
+
+    def _is_complete(self):
+        return self._expected > 0 and len(self._round.received) >= self._expected
+
+    def _quorum_met(self):
+        return self._expected > 0 and len(self._round.received) >= self._required()
+
+    def _snapshot(self):
+        remaining = None
+        if self._deadline is not None:
+            remaining = max(0.0, self._deadline - time.monotonic())
+        return {'round_id': self._round.round_id, 'status': self._status, 'received': len(self._round.received),
+                'total': self._expected, 'required': self._required() if self._expected else 0,
+                'deadline_in': remaining}
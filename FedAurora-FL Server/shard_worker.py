@@ -0,0 +1,55 @@
+"""
+Worker processes of the ShardedAggregator.
+
+The workers are spawned, not forked, and a spawned process normally imports the main script of its parent
+again, which for the server would repeat its whole module-level setup (model store, Flask app, environment
+checks) in every worker. Tasks are submitted with the main script hidden, so the workers only import this
+module and the ones it needs, none of which does anything on import.
+"""
+import multiprocessing
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from aggregation import check_weight, state_dict_signature
+from model_store import load_model_file
+
+
+def sum_model_files(paths):
+    """
+    Weighted float64 sum of the stored client models at ``paths``, read as memory-mapped views.
+    Runs in a worker process, returns ``(sums, total_weight)``.
+    """
+    sums, total_weight, signature = None, 0.0, None
+    for path in paths:
+        state_dict, metadata = load_model_file(path)
+        weight = check_weight(metadata.get("weight", 1.0))
+        if sums is None:
+            signature = state_dict_signature(state_dict)
+            sums = {k: np.zeros(np.shape(v), dtype=np.float64) for k, v in state_dict.items()}
+        elif state_dict_signature(state_dict) != signature:
+            raise ValueError(f"Model {path} does not match the shapes of the other models.")
+        for k, v in state_dict.items():
+            sums[k] += np.multiply(v, weight, dtype=np.float64) if weight != 1.0 else v
+        total_weight += weight
+    return sums, total_weight
+
+
+@contextmanager
+def main_script_hidden():
+    """Processes spawned in this block, e.g. by the ``submit()`` of a pool, do not run the main script again."""
+    main_module = sys.modules["__main__"]
+    # Without a file or a spec, a spawned process has no main script to run
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main_module
+
+
+def new_pool(workers):
+    """A pool of ``workers`` spawned processes, started by the tasks submitted under main_script_hidden()."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
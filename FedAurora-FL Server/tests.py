@@ -0,0 +1,1128 @@
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import numpy as np
+
+from aggregation import (KRUM, MEDIAN, TRIMMED_MEAN, RunningAggregator, ShardedAggregator, average_state_dicts,
+                         coordinate_median, krum_select, robust_aggregate_state_dicts, trimmed_mean)
+from async_aggregation import FEDASYNC, FEDBUFF, AsyncAggregator, staleness_weight
+from broadcast import DeliveryResult, broadcast_model, broadcast_model_async
+from chunked_upload import ChunkedUploads, ChunkOffsetError
+from client_registry import ClientRegistry
+from delta import COMPRESSIONS, INT8, TOPK, apply_delta, decode_delta, encode_delta, is_delta
+from model_cache import GlobalModelCache
+from model_format import (ALIGNMENT, JSON_MEDIA_TYPE, MEDIA_TYPE, as_stored, decode_header, decode_state_dict,
+                          encode_state_dict)
+from metrics import Metrics
+from model_store import ModelStore
+from privacy import GaussianMechanism, PrivacyAccountant, clip_update, l2_norm
+from round_state import RoundState, StaleRoundError
+
+
+class AverageStateDictsTest(unittest.TestCase):
+
+    def test_average_matches_elementwise_mean(self):
+        """Test averaging rank 1 and rank 2 entries returns their element-wise mean"""
+        state_dicts = [
+            {"w": [[1.0, 2.0], [3.0, 4.0]], "b": [1.0, 1.0]},
+            {"w": [[3.0, 4.0], [5.0, 6.0]], "b": [3.0, 5.0]},
+        ]
+        averaged = average_state_dicts(state_dicts)
+        self.assertEqual(averaged, {"w": [[2.0, 3.0], [4.0, 5.0]], "b": [2.0, 3.0]})
+
+    def test_average_supports_scalars_and_higher_ranks(self):
+        """Test averaging scalar and rank 4 entries keeps JSON-compatible nested lists"""
+        rng = np.random.default_rng(0)
+        conv = [rng.standard_normal((2, 3, 2, 2)) for _ in range(3)]
+        state_dicts = [{"conv": c.tolist(), "num_batches_tracked": i} for i, c in enumerate(conv)]
+        averaged = average_state_dicts(state_dicts)
+        self.assertIsInstance(averaged["num_batches_tracked"], float)
+        self.assertEqual(averaged["num_batches_tracked"], 1.0)
+        np.testing.assert_allclose(averaged["conv"], np.mean(conv, axis=0))
+
+    def test_weighted_average(self):
+        """Test weighting clients by their number of samples returns the FedAvg mean"""
+        state_dicts = [{"w": [0.0, 10.0]}, {"w": [10.0, 0.0]}]
+        averaged = average_state_dicts(state_dicts, weights=[1, 4])
+        np.testing.assert_allclose(averaged["w"], [8.0, 2.0])
+
+    def test_weighted_average_invalid_weights(self):
+        """Test zero, negative or missing weights are rejected"""
+        state_dicts = [{"w": [0.0]}, {"w": [1.0]}]
+        for weights in ([0, 1], [-1, 2], [1]):
+            with self.assertRaises(ValueError):
+                average_state_dicts(state_dicts, weights=weights)
+
+    def test_average_empty_list(self):
+        """Test averaging no state dicts raises an error"""
+        with self.assertRaises(ValueError):
+            average_state_dicts([])
+
+
+class RobustAggregationTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.stacked = rng.standard_normal((9, 4, 3))
+
+    def test_median_matches_numpy(self):
+        """Test the partition-based median matches np.median for odd and even client counts"""
+        for n in (9, 8, 1, 2):
+            np.testing.assert_allclose(coordinate_median(self.stacked[:n]), np.median(self.stacked[:n], axis=0))
+
+    def test_trimmed_mean_drops_the_extremes(self):
+        """Test the trimmed mean averages only the middle values of every coordinate"""
+        expected = np.sort(self.stacked, axis=0)[2:7].mean(axis=0)
+        np.testing.assert_allclose(trimmed_mean(self.stacked, 0.25), expected)
+        np.testing.assert_allclose(trimmed_mean(self.stacked, 0.0), self.stacked.mean(axis=0))
+        with self.assertRaises(ValueError):
+            trimmed_mean(self.stacked, 0.5)
+
+    def test_krum_never_selects_an_outlier(self):
+        """Test Krum selects honest clients when a few clients send far away models"""
+        flat = self.stacked.reshape(9, -1).copy()
+        flat[[2, 5]] += 50.0
+        self.assertNotIn(krum_select(flat)[0], (2, 5))
+        selected = krum_select(flat, num_byzantine=2, num_selected=7)
+        self.assertEqual(sorted(selected), [0, 1, 3, 4, 6, 7, 8])
+
+    def test_poisoned_client_does_not_drag_the_model(self):
+        """Test one poisoned client moves the mean but not the robust aggregates"""
+        state_dicts = [{"w": [1.0, 1.0], "b": 0.0} for _ in range(4)] + [{"w": [1e6, -1e6], "b": 1e6}]
+        self.assertGreater(average_state_dicts(state_dicts)["b"], 1e5)
+        for method in (MEDIAN, TRIMMED_MEAN, KRUM):
+            aggregated = robust_aggregate_state_dicts(state_dicts, method, trim_fraction=0.2)
+            self.assertEqual(aggregated, {"w": [1.0, 1.0], "b": 0.0})
+        with self.assertRaises(ValueError):
+            robust_aggregate_state_dicts(state_dicts + [{"w": [1.0], "b": 0.0}], MEDIAN)
+
+
+class RunningAggregatorTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.state_dicts = [{"w": rng.standard_normal((4, 3)).tolist(), "b": rng.standard_normal(3).tolist()}
+                            for _ in range(5)]
+        self.aggregator = RunningAggregator()
+
+    def test_running_average_matches_batch_average(self):
+        """Test folding clients one at a time gives the same result as averaging them together"""
+        for i, state_dict in enumerate(self.state_dicts):
+            self.aggregator.add(f"client{i}", state_dict)
+        self.assertEqual(self.aggregator.num_clients, 5)
+        expected = average_state_dicts(self.state_dicts)
+        for k in expected:
+            np.testing.assert_allclose(self.aggregator.average()[k], expected[k])
+
+    def test_reupload_replaces_previous_contribution(self):
+        """Test a second upload from the same client replaces its first model"""
+        self.aggregator.add("a", self.state_dicts[0])
+        self.aggregator.add("b", self.state_dicts[1])
+        self.aggregator.add("a", self.state_dicts[2], replaces=self.state_dicts[0])
+        self.assertEqual(self.aggregator.num_clients, 2)
+        expected = average_state_dicts([self.state_dicts[2], self.state_dicts[1]])
+        for k in expected:
+            np.testing.assert_allclose(self.aggregator.average()[k], expected[k])
+
+    def test_weighted_running_average_matches_batch_average(self):
+        """Test the weighted running sum matches the weighted batch mean, also after a re-upload"""
+        weights = [5, 500, 20, 1, 80]
+        for i, (state_dict, weight) in enumerate(zip(self.state_dicts, weights)):
+            self.aggregator.add(f"client{i}", state_dict, weight=weight)
+        self.aggregator.add("client0", self.state_dicts[0], weight=50, replaces=self.state_dicts[0])
+        self.assertEqual(self.aggregator.total_weight, 651)
+        expected = average_state_dicts(self.state_dicts, weights=[50] + weights[1:])
+        for k in expected:
+            np.testing.assert_allclose(self.aggregator.average()[k], expected[k])
+
+    def test_shape_mismatch_is_rejected(self):
+        """Test a model with different shapes is rejected and leaves the running sum untouched"""
+        self.aggregator.add("a", self.state_dicts[0])
+        with self.assertRaises(ValueError):
+            self.aggregator.add("b", {"w": [[1.0]], "b": [1.0, 2.0, 3.0]})
+        self.assertEqual(self.aggregator.num_clients, 1)
+
+    def test_reset_empties_running_sum(self):
+        """Test resetting the aggregator forgets every contribution"""
+        self.aggregator.add("a", self.state_dicts[0])
+        self.aggregator.reset()
+        with self.assertRaises(ValueError):
+            self.aggregator.average()
+
+
+class AsyncAggregatorTest(unittest.TestCase):
+
+    def test_fedasync_mixes_with_staleness_discount(self):
+        """Test every update advances the version and stale updates are mixed in with a smaller factor"""
+        aggregator = AsyncAggregator(alpha=0.5, staleness_exponent=1.0)
+        self.assertEqual(aggregator.submit({"w": [0.0, 0.0]}), (1, 0))
+        self.assertEqual(aggregator.submit({"w": [4.0, 8.0]}, base_version=1), (2, 0))
+        self.assertEqual(aggregator.model(), {"w": [2.0, 4.0]})
+        # Trained from version 1 while version 2 is out: staleness 1, mixing factor 0.5 / 2
+        self.assertEqual(aggregator.submit({"w": [6.0, 4.0]}, base_version=1), (3, 1))
+        self.assertEqual(aggregator.model(), {"w": [3.0, 4.0]})
+        self.assertAlmostEqual(staleness_weight(3, 0.5), 0.5)
+        with self.assertRaises(ValueError):
+            aggregator.submit({"w": [1.0, 1.0]}, base_version=4)
+        with self.assertRaises(ValueError):
+            aggregator.submit({"w": [1.0]})
+
+    def test_fedbuff_applies_buffered_updates(self):
+        """Test FedBuff publishes a version every K updates, relative to the versions they trained from"""
+        versions = {1: {"w": [0.0]}}
+        aggregator = AsyncAggregator(mode=FEDBUFF, alpha=1.0, staleness_exponent=0.0, buffer_size=2,
+                                     model={"w": [0.0]}, version=1, load_version=versions.__getitem__)
+        self.assertEqual(aggregator.submit({"w": [2.0]}, base_version=1), (None, 0))
+        self.assertEqual(aggregator.buffered, 1)
+        self.assertEqual(aggregator.submit({"w": [4.0]}, base_version=1, weight=3.0), (2, 0))
+        self.assertEqual(aggregator.model(), {"w": [3.5]})
+        versions[2] = aggregator.model()
+        aggregator.submit({"w": [1.0]}, base_version=1)
+        aggregator.submit({"w": [4.5]}, base_version=2)
+        # Updates of +1 (from version 1) and +1 (from version 2) move the model by +1
+        self.assertEqual(aggregator.model(), {"w": [4.5]})
+        self.assertEqual(aggregator.version, 3)
+
+    def test_binary_first_model_is_copied(self):
+        """Test a first model read as read-only float64 views from a binary upload can still be updated"""
+        first = decode_state_dict(encode_state_dict({"w": [2.0, 4.0]}, dtype="<f8"))
+        self.assertFalse(first["w"].flags.writeable)
+        for mode in (FEDASYNC, FEDBUFF):
+            aggregator = AsyncAggregator(mode=mode, alpha=0.5, buffer_size=1, load_version=lambda version: first)
+            self.assertEqual(aggregator.submit(first), (1, 0))
+            self.assertEqual(aggregator.submit({"w": [4.0, 8.0]}, base_version=1), (2, 0))
+            self.assertEqual(aggregator.model(), {"w": [3.0, 6.0]})
+        np.testing.assert_array_equal(first["w"], [2.0, 4.0])
+
+    def test_too_stale_updates_are_rejected(self):
+        """Test an update more than max_staleness versions behind is rejected and older versions are not needed"""
+        aggregator = AsyncAggregator(model={"w": [0.0]}, version=5, max_staleness=2)
+        self.assertEqual(aggregator.oldest_version(), 3)
+        with self.assertRaises(StaleRoundError):
+            aggregator.submit({"w": [1.0]}, base_version=2)
+        self.assertEqual(aggregator.submit({"w": [1.0]}, base_version=3), (6, 2))
+        self.assertEqual(aggregator.oldest_version(), 4)
+
+
+class RoundStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.round_state = RoundState()
+
+    def test_waiter_wakes_up_on_last_upload(self):
+        """Test the aggregator thread is released as soon as the last expected client uploads"""
+        self.round_state.start(2)
+        completed = threading.Event()
+        waiter = threading.Thread(target=lambda: self.round_state.wait_until_complete(5) and completed.set())
+        waiter.start()
+        self.round_state.record_upload("a")
+        self.assertFalse(completed.wait(0.05))
+        status = self.round_state.record_upload("b")
+        self.assertEqual((status['received'], status['total']), (2, 2))
+        waiter.join(5)
+        self.assertTrue(completed.is_set())
+
+    def test_reupload_counts_once(self):
+        """Test the same client uploading twice is counted as a single received model"""
+        self.round_state.start(2)
+        self.round_state.record_upload("a")
+        self.round_state.record_upload("a")
+        self.assertFalse(self.round_state.is_complete())
+        self.assertFalse(self.round_state.wait_until_complete(timeout=0.01))
+
+    def test_uploads_before_start_count_towards_round(self):
+        """Test models uploaded before the round is started are counted once it starts"""
+        self.round_state.record_upload("a")
+        self.assertFalse(self.round_state.is_complete())
+        self.round_state.start(1)
+        self.assertTrue(self.round_state.is_complete())
+
+    def test_reset_clears_received_clients(self):
+        """Test resetting the round forgets every received client"""
+        self.round_state.start(1)
+        self.round_state.record_upload("a")
+        status = self.round_state.reset()
+        self.assertEqual((status['received'], status['total']), (0, 1))
+
+    def test_deadline_aggregates_when_quorum_is_met(self):
+        """Test a round past its deadline can be aggregated with the clients that arrived if the quorum is met"""
+        self.round_state.start(4, quorum=0.5, timeout=0.05)
+        self.round_state.record_upload("a")
+        self.round_state.record_upload("b")
+        self.assertTrue(self.round_state.wait_for_round())
+        self.assertEqual(self.round_state.snapshot()['required'], 2)
+
+    def test_deadline_fails_round_below_quorum(self):
+        """Test a round past its deadline fails when fewer clients than the quorum uploaded"""
+        self.round_state.start(4, quorum=0.75, timeout=0.05)
+        self.round_state.record_upload("a")
+        self.assertFalse(self.round_state.wait_for_round())
+
+    def test_stale_round_uploads_are_rejected(self):
+        """Test uploads tagged with another round, or arriving during aggregation, are rejected"""
+        self.round_state.start(2, round_id=3)
+        self.round_state.record_upload("a", round_id=3)
+        with self.assertRaises(StaleRoundError):
+            self.round_state.record_upload("b", round_id=2)
+        self.round_state.seal()
+        with self.assertRaises(StaleRoundError):
+            self.round_state.check_upload()
+        self.round_state.finish(next_round_id=4)
+        self.round_state.check_upload(round_id=4)
+        self.assertEqual(self.round_state.snapshot()['received'], 0)
+
+
+    def test_concurrent_uploads_are_all_aggregated(self):
+        """Test models uploaded from many threads at once all end up in the sealed round"""
+        self.round_state.start(50)
+
+        def upload(i):
+            with self.round_state.upload(f"client{i}", client_address=f"http://client{i}") as current_round:
+                current_round.aggregator.add(f"client{i}", {"w": [float(i)]})
+
+        threads = [threading.Thread(target=upload, args=(i,)) for i in range(50)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(self.round_state.wait_until_complete(5))
+        sealed_round = self.round_state.seal()
+        self.assertEqual(sealed_round.aggregator.num_clients, 50)
+        self.assertEqual(sealed_round.aggregator.average(), {"w": [24.5]})
+        self.assertEqual(len(self.round_state.clients()), 50)
+
+    def test_seal_waits_for_uploads_in_flight(self):
+        """Test sealing a round waits for an upload in progress instead of aggregating without it"""
+        self.round_state.start(2)
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_upload():
+            with self.round_state.upload("slow") as current_round:
+                entered.set()
+                release.wait(5)
+                current_round.aggregator.add("slow", {"w": [1.0]})
+
+        uploader = threading.Thread(target=slow_upload)
+        uploader.start()
+        entered.wait(5)
+        sealed = []
+        sealer = threading.Thread(target=lambda: sealed.append(self.round_state.seal()))
+        sealer.start()
+        sealer.join(0.05)
+        self.assertFalse(sealed)
+        with self.assertRaises(StaleRoundError):
+            self.round_state.check_upload()
+        release.set()
+        sealer.join(5)
+        self.assertEqual(sealed[0].aggregator.num_clients, 1)
+
+    def test_failed_upload_is_not_counted(self):
+        """Test an upload failing inside the round is neither counted nor registered"""
+        with self.assertRaises(ValueError):
+            with self.round_state.upload("a", client_address="http://a"):
+                raise ValueError("bad model")
+        self.assertEqual(self.round_state.snapshot()['received'], 0)
+        self.assertEqual(self.round_state.clients(), {})
+
+    def test_reset_swaps_in_a_fresh_round(self):
+        """Test a reset discards the collected models but keeps the round ID and the known clients"""
+        self.round_state.start(2, round_id=7)
+        with self.round_state.upload("a", client_address="http://a") as current_round:
+            current_round.aggregator.add("a", {"w": [1.0]})
+        cleared = []
+        self.round_state.reset(clear=lambda: cleared.append(True))
+        self.assertEqual(cleared, [True])
+        self.assertEqual(self.round_state.received_clients(), [])
+        self.assertEqual(self.round_state.round_id, 7)
+        self.assertEqual(self.round_state.seal().aggregator.num_clients, 0)
+        client = self.round_state.clients()["a"]
+        self.assertEqual((client["address"], client["media_type"], client["accept_delta"], client["delivered_round"]),
+                         ("http://a", None, None, None))
+
+    def test_deliveries_are_recorded_per_client(self):
+        """Test the last delivered round of a client is kept when it uploads again"""
+        with self.round_state.upload("a", client_address="http://a", accept_delta="int8"):
+            pass
+        self.round_state.record_delivery("a", 3)
+        self.round_state.record_delivery("unknown", 3)
+        with self.round_state.upload("a", client_address="http://a2", accept_delta="int8"):
+            pass
+        self.assertEqual(self.round_state.clients()["a"]["delivered_round"], 3)
+        self.assertEqual(self.round_state.clients()["a"]["address"], "http://a2")
+
+
+    def test_round_rejects_models_of_other_shapes(self):
+        """Test a round only stores models with the names and shapes of its first model"""
+        current_round = self.round_state.seal()
+        current_round.check_signature({"w": [1.0, 2.0]})
+        current_round.check_signature({"w": [3.0, 4.0]})
+        with self.assertRaises(ValueError):
+            current_round.check_signature({"w": [[1.0, 2.0]]})
+
+
+class ClientRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, "clients.json")
+        self.registry = ClientRegistry(self.path, max_failures=3, backoff=10)
+        self.addCleanup(self.registry.session.close)
+        self.registry.register("a", "http://a", accept_delta="int8")
+        self.registry.register("b", "http://b")
+
+    def failed(self, client_id):
+        return DeliveryResult(client_id, f"http://{client_id}", False, attempts=3)
+
+    def test_persisted_across_restarts(self):
+        """Test the clients and their deliveries are loaded again by a new registry"""
+        self.registry.record_deliveries([DeliveryResult("a", "http://a", True, 200), self.failed("b")], 4, now=100)
+        registry = ClientRegistry(self.path)
+        self.addCleanup(registry.session.close)
+        clients = registry.clients()
+        self.assertEqual((clients["a"]["delivered_round"], clients["a"]["last_delivery"]), (4, 100))
+        self.assertEqual((clients["a"]["accept_delta"], clients["b"]["failures"]), ("int8", 1))
+
+    def test_failed_clients_back_off(self):
+        """Test a client is skipped for an exponentially growing backoff after each failed delivery"""
+        self.registry.record_deliveries([self.failed("b")], 1, now=100)
+        self.assertEqual(self.registry.targets(now=105), ({"a": self.registry.clients()["a"]}, ["b"]))
+        self.assertIn("b", self.registry.targets(now=110)[0])
+        self.registry.record_deliveries([self.failed("b")], 2, now=110)
+        self.assertEqual(self.registry.targets(now=125)[1], ["b"])
+        self.assertEqual(self.registry.targets(now=130)[1], [])
+
+    def test_dead_clients_are_evicted_until_they_upload(self):
+        """Test a client is evicted after max_failures failures in a row, and registered again by an upload"""
+        for round_number in (1, 2):
+            self.assertEqual(self.registry.record_deliveries([self.failed("b")], round_number), [])
+        self.registry.register("b", "http://b")
+        self.assertEqual(self.registry.clients()["b"]["failures"], 0)
+        evicted = [self.registry.record_deliveries([self.failed("b")], round_number) for round_number in (3, 4, 5)]
+        self.assertEqual(evicted, [[], [], ["b"]])
+        self.assertNotIn("b", ClientRegistry(self.path).clients())
+        self.registry.register("b", "http://b")
+        self.assertIn("b", self.registry.targets()[0])
+
+
+class PrivacyTest(unittest.TestCase):
+
+    def test_updates_are_clipped_to_the_norm(self):
+        """Test an update above the clip norm is scaled down around the global model, a small one is kept"""
+        base = {"w": [1.0, 1.0], "b": [0.0]}
+        clipped, norm = clip_update({"w": [4.0, 5.0], "b": [0.0]}, 1.0, base)
+        self.assertAlmostEqual(norm, 5.0)
+        np.testing.assert_allclose(clipped["w"], [1.6, 1.8])
+        self.assertAlmostEqual(l2_norm({k: clipped[k] - np.asarray(base[k]) for k in base}), 1.0)
+        kept, _ = clip_update({"w": [1.5, 1.0], "b": [0.0]}, 1.0, base)
+        np.testing.assert_array_equal(kept["w"], [1.5, 1.0])
+
+    def test_noise_is_seeded_and_scaled_by_sensitivity(self):
+        """Test the same seed gives the same noise, with the standard deviation of the weighted mean"""
+        aggregate = {"w": np.zeros(20000).tolist()}
+        noisy = [GaussianMechanism(2.0, 1.5, seed=3).add_noise(aggregate, [1, 1, 2]) for _ in range(2)]
+        self.assertEqual(noisy[0], noisy[1])
+        self.assertAlmostEqual(np.std(noisy[0]["w"]), 1.5 * 2.0 * 0.5, delta=0.02)
+
+    def test_accountant_composes_rounds(self):
+        """Test the spent epsilon grows with the rounds and shrinks with more noise"""
+        accountant = PrivacyAccountant(delta=1e-5)
+        self.assertEqual(accountant.epsilon(), 0.0)
+        accountant.spend(1.0)
+        one_round = accountant.epsilon()
+        accountant.spend(1.0, rounds=9)
+        self.assertEqual(accountant.rounds, 10)
+        self.assertGreater(accountant.epsilon(), one_round)
+        # Ten rounds at sigma 1 cost as much as one round at sigma 1/sqrt(10)
+        single = PrivacyAccountant(delta=1e-5)
+        single.spend(1 / np.sqrt(10))
+        self.assertAlmostEqual(single.epsilon(), accountant.epsilon())
+        mechanism = GaussianMechanism(1.0, 1.0, seed=0, accountant=PrivacyAccountant())
+        mechanism.add_noise({"w": [0.0]}, [1.0])
+        self.assertEqual(mechanism.accountant.rounds, 1)
+
+
+class ModelFormatTest(unittest.TestCase):
+
+    def test_round_trip_preserves_names_shapes_and_values(self):
+        """Test encoding then decoding a state dict gives back float32 tensors of the same shapes"""
+        rng = np.random.default_rng(2)
+        state_dict = {"w": rng.standard_normal((5, 3)).tolist(), "b": [1.0, 2.0], "scalar": 3.0,
+                      "conv": rng.standard_normal((2, 2, 3, 3))}
+        decoded, metadata = decode_state_dict(encode_state_dict(state_dict, metadata={"round": 1}),
+                                              with_metadata=True)
+        self.assertEqual(list(decoded), list(state_dict))
+        self.assertEqual(metadata, {"round": 1})
+        for k, v in state_dict.items():
+            self.assertEqual(decoded[k].dtype, np.float32)
+            np.testing.assert_allclose(decoded[k], np.asarray(v, dtype=np.float32))
+
+    def test_tensors_are_aligned_views(self):
+        """Test every tensor buffer starts on an aligned offset and is decoded without a copy"""
+        payload = encode_state_dict({"a": [1.0, 2.0, 3.0], "b": [[4.0], [5.0]]})
+        header, data_start = decode_header(payload)
+        self.assertEqual(data_start % ALIGNMENT, 0)
+        self.assertTrue(all(tensor["offset"] % ALIGNMENT == 0 for tensor in header["tensors"]))
+        decoded = decode_state_dict(payload)
+        self.assertFalse(decoded["a"].flags.writeable)
+        self.assertFalse(decoded["a"].flags.owndata)
+
+    def test_invalid_payloads_are_rejected(self):
+        """Test payloads with a wrong magic or truncated data raise ValueError"""
+        payload = encode_state_dict({"w": np.ones((8, 8))})
+        for invalid in (b"JSON" + payload[4:], payload[:10], payload[:-64]):
+            with self.assertRaises(ValueError):
+                decode_state_dict(invalid)
+
+
+class DeltaTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.base = {"w": rng.standard_normal((40, 10)).astype(np.float32), "b": np.zeros(10, dtype=np.float32),
+                     "scalar": np.float32(2.0)}
+        self.update = {k: v + 0.01 * rng.standard_normal(np.shape(v)).astype(np.float32)
+                       for k, v in self.base.items()}
+
+    def rebuild(self, payload):
+        tensors, metadata = decode_state_dict(payload, with_metadata=True)
+        self.assertTrue(is_delta(metadata))
+        return apply_delta(self.base, decode_delta(tensors, metadata)), metadata
+
+    def test_dense_deltas_rebuild_the_model(self):
+        """Test float16 and int8 deltas rebuild the update within their quantization error"""
+        for compression, tolerance in (("float16", 1e-5), (INT8, 2e-4)):
+            payload = encode_delta(self.update, self.base, compression, base_round=4)
+            rebuilt, metadata = self.rebuild(payload)
+            self.assertEqual(metadata["base_round"], 4)
+            self.assertLess(len(payload), len(encode_state_dict(self.update)))
+            for k, v in self.update.items():
+                self.assertEqual(rebuilt[k].shape, np.shape(v))
+                np.testing.assert_allclose(rebuilt[k], v, atol=tolerance)
+
+    def test_topk_delta_keeps_the_largest_changes(self):
+        """Test a top-k delta carries exactly the k changes of largest magnitude"""
+        payload = encode_delta(self.update, self.base, TOPK, base_round=1, topk_fraction=0.25)
+        tensors, _ = decode_state_dict(payload, with_metadata=True)
+        self.assertEqual(tensors["w.indices"].size, 100)
+        rebuilt, _ = self.rebuild(payload)
+        changed = np.flatnonzero(rebuilt["w"] != self.base["w"])
+        delta = np.abs(self.update["w"] - self.base["w"]).ravel()
+        np.testing.assert_array_equal(np.sort(changed), np.sort(np.argsort(delta)[-100:]))
+
+    def test_invalid_deltas_are_rejected(self):
+        """Test unknown compressions, out of range indices and mismatched bases raise ValueError"""
+        with self.assertRaises(ValueError):
+            encode_delta(self.update, self.base, "zip")
+        tensors, metadata = decode_state_dict(encode_delta(self.update, self.base, TOPK), with_metadata=True)
+        tensors = dict(tensors, **{"b.indices": np.array([0, 99], dtype=np.uint32),
+                                   "b.values": np.ones(2, dtype=np.float16)})
+        with self.assertRaises(ValueError):
+            decode_delta(tensors, metadata)
+        for compression in COMPRESSIONS:
+            tensors, metadata = decode_state_dict(encode_delta(self.update, self.base, compression),
+                                                  with_metadata=True)
+            with self.assertRaises(ValueError):
+                apply_delta({"w": self.base["w"]}, decode_delta(tensors, metadata))
+
+
+class ModelStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.store = ModelStore(os.path.join(folder.name, "local_models"), os.path.join(folder.name, "global_models"))
+
+    def test_local_models_are_memory_mapped_views(self):
+        """Test a saved client model is read back as read-only views with its metadata"""
+        self.store.save_local("tablet-1", {"w": [[1.0, 2.0]], "b": [3.0]}, metadata={"weight": 5.0})
+        state_dict, metadata = self.store.load_local("tablet-1")
+        self.assertEqual(metadata, {"weight": 5.0})
+        np.testing.assert_array_equal(state_dict["w"], [[1.0, 2.0]])
+        self.assertFalse(state_dict["w"].flags.writeable)
+        self.assertEqual(self.store.local_client_ids(), ["tablet-1"])
+        self.store.clear_local()
+        self.assertFalse(self.store.has_local("tablet-1"))
+
+    def test_global_history_is_versioned_per_round(self):
+        """Test every saved global model gets the next round number and replaces the latest files"""
+        for value in (1.0, 2.0):
+            self.store.save_global({"w": [value]}, {".json": f'{{"w": [{value}]}}'.encode()})
+        self.assertEqual(self.store.global_rounds(), [1, 2])
+        state_dict, metadata = self.store.load_global()
+        self.assertEqual(metadata["round"], 2)
+        np.testing.assert_array_equal(state_dict["w"], [2.0])
+        np.testing.assert_array_equal(self.store.load_global(1)[0]["w"], [1.0])
+        with open(os.path.join(self.store.global_folder, "averaged_model.json")) as f:
+            self.assertEqual(f.read(), '{"w": [2.0]}')
+        self.assertFalse([name for name in os.listdir(self.store.global_folder) if name.endswith(".tmp")])
+
+    def test_global_history_is_pruned(self):
+        """Test the history files before a round are deleted, the latest model files are kept"""
+        for value in (1.0, 2.0, 3.0):
+            self.store.save_global({"w": [value]}, {".json": f'{{"w": [{value}]}}'.encode()})
+        self.store.prune_global(3)
+        self.assertEqual(self.store.global_rounds(), [3])
+        self.assertEqual(self.store.latest_global_round(), 3)
+        self.assertEqual(self.store.save_global({"w": [4.0]}, {}), 4)
+
+    def test_failed_write_leaves_previous_model_intact(self):
+        """Test a crash while writing a model keeps the previous file and leaves no temporary file"""
+        self.store.save_local("tablet-1", {"w": [1.0]})
+        with self.assertRaises(ValueError):
+            self.store.save_local("tablet-1", {"w": [1.0], "bad": "not a number"})
+        np.testing.assert_array_equal(self.store.load_local("tablet-1")[0]["w"], [1.0])
+        self.assertEqual(os.listdir(self.store.local_folder), ["tablet-1_model.bin"])
+
+
+class ChunkedUploadsTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        self.uploads = ChunkedUploads(self.folder)
+        self.body = encode_state_dict({"w": np.arange(1000.0)})
+        self.session = self.uploads.create(len(self.body), hashlib.sha256(self.body).hexdigest(),
+                                           {"client_id": "tablet-1"})
+
+    def send(self, uploads, start, end, checksum=None):
+        chunk = self.body[start:end]
+        return uploads.write_chunk(self.session.upload_id, start, io.BytesIO(chunk), len(chunk),
+                                   checksum or hashlib.sha256(chunk).hexdigest())
+
+    def test_chunks_resume_after_restart(self):
+        """Test an upload continues at its offset after a restart and verifies once complete"""
+        self.send(self.uploads, 0, 1000)
+        restarted = ChunkedUploads(self.folder)
+        session = restarted.get(self.session.upload_id)
+        self.assertEqual((session.offset, session.params), (1000, {"client_id": "tablet-1"}))
+        self.assertTrue(self.send(restarted, 1000, len(self.body)).complete)
+        path = restarted.verify(self.session.upload_id)
+        np.testing.assert_array_equal(decode_state_dict(open(path, "rb").read())["w"], np.arange(1000.0))
+        restarted.discard(self.session.upload_id)
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_bad_chunks_are_rejected(self):
+        """Test chunks at the wrong offset or with a wrong checksum are not kept"""
+        self.send(self.uploads, 0, 100)
+        with self.assertRaises(ChunkOffsetError) as raised:
+            self.send(self.uploads, 200, 300)
+        self.assertEqual(raised.exception.offset, 100)
+        with self.assertRaises(ValueError):
+            self.send(self.uploads, 100, 200, checksum="0" * 64)
+        self.assertEqual(os.path.getsize(self.uploads.part_path(self.session.upload_id)), 100)
+        with self.assertRaises(ValueError):
+            self.uploads.write_chunk(self.session.upload_id, 100, io.BytesIO(self.body), len(self.body), None)
+        self.assertEqual(self.send(self.uploads, 100, 200).offset, 200)
+
+    def test_corrupted_upload_fails_verification(self):
+        """Test a complete upload whose bytes differ from the announced checksum is rejected"""
+        session = self.uploads.create(4, "0" * 64, {})
+        self.uploads.write_chunk(session.upload_id, 0, io.BytesIO(b"FAUR"), 4, hashlib.sha256(b"FAUR").hexdigest())
+        with self.assertRaises(ValueError):
+            self.uploads.verify(session.upload_id)
+
+
+    def test_abandoned_sessions_are_swept(self):
+        """Test sessions idle for longer than the TTL are deleted when an upload opens and at startup"""
+        self.send(self.uploads, 0, 100)
+        later = time.time() + 3600
+        with mock.patch("chunked_upload.time.time", return_value=later):
+            session = ChunkedUploads(self.folder, ttl=3600 - 60).create(4, "0" * 64, {})
+            self.assertEqual(ChunkedUploads(self.folder, ttl=3600 - 60).get(session.upload_id).offset, 0)
+        self.assertEqual(sorted(os.listdir(self.folder)), [f"{session.upload_id}.json", f"{session.upload_id}.part"])
+        with mock.patch("chunked_upload.time.time", return_value=later + 3600):
+            restarted = ChunkedUploads(self.folder, ttl=3600 - 60)
+        with self.assertRaises(KeyError):
+            restarted.get(session.upload_id)
+        self.assertEqual(os.listdir(self.folder), [])
+
+
+    def test_write_after_a_sweep_is_an_unknown_upload(self):
+        """Test a chunk whose session is swept while it waits for the session lock is rejected as unknown"""
+        session = self.uploads.get(self.session.upload_id)
+        get = self.uploads.get
+
+        def get_then_sweep(upload_id):
+            # The sweep runs between the lookup of the session and its lock
+            found = get(upload_id)
+            self.assertEqual(self.uploads.sweep(now=session.updated + self.uploads.ttl + 1), [upload_id])
+            return found
+
+        with mock.patch.object(self.uploads, "get", side_effect=get_then_sweep):
+            with self.assertRaises(KeyError):
+                self.send(self.uploads, 0, 100)
+        self.assertEqual(os.listdir(self.folder), [])
+
+
+class ShardedAggregatorTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.store = ModelStore(os.path.join(folder.name, "local_models"), os.path.join(folder.name, "global_models"))
+        self.aggregator = ShardedAggregator(workers=2)
+        self.addCleanup(self.aggregator.shutdown)
+
+    def test_sharded_average_matches_weighted_average(self):
+        """Test combining the partial sums of the worker processes gives the weighted FedAvg mean"""
+        rng = np.random.default_rng(3)
+        state_dicts = [{"w": rng.standard_normal((6, 4)), "b": rng.standard_normal(4)} for _ in range(5)]
+        weights = [1.0, 10.0, 3.0, 7.0, 2.0]
+        for i, (state_dict, weight) in enumerate(zip(state_dicts, weights)):
+            self.store.save_local(f"client{i}", state_dict, metadata={"weight": weight})
+        paths = [self.store.stored_local_path(f"client{i}") for i in range(5)]
+        expected = average_state_dicts([{k: v.astype(np.float32) for k, v in sd.items()} for sd in state_dicts],
+                                       weights=weights)
+        averaged = self.aggregator.average(paths)
+        for k in expected:
+            np.testing.assert_allclose(averaged[k], expected[k], rtol=1e-6)
+
+    def test_sharded_average_rejects_mismatched_shapes(self):
+        """Test models of different shapes in the stored round are rejected"""
+        self.store.save_local("a", {"w": [1.0, 2.0]})
+        self.store.save_local("b", {"w": [1.0]})
+        with self.assertRaises(ValueError):
+            self.aggregator.average([self.store.stored_local_path("a"), self.store.stored_local_path("b")])
+
+
+    def test_workers_do_not_run_the_main_script(self):
+        """Test the spawned workers do not import the main script again, only the worker module"""
+        self.store.save_local("a", {"w": [1.0, 2.0]})
+        script = os.path.join(self.store.local_folder, "main.py")
+        log = os.path.join(self.store.local_folder, "imports.log")
+        with open(script, "w") as f:
+            f.write(f"""import sys
+sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})
+with open({log!r}, "a") as log:
+    log.write("imported\\n")
+from aggregation import ShardedAggregator
+if __name__ == "__main__":
+    aggregator = ShardedAggregator(2)
+    print(aggregator.average([{self.store.stored_local_path("a")!r}] * 3))
+    aggregator.shutdown()
+""")
+        output = subprocess.run([sys.executable, script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "{'w': [1.0, 2.0]}")
+        with open(log) as f:
+            self.assertEqual(f.read(), "imported\n")
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics(history=2)
+        self.metrics.start_round(1)
+        self.metrics.record_upload(1, "a", 100, receive=0.5, parse=0.25)
+        self.metrics.record_upload(1, "b", 50, parse=0.25)
+        with self.metrics.span(1, "aggregate"):
+            pass
+        self.metrics.record_deliveries(1, [
+            DeliveryResult("a", "http://a", True, 200, attempts=1, elapsed=0.1, payload_size=40),
+            DeliveryResult("b", "http://b", False, attempts=3, elapsed=2.0, payload_size=40)])
+        self.metrics.finish_round(1)
+
+    def test_round_report(self):
+        """Test the report of a round sums the spans of its uploads and counts only delivered bytes"""
+        report = self.metrics.round_report()
+        self.assertEqual((report["round_id"], report["status"]), (1, "complete"))
+        self.assertEqual(report["spans"]["receive"], 0.5)
+        self.assertEqual(report["spans"]["parse"], 0.5)
+        self.assertGreater(report["spans"]["aggregate"], 0)
+        self.assertEqual((report["bytes_in"], report["bytes_out"]), (150, 40))
+        self.assertEqual(report["uploads"]["a"], {"bytes": 100, "receive": 0.5, "parse": 0.25})
+        self.assertEqual(report["deliveries"]["b"]["attempts"], 3)
+
+    def test_history_is_bounded(self):
+        """Test only the last rounds are kept, and unknown rounds raise KeyError"""
+        for round_id in (2, 3):
+            self.metrics.start_round(round_id)
+        self.assertEqual(self.metrics.round_report()["round_id"], 3)
+        with self.assertRaises(KeyError):
+            self.metrics.round_report(1)
+
+    def test_prometheus_exposition(self):
+        """Test the counters are exposed in the Prometheus text format"""
+        text = self.metrics.prometheus({"round_id": 2, "received": 1, "total": 3})
+        self.assertIn("# TYPE fedaurora_uploads_total counter\nfedaurora_uploads_total 2\n", text)
+        self.assertIn('fedaurora_deliveries_total{result="failure"} 1\n', text)
+        self.assertIn("fedaurora_sent_bytes_total 40\n", text)
+        self.assertIn('fedaurora_stage_seconds_total{stage="parse"} 0.5\n', text)
+        self.assertIn("fedaurora_round_expected_models 3\n", text)
+
+
+class GlobalModelCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = 0
+
+        def load_latest():
+            self.loads += 1
+            return 3, {JSON_MEDIA_TYPE: b'{"w": [1.0]}', MEDIA_TYPE: b"FAUR" * 64}
+
+        self.cache = GlobalModelCache(load_latest)
+
+    def test_loads_the_stored_model_once(self):
+        """Test the latest stored model is only loaded on the first request, and is served in the format asked for"""
+        status, body, headers = self.cache.respond()
+        self.assertEqual((status, body), (200, b'{"w": [1.0]}'))
+        self.assertEqual((headers["Content-Type"], headers["X-FedAurora-Round"]), (JSON_MEDIA_TYPE, "3"))
+        _, body, headers = self.cache.respond(accept=f"{MEDIA_TYPE}, application/json;q=0.5")
+        self.assertEqual((body, headers["Content-Type"]), (b"FAUR" * 64, MEDIA_TYPE))
+        self.assertEqual(self.loads, 1)
+
+    def test_not_modified(self):
+        """Test a request listing the current ETag gets a 304 without a body, until a new version is published"""
+        _, _, headers = self.cache.respond()
+        status, body, not_modified = self.cache.respond(if_none_match=f'W/"x", {headers["ETag"]}')
+        self.assertEqual((status, body, not_modified["ETag"]), (304, b"", headers["ETag"]))
+        self.cache.update(4, {JSON_MEDIA_TYPE: b'{"w": [2.0]}', MEDIA_TYPE: b""})
+        status, body, headers = self.cache.respond(if_none_match=headers["ETag"])
+        self.assertEqual((status, body, headers["X-FedAurora-Round"]), (200, b'{"w": [2.0]}', "4"))
+        self.assertTrue(headers["ETag"].startswith('"4-'))
+        # An older version published late does not replace the newer one
+        self.cache.update(3, {JSON_MEDIA_TYPE: b"{}", MEDIA_TYPE: b""})
+        self.assertEqual(self.cache.respond()[1], b'{"w": [2.0]}')
+
+    def test_gzip(self):
+        """Test gzip is used only when Accept-Encoding allows it, with its own ETag"""
+        _, _, identity = self.cache.respond(accept=MEDIA_TYPE)
+        status, body, headers = self.cache.respond(accept=MEDIA_TYPE, accept_encoding="br, gzip;q=0.8")
+        self.assertEqual((status, headers["Content-Encoding"]), (200, "gzip"))
+        self.assertEqual(gzip.decompress(body), b"FAUR" * 64)
+        self.assertNotEqual(headers["ETag"], identity["ETag"])
+        self.assertNotIn("Content-Encoding", self.cache.respond(accept_encoding="gzip;q=0")[2])
+
+    def test_nothing_stored(self):
+        """Test FileNotFoundError is raised while no global model exists"""
+        with self.assertRaises(FileNotFoundError):
+            GlobalModelCache().respond()
+
+
+class StubClientHandler(BaseHTTPRequestHandler):
+    """Stand-in for a client /receive_model endpoint, failing the first ``fail_first`` requests."""
+    fail_first = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((self.path, self.headers['Content-Type'], body))
+        status = 500 if len(self.server.received) <= self.fail_first else 200
+        self.send_response(status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class BroadcastTest(unittest.TestCase):
+
+    def start_client(self, fail_first=0):
+        handler = type('Handler', (StubClientHandler,), {'fail_first': fail_first})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.received = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    def test_broadcast_delivers_same_payload_to_every_client(self):
+        """Test every client receives the serialized model on /receive_model"""
+        servers = [self.start_client() for _ in range(3)]
+        clients = {f"client{i}": address for i, (_, address) in enumerate(servers)}
+        deliveries = broadcast_model(clients, {'application/json': b'{"w": [1.0]}'})
+        self.assertTrue(all(d.success and d.attempts == 1 for d in deliveries))
+        self.assertEqual([d.client_id for d in deliveries], list(clients))
+        for server, _ in servers:
+            self.assertEqual(server.received, [('/receive_model', 'application/json', b'{"w": [1.0]}')])
+
+    def test_broadcast_sends_client_payloads(self):
+        """Test a client with its own payload gets it with its extra headers, the others the shared one"""
+        (full_server, full_address), (delta_server, delta_address) = self.start_client(), self.start_client()
+        deliveries = broadcast_model({"full": full_address, "delta": delta_address}, {'application/json': b'{}'},
+                                     client_payloads={"delta": ('application/x-fedaurora-model', b'FAUR',
+                                                                {'X-FedAurora-Base-Round': '1'})})
+        self.assertTrue(all(d.success for d in deliveries))
+        self.assertEqual(full_server.received, [('/receive_model', 'application/json', b'{}')])
+        self.assertEqual(delta_server.received, [('/receive_model', 'application/x-fedaurora-model', b'FAUR')])
+
+    def test_broadcast_retries_server_errors(self):
+        """Test a client answering 500 is retried with backoff until it accepts the model"""
+        server, address = self.start_client(fail_first=1)
+        [delivery] = broadcast_model({"a": address}, {'application/json': b'{}'}, retries=2, backoff=0.01)
+        self.assertTrue(delivery.success)
+        self.assertEqual(delivery.attempts, 2)
+        self.assertEqual(len(server.received), 2)
+
+    def test_broadcast_reports_unreachable_client(self):
+        """Test an unreachable client is reported as failed without stalling the others"""
+        _, address = self.start_client()
+        deliveries = broadcast_model({"dead": "http://127.0.0.1:9", "alive": address}, {'application/json': b'{}'},
+                                     retries=1, backoff=0.01, timeout=1)
+        self.assertEqual([d.success for d in deliveries], [False, True])
+        self.assertEqual(deliveries[0].attempts, 2)
+        self.assertIsNotNone(deliveries[0].error)
+
+    def test_async_broadcast_matches_threaded_broadcast(self):
+        """Test the non-blocking broadcast delivers, retries and reports like the threaded one"""
+        server, address = self.start_client(fail_first=1)
+
+        async def broadcast():
+            async with httpx.AsyncClient() as client:
+                return await broadcast_model_async(
+                    {"a": address, "dead": "http://127.0.0.1:9"}, {'application/json': b'{}'}, client,
+                    headers={'X-FedAurora-Round': '1'}, retries=1, backoff=0.01, timeout=1)
+
+        deliveries = asyncio.run(broadcast())
+        self.assertEqual([(d.success, d.attempts) for d in deliveries], [(True, 2), (False, 2)])
+        self.assertEqual(server.received[-1], ('/receive_model', 'application/json', b'{}'))
+
+
+class ServerTestCase(unittest.TestCase):
+    """
+    Base of the tests driving FedAurora.py through its routes. Every test gets a fresh round state, model
+    store, registry and metrics in a temporary working folder; events are recorded and broadcasts stubbed.
+    """
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(folder.name)
+        import FedAurora as server
+        self.server = server
+        self.events = []
+        state = {'model_store': ModelStore("local_models", "global_models"),
+                 'chunked_uploads': ChunkedUploads("partial_uploads"),
+                 'client_registry': ClientRegistry(),
+                 'metrics': Metrics(),
+                 'global_model_cache': GlobalModelCache(load_latest=server.latest_global_payloads),
+                 'event_emitter': lambda event, *args: self.events.append(event),
+                 'model_broadcaster': lambda clients, payloads, **options: []}
+        state['round_state'] = RoundState(registry=state['client_registry'])
+        for name, value in state.items():
+            self.addCleanup(setattr, server, name, getattr(server, name))
+            setattr(server, name, value)
+        self.client = server.app.test_client()
+
+    def upload(self, client_id, model):
+        return self.client.post(f'/upload?client_id={client_id}', json=model)
+
+
+class AggregationFailureTest(ServerTestCase):
+
+    def test_failed_aggregation_releases_the_round(self):
+        """Test a round whose global model cannot be written fails, and uploads and /reset work again"""
+        self.server.round_state.start(1)
+        self.assertEqual(self.upload("a", {"w": [1.0, 2.0]}).status_code, 200)
+        with mock.patch.object(self.server.model_store, 'save_global', side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.server.aggregate_models()
+        status = self.server.round_state.snapshot()
+        self.assertEqual((status['status'], status['round_id'], status['received']), ('idle', 1, 0))
+        self.assertIn('round_failed', self.events)
+        self.assertEqual(self.server.metrics.round_report(1)['status'], 'failed')
+        self.assertEqual(self.server.model_store.local_client_ids(), [])
+        # The round ID is retried, and the server accepts uploads and resets again
+        self.assertEqual(self.client.post('/upload?client_id=a&round_id=1', json={"w": [1.0, 2.0]}).status_code, 200)
+        self.assertEqual(self.client.post('/reset').status_code, 200)
+        self.assertEqual(self.server.round_state.snapshot()['received'], 0)
+
+
+class FoldOnUploadTest(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(setattr, self.server, 'fold_on_upload', self.server.fold_on_upload)
+        self.server.fold_on_upload = True
+        self.server.round_state.start(2)
+
+    def test_failed_save_is_taken_out_of_the_sum(self):
+        """Test a model that cannot be stored does not count, and the client can upload it again"""
+        with mock.patch.object(self.server.model_store, 'save_local', side_effect=OSError("disk full")):
+            self.assertEqual(self.upload("a", {"w": [1.0, 2.0]}).status_code, 500)
+        self.assertEqual(self.upload("b", {"w": [3.0, 4.0]}).status_code, 200)
+        self.assertEqual(self.upload("a", {"w": [1.0, 2.0]}).status_code, 200)
+        current_round = self.server.round_state.seal()
+        self.assertEqual((current_round.received, current_round.aggregator.num_clients), ({"a", "b"}, 2))
+        self.assertEqual(current_round.aggregator.average(), {"w": [2.0, 3.0]})
+
+    def test_failed_reupload_keeps_the_previous_model(self):
+        """Test a re-upload that cannot be stored leaves the previous model of the client in the sum"""
+        self.assertEqual(self.upload("a", {"w": [1.0, 2.0]}).status_code, 200)
+        with mock.patch.object(self.server.model_store, 'save_local', side_effect=OSError("disk full")):
+            self.assertEqual(self.upload("a", {"w": [5.0, 6.0]}).status_code, 500)
+        self.assertEqual(self.server.round_state.seal().aggregator.average(), {"w": [1.0, 2.0]})
+
+    def test_reupload_matches_a_single_upload(self):
+        """Test a re-upload replaces the previous model exactly, as if only the new model had been uploaded"""
+        model = {"w": [0.1, 0.2, 0.3]}
+        self.assertEqual(self.client.post('/upload?client_id=a&weight=3', json={"w": [0.7, 1e-3, 9.9]}).status_code,
+                         200)
+        self.assertEqual(self.client.post('/upload?client_id=a&weight=3', json=model).status_code, 200)
+        single = RunningAggregator()
+        single.add("a", as_stored(model), weight=3)
+        self.assertEqual(self.server.round_state.seal().aggregator.average(), single.average())
+        np.testing.assert_array_equal(self.server.model_store.load_local("a")[0]["w"], as_stored(model)["w"])
+
+
+class PrivacyServerTest(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(setattr, self.server, 'privacy_stage', self.server.privacy_stage)
+        self.server.privacy_stage = GaussianMechanism(1.0, 1.0, seed=0)
+
+    def test_updates_need_an_initial_global_model(self):
+        """Test uploads are rejected, not scaled down whole, until the initial global model is published"""
+        self.assertEqual(self.upload("a", {"w": [3.0, 4.0]}).status_code, 400)
+        self.assertEqual(self.server.model_store.local_client_ids(), [])
+        with open("initial.json", "w") as f:
+            json.dump({"w": [3.0, 3.0]}, f)
+        with mock.patch.dict(os.environ, {'FEDAURORA_DP_INITIAL_MODEL': "initial.json"}):
+            self.server.publish_initial_model()
+            self.server.publish_initial_model()
+        self.assertEqual(self.server.model_store.global_rounds(), [1])
+        self.assertEqual(self.server.round_state.round_id, 2)
+        self.assertEqual(self.upload("a", {"w": [3.0, 4.0]}).status_code, 200)
+        np.testing.assert_array_equal(self.server.model_store.load_local("a")[0]["w"], [3.0, 4.0])
+        self.assertEqual(self.upload("a", {"w": [6.0, 7.0]}).status_code, 200)
+        np.testing.assert_allclose(self.server.model_store.load_local("a")[0]["w"], [3.6, 3.8], rtol=1e-6)
+
+
+class AsyncHistoryTest(ServerTestCase):
+
+    def test_history_keeps_the_staleness_window(self):
+        """Test publishing an asynchronous version deletes the versions no update can be based on anymore"""
+        aggregator = AsyncAggregator(mode=FEDBUFF, buffer_size=1, max_staleness=2,
+                                     load_version=lambda version: self.server.load_global_version(version)[0])
+        self.addCleanup(setattr, self.server, 'async_aggregator', self.server.async_aggregator)
+        self.server.async_aggregator = aggregator
+        for version in range(5):
+            self.assertEqual(self.client.post(f'/upload?client_id=a&base_version={version or ""}',
+                                              json={"w": [float(version)]}).status_code, 200)
+        self.assertEqual(self.server.model_store.global_rounds(), [3, 4, 5])
+        self.assertEqual(self.client.post('/upload?client_id=a&base_version=2', json={"w": [1.0]}).status_code, 409)
+        self.assertEqual(self.client.post('/upload?client_id=a&base_version=3', json={"w": [1.0]}).status_code, 200)
+        self.assertEqual(self.server.model_store.global_rounds(), [4, 5, 6])
+
+
+class FullRoundScenario:
+    """
+    A whole round driven through the HTTP routes: one plain and one chunked upload, the aggregation started
+    from the start page, then the global model, the measurements and the folders. Mixed into a ServerTestCase
+    of each serving mode, which defines ``request(method, url, body, headers) -> (status, headers, body)``
+    with a decompressed body.
+    """
+    model_a = {"w": [[1.0, 2.0], [3.0, 4.0]], "b": [1.0]}
+    model_b = {"w": [[3.0, 4.0], [5.0, 6.0]], "b": [3.0]}
+
+    def request_json(self, method, url, body=b"", headers=None):
+        status, _, body = self.request(method, url, body, headers)
+        return status, json.loads(body)
+
+    def test_full_round(self):
+        """Test a round goes from the start page to the global model, its ETag, gzip, metrics and folders"""
+        status, _, _ = self.request('POST', '/start_aggregation', b'num_clients=2',
+                                    {'Content-Type': 'application/x-www-form-urlencoded'})
+        self.assertEqual(status, 200)
+        status, _ = self.request_json('POST', '/upload?client_id=a', json.dumps(self.model_a).encode(),
+                                      {'Content-Type': JSON_MEDIA_TYPE})
+        self.assertEqual(status, 200)
+
+        body = json.dumps(self.model_b).encode()
+        half = len(body) // 2
+        status, session = self.request_json(
+            'POST', f'/uploads?client_id=b&content_type={JSON_MEDIA_TYPE}&size={len(body)}'
+                    f'&checksum={hashlib.sha256(body).hexdigest()}')
+        self.assertEqual(status, 201)
+        chunk_url = f"/uploads/{session['upload_id']}"
+        status, session = self.request_json('PUT', f'{chunk_url}?offset=0', body[:half],
+                                            {'X-FedAurora-Chunk-Checksum': hashlib.sha256(body[:half]).hexdigest()})
+        self.assertEqual((status, session['offset'], session['complete']), (200, half, False))
+        self.assertEqual(self.request_json('GET', chunk_url)[1]['offset'], half)
+        status, session = self.request_json('PUT', f'{chunk_url}?offset={half}', body[half:],
+                                            {'X-FedAurora-Chunk-Checksum': hashlib.sha256(body[half:]).hexdigest()})
+        self.assertEqual((status, session['complete']), (200, True))
+
+        # The round is aggregated as soon as the second model arrives, the series then releases its lock
+        self.assertTrue(self.server.rounds_lock.acquire(timeout=10))
+        self.server.rounds_lock.release()
+
+        status, headers, body = self.request('GET', '/global_model', headers={'Accept-Encoding': 'identity'})
+        self.assertEqual((status, headers['X-FedAurora-Round']), (200, '1'))
+        self.assertEqual(json.loads(body), {"w": [[2.0, 3.0], [4.0, 5.0]], "b": [2.0]})
+        status, _, not_modified = self.request('GET', '/global_model', headers={
+            'Accept-Encoding': 'identity', 'If-None-Match': headers['ETag']})
+        self.assertEqual((status, not_modified), (304, b""))
+        status, gzip_headers, gzip_body = self.request('GET', '/global_model', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual((status, gzip_headers['Content-Encoding'], gzip_body), (200, 'gzip', body))
+
+        status, _, text = self.request('GET', '/metrics')
+        self.assertEqual(status, 200)
+        self.assertIn(b'fedaurora_rounds_total{status="complete"} 1\n', text)
+        status, report = self.request_json('GET', '/round_report')
+        self.assertEqual((status, report['round_id'], report['status']), (200, 1, 'complete'))
+        self.assertEqual(self.request('GET', '/round_report?round_id=99')[0], 404)
+        self.assertEqual(self.request_json('GET', '/privacy'), (200, {'enabled': False}))
+        self.assertIn('averaged_model_round_00001.bin', self.request_json('GET', '/contents/global')[1]['files'])
+        self.assertEqual(self.request_json('GET', '/contents/local'), (200, {'files': []}))
+        self.assertEqual(self.request_json('GET', '/round')[1]['round_id'], 2)
+        self.assertEqual(self.request('POST', '/reset')[0], 200)
+
+
+class FlaskFullRoundTest(FullRoundScenario, ServerTestCase):
+
+    def request(self, method, url, body=b"", headers=None):
+        response = self.client.open(url, method=method, data=body, headers=headers)
+        body = response.get_data()
+        if response.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return response.status_code, response.headers, body
+
+
+class AsgiFullRoundTest(FullRoundScenario, ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from starlette.testclient import TestClient
+
+        import FedAuroraAsync
+        # Entering the client runs the lifespan, which plugs the event loop's emitter and broadcaster in
+        self.asgi_client = TestClient(FedAuroraAsync.asgi_app)
+        self.asgi_client.__enter__()
+        self.addCleanup(self.asgi_client.__exit__, None, None, None)
+
+    def request(self, method, url, body=b"", headers=None):
+        # httpx decompresses gzip bodies itself
+        response = self.asgi_client.request(method, url, content=body, headers=headers)
+        return response.status_code, response.headers, response.content
+
+    def test_chunk_is_streamed_in_blocks(self):
+        """Test a chunk is written block by block from the body stream, its pieces split across blocks"""
+        body = encode_state_dict({"w": np.arange(1000.0)})
+        session = self.asgi_client.post(f'/uploads?client_id=a&size={len(body)}'
+                                        f'&checksum={hashlib.sha256(body).hexdigest()}').json()
+        pieces = (body[i:i + 1000] for i in range(0, len(body), 1000))
+        with mock.patch("chunked_upload.BLOCK_SIZE", 384):
+            response = self.asgi_client.put(
+                f"/uploads/{session['upload_id']}?offset=0", content=pieces,
+                headers={'X-FedAurora-Chunk-Checksum': hashlib.sha256(body).hexdigest(),
+                         'Content-Length': str(len(body))})
+        self.assertEqual((response.status_code, response.json()['complete']), (200, True))
+        np.testing.assert_array_equal(self.server.model_store.load_local("a")[0]["w"], np.arange(1000.0))
+
+
+if __name__ == "__main__":
+    unittest.main()